@@ -0,0 +1,86 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Measure adding new records to an existing series in the repository."""
+
+import argparse
+import os
+import tempfile
+
+import portfel.data.loaders.tradingview as tv
+import portfel.data.repository as repo
+import portfel.data.series as ds
+import portfel.data.storage as storage
+
+import common
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument('--sizes', type=int, nargs='+',
+                    default=[10000, 100000, 1000000],
+                    help='Numbers of stored rows to test with')
+parser.add_argument('--formats', nargs='+', default=sorted(storage.FORMATS),
+                    choices=sorted(storage.FORMATS),
+                    help='Storage formats to test')
+parser.add_argument('--updates', type=int, default=5,
+                    help='Number of one record updates to make')
+
+
+def make_series(start, size):
+    """Create a synthetic series."""
+    series = ds.Series(tv.convert_columns(common.tv_chunk(start, size)))
+    series.exchange = 'BATS'
+    series.ticker = 'FOO'
+    series.resolution = '1'
+    series.currency = 'USD'
+    return series
+
+
+def main():
+    args = parser.parse_args()
+    results = []
+
+    for size in args.sizes:
+        series = make_series(0, size)
+        for format in args.formats:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                path = os.path.join(tmpdir, 'repo')
+                repository = repo.Repository(path, format=format)
+                repository.add_series(series)
+
+                # Re-import of the last 100 records with one new record.
+                t_overlap, _ = common.timeit(repository.add_series,
+                                             make_series(size - 100, 101))
+                # One new record at a time.
+                times = [
+                    common.timeit(repository.add_series,
+                                  make_series(size + 1 + i, 1))[0]
+                    for i in range(args.updates)
+                ]
+                results.append([
+                    size,
+                    format,
+                    '{:.4f}'.format(t_overlap),
+                    '{:.4f}'.format(min(times)),
+                    '{:.4f}'.format(max(times)),
+                ])
+
+    common.print_results(
+        ['rows', 'format', 'overlap, s', 'append min, s', 'append max, s'],
+        results,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Measure loading of the repository index and record lookups."""
+
+import argparse
+import os
+import random
+import tempfile
+
+import pandas as pd
+
+import portfel.data.repository as repo
+
+import common
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument('--records', type=int, default=10000,
+                    help='Number of index records')
+parser.add_argument('--lookups', type=int, default=10000,
+                    help='Number of lookups to make')
+
+
+def write_index(path, size):
+    """Write repository index with `size` records."""
+    index = pd.DataFrame({
+        'exchange': ['X{}'.format(i % 10) for i in range(size)],
+        'ticker': ['T{}'.format(i) for i in range(size)],
+        'resolution': '1d',
+        'currency': 'USD',
+        'filename': ['T{}.pfc'.format(i) for i in range(size)],
+        'first-time': pd.Timestamp('2000-01-01'),
+        'last-time': pd.Timestamp('2020-01-01'),
+    })
+    os.makedirs(path)
+    index.to_csv(os.path.join(path, 'index.csv'), index=False)
+    return list(zip(index['exchange'], index['ticker'], index['resolution']))
+
+
+def mask_lookup(index, exchange, ticker, resolution):
+    """Look up the record by filtering the data frame (old approach)."""
+    matches = index[
+        (index['exchange'] == exchange)
+        & (index['ticker'] == ticker)
+        & (index['resolution'] == resolution)
+    ]
+    return matches.iloc[0]
+
+
+def main():
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'repo')
+        keys = write_index(path, args.records)
+        t_load, repository = common.timeit(repo.Repository, path)
+
+    keys = random.choices(keys, k=args.lookups)
+    t_dict, _ = common.timeit(
+        lambda: [repository._get_index_record(*k) for k in keys],
+    )
+    index = repository.index
+    t_mask, _ = common.timeit(
+        lambda: [mask_lookup(index, *k) for k in keys],
+    )
+
+    common.print_results(['operation', 'total, s', 'per call, us'], [
+        ['load index', '{:.4f}'.format(t_load), '-'],
+        ['dict lookup', '{:.4f}'.format(t_dict),
+         '{:.2f}'.format(t_dict * 1e6 / args.lookups)],
+        ['mask lookup', '{:.4f}'.format(t_mask),
+         '{:.2f}'.format(t_mask * 1e6 / args.lookups)],
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Measure loading of many series one by one and with get_many()."""
+
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import portfel.data.repository as repo
+import portfel.data.series as ds
+
+import common
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument('--series', type=int, default=200,
+                    help='Number of series')
+parser.add_argument('--rows', type=int, default=5000,
+                    help='Number of rows in each series')
+parser.add_argument('--format', default='csv', choices=['binary', 'csv'],
+                    help='Storage format (default: csv)')
+parser.add_argument('--jobs', type=int, nargs='+', default=[1, 2, 4, 8],
+                    help='Numbers of parallel jobs to try')
+
+
+def make_series(ticker, rows):
+    """Make random daily series."""
+    time = pd.date_range('2000-01-01', periods=rows)
+    close = np.random.uniform(10, 20, rows)
+    series = ds.Series({'time': time, 'open': close, 'close': close,
+                        'high': close, 'low': close, 'volume': close})
+    series.exchange = 'X'
+    series.ticker = ticker
+    series.resolution = '1d'
+    series.currency = 'USD'
+    return series
+
+
+def main():
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'repo')
+        repository = repo.Repository(path, format=args.format)
+        keys = []
+        with repository.batch():
+            for i in range(args.series):
+                series = make_series('T{}'.format(i), args.rows)
+                repository.add_series(series)
+                keys.append(('X', series.ticker, '1d'))
+
+        rows = []
+        t_loop, _ = common.timeit(
+            lambda: [repository.get_series(*key) for key in keys],
+        )
+        rows.append(['loop', '-', '{:.3f}'.format(t_loop)])
+        for processes in [False, True]:
+            for jobs in args.jobs:
+                t_many, _ = common.timeit(repository.get_many, keys,
+                                          jobs=jobs, processes=processes)
+                rows.append([
+                    'get_many ({})'.format(
+                        'processes' if processes else 'threads'),
+                    jobs,
+                    '{:.3f}'.format(t_many),
+                ])
+
+    common.print_results(['method', 'jobs', 'time, s'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Measure query latency of the repository server against direct loading."""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+
+import portfel.client as cl
+import portfel.data.repository as repo
+import portfel.server as srv
+
+import bench_many
+import common
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument('--series', type=int, default=20,
+                    help='Number of series')
+parser.add_argument('--rows', type=int, nargs='+', default=[1000, 50000],
+                    help='Numbers of rows in the series')
+parser.add_argument('--queries', type=int, default=200,
+                    help='Number of queries')
+
+
+def median_ms(func, keys, queries):
+    """Median time of the queries in milliseconds."""
+    times = [common.timeit(func, *keys[i % len(keys)])[0]
+             for i in range(queries)]
+    return '{:.2f}'.format(statistics.median(times) * 1000)
+
+
+def main():
+    args = parser.parse_args()
+
+    rows = []
+    for size in args.rows:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'repo')
+            repository = repo.Repository(path)
+            keys = []
+            with repository.batch():
+                for i in range(args.series):
+                    series = bench_many.make_series('T{}'.format(i), size)
+                    repository.add_series(series)
+                    keys.append(('X', series.ticker, '1d'))
+
+            server = srv.Server(repo.Repository(path,
+                                                memory_cache_size=1 << 30))
+            thread = threading.Thread(target=server.serve_forever)
+            thread.start()
+            try:
+                with cl.connect(path) as client:
+                    client.get_series(*keys[0])  # Connect and warm up.
+                    rows.append([
+                        size,
+                        median_ms(repository.get_series, keys, args.queries),
+                        median_ms(client.get_series, keys, args.queries),
+                    ])
+            finally:
+                server.shutdown()
+                thread.join()
+                server.server_close()
+
+    common.print_results(['rows', 'direct, ms', 'server, ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Measure start up time of the command line interface.
+
+Each command is run in a new interpreter several times and the best time is
+reported. With --imports, the slowest imports (from `python -X importtime`)
+of each command are also listed.
+
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import portfel.data.repository as repo
+import portfel.data.series as ds
+
+import common
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument('--series', type=int, default=100,
+                    help='Number of series in the repository')
+parser.add_argument('--runs', type=int, default=10,
+                    help='Number of runs of each command')
+parser.add_argument('--imports', type=int, default=0,
+                    help='Number of the slowest imports to list')
+
+COMMANDS = [
+    ['--help'],
+    ['ls'],
+    ['show', 'X:T0', '--start', '2000-12-01'],
+]
+
+# Runs the CLI like the `pf` script does.
+RUN_CLI = 'import portfel.__main__ as m; m.main()'
+
+
+def make_repository(path, count):
+    """Make repository with `count` small daily series."""
+    repository = repo.Repository(path)
+    time = pd.date_range('2000-01-01', periods=500)
+    with repository.batch():
+        for i in range(count):
+            close = np.random.uniform(10, 20, len(time))
+            series = ds.Series({'time': time, 'open': close, 'close': close,
+                                'high': close, 'low': close})
+            series.exchange = 'X'
+            series.ticker = 'T{}'.format(i)
+            series.resolution = '1d'
+            series.currency = 'USD'
+            repository.add_series(series)
+
+
+def run(command, path, *options):
+    """Run the CLI command in a new interpreter."""
+    argv = [sys.executable, *options, '-c', RUN_CLI, *command]
+    env = dict(os.environ, PORTFEL_REPOSITORY=path)
+    return subprocess.run(argv, env=env, check=True, capture_output=True,
+                          text=True)
+
+
+def slowest_imports(command, path, count):
+    """Return the slowest imports of the command as (module, ms) pairs."""
+    result = run(command, path, '-X', 'importtime')
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line.split('|')
+        imports.append((module.strip(), int(cumulative) / 1000))
+    return sorted(imports, key=lambda i: -i[1])[:count]
+
+
+def main():
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'repo')
+        make_repository(path, args.series)
+
+        rows = []
+        for command in COMMANDS:
+            times = [common.timeit(run, command, path)[0]
+                     for _ in range(args.runs)]
+            rows.append([' '.join(command), '{:.3f}'.format(min(times))])
+        common.print_results(['command', 'time, s'], rows)
+
+        for command in COMMANDS if args.imports else []:
+            print('\n{}:'.format(' '.join(command)))
+            common.print_results(
+                ['module', 'cumulative, ms'],
+                slowest_imports(command, path, args.imports),
+            )
+
+
+if __name__ == '__main__':
+    main()
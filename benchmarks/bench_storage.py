@@ -0,0 +1,76 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare saving and loading of series in different storage formats."""
+
+import argparse
+import os
+import tempfile
+
+import portfel.data.loaders.tradingview as tv
+import portfel.data.series as ds
+import portfel.data.storage as storage
+
+import common
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument('--sizes', type=int, nargs='+',
+                    default=[10000, 100000, 1000000],
+                    help='Numbers of rows to test with')
+parser.add_argument('--formats', nargs='+', default=sorted(storage.FORMATS),
+                    choices=sorted(storage.FORMATS),
+                    help='Storage formats to test')
+
+
+def main():
+    args = parser.parse_args()
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in args.sizes:
+            series = ds.Series(tv.convert_columns(common.tv_chunk(0, size)))
+            for format in args.formats:
+                path = os.path.join(tmpdir, storage.filename('series', format))
+                t_save, _ = common.timeit(storage.save_series, path, series)
+                t_load, _ = common.timeit(storage.load_series, path)
+                t_mmap, loaded = common.timeit(storage.load_series, path,
+                                               mmap=True)
+                # One column of 1% of the records in the middle.
+                start = series.index[size // 2]
+                end = series.index[size // 2 + size // 100]
+                t_range, _ = common.timeit(storage.load_series, path,
+                                           start=start, end=end,
+                                           columns=['close'])
+                results.append([
+                    size,
+                    format,
+                    '{:.1f}'.format(os.path.getsize(path) / 2 ** 20),
+                    '{:.3f}'.format(t_save),
+                    '{:.3f}'.format(t_load),
+                    '{:.4f}'.format(t_mmap),
+                    '{:.4f}'.format(t_range),
+                ])
+                del loaded
+                os.unlink(path)
+
+    common.print_results(
+        ['rows', 'format', 'MiB', 'save, s', 'load, s', 'load (mmap), s',
+         '1% of close, s'],
+        results,
+    )
+
+
+if __name__ == '__main__':
+    main()
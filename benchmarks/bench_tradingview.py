@@ -0,0 +1,74 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare row by row and bulk loading of TradingView CSV exports."""
+
+import argparse
+import os
+import tempfile
+
+import pandas as pd
+
+import portfel.data.loaders.tradingview as tv
+
+import common
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument('--sizes', type=int, nargs='+',
+                    default=[10000, 1000000, 10000000],
+                    help='Numbers of rows to test with')
+parser.add_argument('--skip-rows', action='store_true',
+                    help="Don't run the row by row loader (it's slow)")
+parser.add_argument('--no-check', action='store_true',
+                    help="Don't compare results of the two loaders")
+
+
+def main():
+    args = parser.parse_args()
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in args.sizes:
+            path = os.path.join(tmpdir, 'BATS_FOO, 1.csv')
+            common.write_tv_export(path, size)
+            mb = os.path.getsize(path) / 2 ** 20
+
+            t_cols, cols = common.timeit(tv.read_columns, path)
+            if args.skip_rows:
+                t_rows = None
+            else:
+                t_rows, rows = common.timeit(tv.read_rows, path)
+                if not args.no_check:
+                    pd.testing.assert_frame_equal(cols, rows)
+                del rows
+            del cols
+            os.unlink(path)
+
+            results.append([
+                size,
+                '{:.1f}'.format(mb),
+                '-' if t_rows is None else '{:.3f}'.format(t_rows),
+                '{:.3f}'.format(t_cols),
+                '-' if t_rows is None else '{:.1f}x'.format(t_rows / t_cols),
+            ])
+
+    common.print_results(
+        ['rows', 'MiB', 'read_rows, s', 'read_columns, s', 'speedup'],
+        results,
+    )
+
+
+if __name__ == '__main__':
+    main()
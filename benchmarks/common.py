@@ -0,0 +1,84 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Helpers shared by the benchmarks."""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+# Columns of a TradingView export with all the extra fields.
+TV_COLUMNS = [
+    'time', 'open', 'high', 'low', 'close', 'Volume', 'Volume MA',
+    'Earnings period', 'Earnings reported', 'Earnings confirmed',
+    'Earnings estimated', 'Split numerator', 'Split denominator',
+    'Dividends amount',
+]
+
+# Number of rows that are generated and written at once.
+CHUNK_SIZE = 1000000
+
+
+def tv_chunk(start, size, step=60, seed=0):
+    """Generate a chunk of synthetic TradingView export data."""
+    rng = np.random.default_rng(seed + start)
+    close = 100 + np.cumsum(rng.normal(0, 0.1, size))
+    spread = rng.uniform(0, 0.5, size)
+    time = 946684800 + (start + np.arange(size)) * step
+    events = rng.uniform(0, 1, size) < 0.001
+    data = pd.DataFrame({
+        'time': time,
+        'open': np.round(close + rng.normal(0, 0.1, size), 4),
+        'high': np.round(close + spread, 4),
+        'low': np.round(close - spread, 4),
+        'close': np.round(close, 4),
+        'Volume': rng.integers(1000, 100000, size),
+        'Volume MA': np.round(rng.uniform(1000, 100000, size), 2),
+        'Earnings period': np.where(events, time - 86400 * 30, 0),
+        'Earnings reported': np.where(events, 4.44, 0),
+        'Earnings confirmed': np.where(events, 4.38, np.nan),
+        'Earnings estimated': np.where(events, 3.9, np.nan),
+        'Split numerator': np.where(events, 2, 0),
+        'Split denominator': np.where(events, 1, 0),
+        'Dividends amount': np.where(events, 0.5, np.nan),
+    })
+    return data[TV_COLUMNS]
+
+
+def write_tv_export(path, rows, step=60):
+    """Write a synthetic TradingView export with `rows` rows to `path`."""
+    with open(path, 'wt', encoding='utf-8') as f:
+        for start in range(0, rows, CHUNK_SIZE):
+            chunk = tv_chunk(start, min(CHUNK_SIZE, rows - start), step)
+            chunk.to_csv(f, index=False, header=(start == 0))
+
+
+def timeit(func, *args, **kw):
+    """Call the function and return (seconds, result)."""
+    start = time.perf_counter()
+    result = func(*args, **kw)
+    return time.perf_counter() - start, result
+
+
+def print_results(header, rows):
+    """Print benchmark results as a simple table."""
+    widths = [
+        max(len(str(v)) for v in [h] + [r[i] for r in rows])
+        for i, h in enumerate(header)
+    ]
+    print('  '.join(h.rjust(w) for h, w in zip(header, widths)))
+    for row in rows:
+        print('  '.join(str(v).rjust(w) for v, w in zip(row, widths)))
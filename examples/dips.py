@@ -15,41 +15,24 @@
 
 """Calculate the distribution of drops from the all time high."""
 
-import collections
 import os
 
+import portfel.analysis.drawdown as dd
 import portfel.data.repository as r
 
 
 if __name__ == '__main__':
-    SERIES = 'BATS:TSLA'
+    EXCHANGE, TICKER = 'BATS', 'TSLA'
 
     repo_path = os.path.expanduser('~/.portfel')
     repo = r.Repository(repo_path)
-    series = repo.get_series(SERIES, '1d')[1200:]
-
-    high = series[0]['high']
-    low = series[0]['low']
-    drop = None
-    drops = []
-
-    for day in series:
-        if day['low'] < low:
-            low = day['low']
-            drop = (high, low)
-        if day['high'] > high:
-            high = day['high']
-            low = day['low']  # Reset the low.
-            if drop is not None:
-                drops.append(drop)
-                drop = None
-
-    drop_freq = collections.defaultdict(int)
-
-    for high, low in drops:
-        mag = int(100 * (high - low) / high)
-        drop_freq[mag] += 1
-
-    print('Drops since', series[0]['time'])
-    for mag in sorted(drop_freq):
-        print('{:2}%'.format(mag), '*' * drop_freq[mag])
+    series = repo.get_series(EXCHANGE, TICKER, '1d',
+                             columns=['high', 'low'])[1200:]
+
+    episodes = dd.episodes(series)
+    recovered = episodes[episodes['recovery'].notnull()]
+    drop_freq = dd.depth_histogram(recovered)
+
+    print('Drops since', series.index[0])
+    for mag, count in drop_freq.items():
+        print('{:2}%'.format(mag), '*' * count)
@@ -13,16 +13,24 @@
 # You should have received a copy of the GNU General Public License
 # along with Portfel. If not, see <http://www.gnu.org/licenses/>.
 
-"""CLI entry point."""
+"""CLI entry point.
+
+The modules that load pandas and other heavy dependencies are only imported
+by the commands that need them and the repository is opened by the commands,
+so that `--help` and listing the series start quickly. If the repository
+server is running (see `portfel.server`), `ls` and `show` query it instead
+of reading the files.
+
+"""
 
 import argparse
+import glob
 import logging
 import os
 import sys
 
-import portfel.data.loader as ldr
-import portfel.data.repository as repo
-import portfel.display as dis
+import portfel.client as cl
+import portfel.names as names
 
 __all__ = ['main']
 
@@ -91,12 +99,130 @@ def verbose_arg():
 def repository_arg():
     """Return a decorator for --repository option."""
     default = os.getenv('PORTFEL_REPOSITORY', os.path.expanduser('~/.portfel'))
-    return arg('--repository', '-y', default=default, type=repo.Repository,
+    return arg('--repository', '-y', default=default, type=str,
                help='Data repository (default: {})'.format(default))
 
 
+def open_repository(args):
+    """Open the repository given by --repository."""
+    import portfel.data.repository as repo
+
+    return repo.Repository(args.repository)
+
+
+def output_args():
+    """Return a decorator for the options of the commands that print tables.
+
+    The options are passed to `portfel.display.print_table()` by
+    `print_options()`.
+
+    """
+
+    def decorator(func):
+        func = arg('--output-format', default='table',
+                   choices=['table', 'csv', 'jsonl'],
+                   help='Output format (default: table)')(func)
+        func = arg('--offset', default=0, type=int,
+                   help='Skip this many rows of the output')(func)
+        func = arg('--limit', '-n', default=None, type=int,
+                   help='Print at most this many rows')(func)
+        return func
+
+    return decorator
+
+
+def print_options(args):
+    """Return options of `portfel.display.print_table()` from the args."""
+    return {'limit': args.limit, 'offset': args.offset,
+            'format': args.output_format}
+
+
+def symbol(value):
+    """Parse series symbol of the form EXCHANGE:TICKER."""
+    exchange, sep, ticker = value.partition(':')
+    if not sep or not exchange or not ticker:
+        raise argparse.ArgumentTypeError(
+            'Invalid symbol: {} (expected EXCHANGE:TICKER)'.format(value),
+        )
+    return exchange, ticker
+
+
+def column_list(value):
+    """Parse comma-separated list of columns."""
+    return [c.strip() for c in value.split(',') if c.strip()]
+
+
+def _number(value):
+    """Convert string to int if possible or to float."""
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def value_list(value):
+    """Parse a list of numbers: comma-separated or START:STOP:STEP.
+
+    The ranges include STOP if it's reached with the STEP.
+
+    """
+    try:
+        if ':' not in value:
+            return [_number(v) for v in value.split(',')]
+        start, stop, step = map(_number, value.split(':'))
+        if step <= 0:
+            raise ValueError(value)
+        count = int(round((stop - start) / step, 9)) + 1
+        return [start + i * step for i in range(max(count, 0))]
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            'Invalid values: {} (expected A,B,... or START:STOP:STEP)'
+            .format(value),
+        )
+
+
+def param_values(value):
+    """Parse strategy parameter values of the form NAME=VALUES."""
+    name, sep, values = value.partition('=')
+    if not sep or not name:
+        raise argparse.ArgumentTypeError(
+            'Invalid parameter: {} (expected NAME=VALUES)'.format(value),
+        )
+    return name.replace('-', '_'), value_list(values)
+
+
+def _expand_sources(sources, format):
+    """Expand directories and glob patterns in the list of source files."""
+    import portfel.data.loader as ldr
+
+    extension = ldr.LOADERS[format].EXTENSION
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            paths.extend(sorted(
+                os.path.join(source, name) for name in os.listdir(source)
+                if name.endswith(extension)
+            ))
+        elif glob.has_magic(source):
+            paths.extend(sorted(glob.glob(source)))
+        else:
+            paths.append(source)
+    return paths
+
+
+def _progress(done, total, path):
+    """Show import progress if stderr is a terminal."""
+    if sys.stderr.isatty():
+        end = '\n' if done == total else ''
+        sys.stderr.write('\r\033[K[{}/{}] {}{}'.format(
+            done, total, os.path.basename(path), end,
+        ))
+        sys.stderr.flush()
+
+
 @command(aliases=['imps'])
-@arg('source', help='Source data file')
+@arg('sources', nargs='+',
+     help='Source data files, directories or glob patterns')
 @arg('--format', '-f', default='tradingview', type=str,
      help='File format (default: tradingview)')
 @arg('--currency', '-c', default='auto', type=str,
@@ -107,27 +233,249 @@ def repository_arg():
      help='Exchange code, e.g. BATS (default: autodetect)')
 @arg('--ticker', '-t', default='auto', type=str,
      help='Stock ticker, e.g. SPY (default: autodetect)')
+@arg('--jobs', '-j', default=None, type=int,
+     help='Number of parallel loader processes (default: one per CPU)')
+@arg('--chunk-size', default=None, type=int,
+     help='Read the files in chunks of this many records to limit memory '
+          'use (files are then read one at a time)')
 def import_series(args):
     """Import time series data."""
-    series = ldr.load_series(
-        args.source,
+    import portfel.data.loader as ldr
+
+    repository = open_repository(args)
+    paths = _expand_sources(args.sources, args.format)
+    loaded = ldr.load_many(
+        paths,
+        jobs=args.jobs,
+        chunksize=args.chunk_size,
         format=args.format,
         resolution=args.resolution,
         currency=args.currency,
         exchange=args.exchange,
         ticker=args.ticker,
     )
-    args.repository.add_series(series)
+    errors = []
+
+    with repository.batch():
+        for done, (path, series) in enumerate(loaded, 1):
+            _progress(done, len(paths), path)
+            if isinstance(series, Exception):
+                errors.append((path, series))
+                continue
+            try:
+                repository.add_series(series)
+            except Exception as e:
+                errors.append((path, e))
+
+    if errors:
+        sys.stderr.write('Failed to import {} of {} files:\n'
+                         .format(len(errors), len(paths)))
+        for path, error in sorted(errors, key=lambda e: e[0]):
+            sys.stderr.write('  {}: {}\n'.format(path, error))
+        sys.exit(1)
 
 
 @command(aliases=['ls'])
+@output_args()
 def list_series(args):
     """List known time series."""
+    import portfel.data.index as idx
+    import portfel.display as dis
+
+    client = cl.connect(args.repository)
+    if client is None:
+        records = idx.read_records(args.repository)
+    else:
+        with client:
+            records = client.list_series()
     dis.print_table(
-        args.repository.index,
+        records,
         columns=['exchange', 'ticker', 'resolution', 'currency'],
         sort_by=['exchange', 'ticker'],
+        **print_options(args),
+    )
+
+
+@command(aliases=['migrate'])
+@arg('--format', '-f', default=names.DEFAULT_FORMAT,
+     choices=names.STORAGE_FORMATS,
+     help='Storage format (default: {})'.format(names.DEFAULT_FORMAT))
+def migrate_repository(args):
+    """Convert series files in the repository to another storage format."""
+    open_repository(args).convert(args.format)
+
+
+@command(aliases=['show'])
+@arg('symbol', type=symbol, help='Series symbol, e.g. BATS:SPY')
+@arg('--resolution', '-r', default='1d', type=str,
+     help='Time series resolution (default: 1d)')
+@arg('--start', '-s', default=None, type=str,
+     help='Show records from this time on (inclusive)')
+@arg('--end', '-e', default=None, type=str,
+     help='Show records up to this time (inclusive)')
+@arg('--columns', '-c', default=None, type=column_list,
+     help='Comma-separated list of columns to show (default: all)')
+@output_args()
+def show_series(args):
+    """Show time series data."""
+    import portfel.display as dis
+
+    exchange, ticker = args.symbol
+    client = cl.connect(args.repository)
+    source = open_repository(args) if client is None else client
+    key = '{}:{}@{}'.format(exchange, ticker, args.resolution)
+    try:
+        series = source.get_series(
+            exchange,
+            ticker,
+            args.resolution,
+            start=args.start,
+            end=args.end,
+            columns=args.columns,
+        )
+    except KeyError as e:
+        if e.args != (key,):  # Not the series, e.g. an unknown column.
+            raise
+        sys.stderr.write('No such series: {}\n'.format(key))
+        sys.exit(1)
+    finally:
+        if client is not None:
+            client.close()
+    dis.print_table(series, **print_options(args))
+
+
+@command(aliases=['serve'])
+@arg('--memory-cache', default=1024, type=int,
+     help='Size of the memory cache of the series in MiB (default: 1024)')
+def serve_repository(args):
+    """Serve repository queries from a long-running process."""
+    import portfel.server as srv
+
+    srv.serve(args.repository, memory_cache_size=args.memory_cache << 20)
+
+
+@command(aliases=['dips'])
+@arg('symbols', nargs='+', type=symbol,
+     help='Series symbols, e.g. BATS:SPY')
+@arg('--resolution', '-r', default='1d', type=str,
+     help='Time series resolution (default: 1d)')
+@arg('--start', '-s', default=None, type=str,
+     help='Analyze records from this time on (inclusive)')
+@arg('--end', '-e', default=None, type=str,
+     help='Analyze records up to this time (inclusive)')
+@arg('--bin', '-b', default=1, type=int,
+     help='Size of depth histogram bins in percent (default: 1)')
+@arg('--episodes', action='store_true',
+     help='List drawdown episodes instead of the histogram')
+@arg('--unrecovered', action='store_true',
+     help='Include episodes without a recovery yet in the histogram')
+@output_args()
+def drawdown_histogram(args):
+    """Show distribution of drops from the all time high.
+
+    Only the episodes that ended with a new high are counted by default
+    because the depth of the ongoing ones is not final yet.
+
+    """
+    import pandas as pd
+
+    import portfel.analysis.drawdown as dd
+    import portfel.display as dis
+
+    repository = open_repository(args)
+    series_list = (
+        repository.get_series(
+            exchange,
+            ticker,
+            args.resolution,
+            start=args.start,
+            end=args.end,
+            columns=['high', 'low'],
+        )
+        for exchange, ticker in args.symbols
     )
+    episodes = dd.episodes_many(series_list)
+    if args.episodes:
+        dis.print_table(episodes, **print_options(args))
+        return
+
+    if not args.unrecovered:
+        episodes = episodes[episodes['recovery'].notnull()]
+    counts = {
+        '{}:{}'.format(*key): dd.depth_histogram(group, args.bin)
+        for key, group in episodes.groupby(['exchange', 'ticker'], sort=False)
+    }
+    histogram = pd.DataFrame(counts).fillna(0).astype(int)
+    histogram.index.name = 'depth-%'
+    dis.print_table(histogram, **print_options(args))
+
+
+@command(aliases=['sweep'])
+@arg('symbol', type=symbol, help='Series symbol, e.g. BATS:SPY')
+@arg('--resolution', '-r', default='1d', type=str,
+     help='Time series resolution (default: 1d)')
+@arg('--strategy', '-t', default='averaging', choices=names.STRATEGIES,
+     help='Strategy (default: averaging)')
+@arg('--param', '-p', default=[], action='append', type=param_values,
+     help='Strategy parameter values, e.g. dip-pct=1:10:1 or '
+          'invest-pct=50,100 (can be repeated)')
+@arg('--starting-cash', default=[10000], type=value_list,
+     help='Starting cash values (default: 10000)')
+@arg('--monthly-cash', default=[1000], type=value_list,
+     help='Monthly inflow values (default: 1000)')
+@arg('--years', default=[10], type=value_list,
+     help='Backtest window lengths in years (default: 10)')
+@arg('--step', default=1, type=int,
+     help='Step between the starts of the windows in bars (default: 1)')
+@arg('--jobs', '-j', default=None, type=int,
+     help='Number of parallel processes (default: one per CPU)')
+@arg('--output', '-o', default=None, type=str,
+     help='Also write the results to this CSV file as they come')
+@output_args()
+def sweep_parameters(args):
+    """Backtest a strategy with all combinations of parameters."""
+    import portfel.display as dis
+    import portfel.sweep as sw
+
+    exchange, ticker = args.symbol
+    configs = [
+        {
+            'exchange': exchange,
+            'ticker': ticker,
+            'resolution': args.resolution,
+            'strategy': args.strategy,
+            'params': params,
+            'starting-cash': config['starting_cash'],
+            'monthly-cash': config['monthly_cash'],
+            'years': config['years'],
+            'step': args.step,
+        }
+        for config in sw.grid(starting_cash=args.starting_cash,
+                              monthly_cash=args.monthly_cash,
+                              years=args.years)
+        for params in sw.grid(**dict(args.param))
+    ]
+
+    output = open(args.output, 'w') if args.output else None
+    results = []
+    try:
+        stream = sw.sweep(open_repository(args), configs, jobs=args.jobs)
+        for done, result in enumerate(stream, 1):
+            _progress(done, len(configs), args.strategy)
+            results.append(result)
+            if output is not None:
+                sw.results_table([result]).to_csv(
+                    output, header=done == 1, index=False,
+                )
+                output.flush()
+    finally:
+        if output is not None:
+            output.close()
+
+    table = sw.results_table(results)
+    dis.print_table(table.drop(columns=['exchange', 'ticker', 'resolution',
+                                        'strategy', 'step']),
+                    **print_options(args))
 
 
 def _configure_logging(args):
@@ -0,0 +1,134 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Drawdown analysis.
+
+A drawdown episode starts at a bar that makes a new all time high (the peak)
+and lasts until the next bar that makes a new all time high (the recovery).
+The trough of the episode is the lowest low of the bars after the peak up to
+and including the recovery. Episodes where no bar goes below the low of the
+peak bar are not considered drawdowns.
+
+All calculations are done with array operations over the whole series.
+
+"""
+
+import numpy as np
+import pandas as pd
+
+# Fields of the episodes data frame.
+EPISODE_FIELDS = [
+    'start',        # Time of the peak bar
+    'peak',         # High of the peak bar
+    'trough-time',  # Time of the bar with the lowest low
+    'trough',       # Lowest low
+    'recovery',     # Time of the bar that made a new high (NaT if none yet)
+    'depth',        # Relative depth of the drawdown: 1 - trough / peak
+    'duration',     # Time from the peak to the recovery (or the last bar)
+]
+
+
+def running_peak(column):
+    """Calculate running maximum of the column (missing values skipped)."""
+    return column.cummax()
+
+
+def drawdown(series):
+    """Calculate drawdown of every bar from the running peak.
+
+    The result is the relative distance from the highest high so far to the
+    low of the bar.
+
+    """
+    return 1 - series['low'] / running_peak(series['high'])
+
+
+def episodes(series):
+    """Find drawdown episodes of the series.
+
+    Returns a data frame with EPISODE_FIELDS.
+
+    """
+    high = series['high'].to_numpy(dtype=float)
+    low = series['low'].to_numpy(dtype=float)
+    time = series.index
+    n = len(high)
+    if n < 2:
+        return pd.DataFrame({f: [] for f in EPISODE_FIELDS})
+
+    is_peak = np.empty(n, dtype=bool)
+    is_peak[0] = True
+    is_peak[1:] = high[1:] > np.fmax.accumulate(high)[:-1]
+
+    # Each episode covers the bars start + 1 ... end (inclusive), where end is
+    # the next peak or the last bar. The last peak may have no bars after it.
+    starts = np.flatnonzero(is_peak)
+    ends = np.append(starts[1:], n - 1)
+    starts, ends = starts[starts < ends], ends[starts < ends]
+    troughs = np.fmin.reduceat(low, starts + 1)
+
+    # Position of the first lowest low in every episode.
+    episode_of = np.searchsorted(starts + 1, np.arange(n), 'right') - 1
+    at_trough = (episode_of >= 0) & (low == troughs[episode_of])
+    found, first = np.unique(episode_of[at_trough], return_index=True)
+    trough_pos = np.zeros(len(starts), dtype=int)
+    trough_pos[found] = np.flatnonzero(at_trough)[first]
+
+    keep = troughs < low[starts]
+    starts, ends = starts[keep], ends[keep]
+    troughs, trough_pos = troughs[keep], trough_pos[keep]
+    recovered = is_peak[ends]
+    recovery = time[ends].where(recovered)
+    peaks = high[starts]
+
+    return pd.DataFrame({
+        'start': time[starts],
+        'peak': peaks,
+        'trough-time': time[trough_pos],
+        'trough': troughs,
+        'recovery': recovery,
+        'depth': 1 - troughs / peaks,
+        'duration': recovery.fillna(time[-1]) - time[starts],
+    })
+
+
+def episodes_many(series_list):
+    """Find drawdown episodes of many series.
+
+    Returns episodes of all series in one data frame with two extra columns:
+    'exchange' and 'ticker'.
+
+    """
+    frames = []
+    for series in series_list:
+        frame = episodes(series)
+        frame.insert(0, 'exchange', series.exchange)
+        frame.insert(1, 'ticker', series.ticker)
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame({f: [] for f in ['exchange', 'ticker']
+                             + EPISODE_FIELDS})
+    return pd.concat(frames, ignore_index=True)
+
+
+def depth_histogram(episodes, bin_pct=1):
+    """Count episodes by depth.
+
+    The depths are put into bins of `bin_pct` percent. Returns a series of
+    counts indexed by the lower bound of each bin in percent.
+
+    """
+    bins = (episodes['depth'] * 100 // bin_pct).astype(int) * bin_pct
+    return bins.value_counts().sort_index()
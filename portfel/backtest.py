@@ -0,0 +1,262 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Backtesting of simple investment strategies.
+
+A strategy is described by an array of fractions: at the opening of each bar
+the given fraction of the available cash is invested at the opening price.
+Additionally, cash can flow in at the first bar of each month and dividends
+are paid in cash at the end of the bar.
+
+With this model the effect of each bar on the state vector (cash, shares, 1)
+is an affine map that can be represented by a 3x3 matrix. The outcome of a
+backtest over a window of bars is the product of the matrices of its bars
+applied to the starting state. When many overlapping windows are evaluated,
+the products are assembled from shared partial products (see
+`_apply_windows()`), so the total work doesn't grow with the window length.
+
+"""
+
+import numpy as np
+import pandas as pd
+
+import portfel.data.windows as windows
+import portfel.names as names
+
+# Fields of the backtest results data frame.
+RESULT_FIELDS = [
+    'start',     # Time of the first bar of the window
+    'end',       # Time of the last bar of the window
+    'invested',  # Starting cash + monthly inflows
+    'cash',      # Cash at the end
+    'shares',    # Shares at the end
+    'value',     # Cash + value of the shares at the last close
+    'gain',      # value / invested - 1
+]
+
+
+def averaging(series):
+    """Invest all available cash at every bar."""
+    return np.ones(len(series))
+
+
+def buy_dip(series, dip_pct, invest_pct):
+    """Invest a part of the cash when the price goes below the high by X%.
+
+    The high is the highest opening price so far; after each dip it's reset
+    to the price of the dip, so a further drop by X% triggers another buy.
+    All cash is invested at the first bar.
+
+    """
+    dip_size = dip_pct / 100.0
+    inv_size = invest_pct / 100.0
+    fractions = np.zeros(len(series))
+    hi = None
+    # The reset after a dip makes this path-dependent, so it's a loop. It only
+    # runs once per series though, not once per backtest window.
+    for i, price in enumerate(series['open'].tolist()):
+        if not price == price:  # Missing data.
+            continue
+        if hi is None:
+            hi = price
+            fractions[i] = 1
+        elif price > hi:
+            hi = price
+        elif price < hi * (1 - dip_size):
+            hi = price
+            fractions[i] = inv_size
+    return fractions
+
+
+# Strategies by name. They are called with the series and strategy parameters
+# as keyword arguments and return the fractions for `backtest()`.
+STRATEGIES = {
+    name: globals()[name.replace('-', '_')] for name in names.STRATEGIES
+}
+
+
+def quarterly_dividends(series, div_yield):
+    """Pay opening price * div_yield / 4 at the last bar of each quarter."""
+    index = series.index
+    quarter = index.year * 4 + (index.month - 1) // 3
+    last = np.append(quarter[1:] != quarter[:-1], True)
+    return np.where(last, series['open'] * div_yield / 4, 0.0)
+
+
+def inflow_bars(index):
+    """Mark the first bar of each month."""
+    month = index.year * 12 + index.month
+    first = np.empty(len(index), dtype=bool)
+    first[:1] = index[:1].day == 1
+    first[1:] = month[1:] != month[:-1]
+    return first
+
+
+def _transitions(opens, fractions, inflows, dividends):
+    """Calculate transition matrices of all bars.
+
+    For inflow m, invested fraction f, opening price o and dividend d the
+    state (c, s, 1) changes as:
+
+        c' = a * (c + m) + d * s, where a = (1 - f) + d * f / o
+        s' = s + f / o * (c + m)
+
+    """
+    valid = np.isfinite(opens)
+    f = np.where(valid, fractions, 0.0)
+    d = np.where(valid, dividends, 0.0)
+    b = np.divide(f, opens, out=np.zeros(len(f)), where=valid)
+    a = (1 - f) + d * b
+
+    ret = np.zeros((len(opens), 3, 3))
+    ret[:, 0, 0] = a
+    ret[:, 0, 1] = d
+    ret[:, 0, 2] = a * inflows
+    ret[:, 1, 0] = b
+    ret[:, 1, 1] = 1
+    ret[:, 1, 2] = b * inflows
+    ret[:, 2, 2] = 1
+    return ret
+
+
+def _apply(matrices, states):
+    """Multiply a stack of matrices by a stack of vectors."""
+    return np.einsum('nij,nj->ni', matrices, states)
+
+
+def _apply_windows(matrices, states, firsts, lasts):
+    """Apply the products of matrices of each window to its state.
+
+    The window `i` covers the bars from `firsts[i]` to `lasts[i]` (inclusive,
+    empty if `lasts[i] < firsts[i]`). The windows must be at least `size` bars
+    long, where `size` is the length of the shortest non-empty one, so each of
+    them contains a pivot bar at a multiple of `size`. The product for the
+    window is then assembled from two partial products that are shared by all
+    windows around the same pivot: the one from the first bar to the pivot and
+    the one from the pivot to the last bar.
+
+    """
+    states = states.copy()
+    todo = np.flatnonzero(lasts >= firsts)
+    if len(todo) == 0:
+        return states
+    firsts, lasts = firsts[todo], lasts[todo]
+    size = (lasts - firsts).min() + 1
+    pivots = -(-firsts // size) * size
+    pivots, pivot_of = np.unique(pivots, return_inverse=True)
+
+    # Products from the bars before the pivots up to the pivots.
+    lead = np.empty((len(pivots), size, 3, 3))
+    lead[:, 0] = matrices[pivots]
+    for k in range(1, size):
+        lead[:, k] = lead[:, k - 1] @ matrices[np.maximum(pivots - k, 0)]
+    ret = _apply(lead[pivot_of, pivots[pivot_of] - firsts], states[todo])
+
+    # Products from the bars after the pivots up to the window ends, applied
+    # to the windows in the order of their ends.
+    offsets = lasts - pivots[pivot_of]
+    order = np.argsort(offsets, kind='stable')
+    bounds = np.searchsorted(offsets[order], np.arange(offsets.max() + 1),
+                             side='right')
+    tail = np.broadcast_to(np.eye(3), (len(pivots), 3, 3))
+    last_bar = len(matrices) - 1
+    done = 0
+    for k, bound in enumerate(bounds):
+        if k:
+            tail = matrices[np.minimum(pivots + k, last_bar)] @ tail
+        selected = order[done:bound]
+        ret[selected] = _apply(tail[pivot_of[selected]], ret[selected])
+        done = bound
+
+    states[todo] = ret
+    return states
+
+
+def backtest(series, fractions, starting_cash, monthly_cash=0, period=None,
+             step=1, dividends=None):
+    """Backtest a strategy over rolling windows of the series.
+
+    `fractions` are the fractions of cash to invest at each bar (see
+    `averaging()` and `buy_dip()`). In every window all the starting cash is
+    invested at the first bar. If `period` is None, there's one window that
+    covers the whole series, otherwise see `portfel.data.windows.bounds()`.
+
+    `dividends` are the dividends per share for each bar. By default the
+    'dividend' column of the series is used if there is one.
+
+    Returns a data frame with RESULT_FIELDS, one row per window.
+
+    """
+    n = len(series)
+    index = series.index
+    if n == 0:
+        return pd.DataFrame({f: [] for f in RESULT_FIELDS})
+    if period is None:
+        starts, ends = np.array([0]), np.array([n - 1])
+    else:
+        starts, stops = windows.bounds(index, period, step)
+        ends = stops - 1
+
+    opens = series['open'].to_numpy(dtype=float)
+    closes = series['close'].ffill().to_numpy(dtype=float)
+    if dividends is None:
+        if 'dividend' in series:
+            dividends = series['dividend'].fillna(0).to_numpy(dtype=float)
+        else:
+            dividends = np.zeros(n)
+    inflows = np.where(inflow_bars(index), float(monthly_cash), 0.0)
+    matrices = _transitions(opens, np.asarray(fractions, dtype=float),
+                            inflows, dividends)
+
+    # The first bar of each window invests everything.
+    firsts = _transitions(opens[starts], np.ones(len(starts)),
+                          inflows[starts], dividends[starts])
+    states = np.zeros((len(starts), 3))
+    states[:, 0] = starting_cash
+    states[:, 2] = 1
+    states = _apply(firsts, states)
+    states = _apply_windows(matrices, states, starts + 1, ends)
+
+    total_inflow = np.cumsum(inflows)
+    invested = (starting_cash + total_inflow[ends] - total_inflow[starts]
+                + inflows[starts])
+    value = states[:, 0] + states[:, 1] * closes[ends]
+    return pd.DataFrame({
+        'start': index[starts],
+        'end': index[ends],
+        'invested': invested,
+        'cash': states[:, 0],
+        'shares': states[:, 1],
+        'value': value,
+        'gain': value / invested - 1,
+    })
+
+
+def summary(results, years):
+    """Calculate mean gains of backtest results.
+
+    The log-mean is the geometric mean of the gains. Annualized values assume
+    that the windows are `years` long.
+
+    """
+    gain = results['gain']
+    mean = gain.mean()
+    log_mean = np.expm1(np.log1p(gain).mean())
+    return {
+        'mean': mean,
+        'mean-pa': (1 + mean) ** (1 / years) - 1,
+        'log-mean': log_mean,
+        'log-mean-pa': (1 + log_mean) ** (1 / years) - 1,
+    }
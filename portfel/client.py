@@ -0,0 +1,163 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Client of the repository server (see `portfel.server`).
+
+Messages in both directions are framed as two big-endian uint32 (sizes of
+the header and of the payload), a JSON header and a binary payload. Series
+are sent in the binary storage format (see `portfel.data.formats.binary`),
+so they are decoded without parsing.
+
+This module doesn't import pandas unless series are requested, so that the
+command line interface can use it to list the series quickly.
+
+"""
+
+import json
+import os
+import socket
+import struct
+
+# File name of the server socket in the repository directory.
+SOCKET_NAME = 'serve.sock'
+
+FRAME = struct.Struct('!II')
+
+
+def socket_path(repository_path):
+    """Return path of the server socket of the repository."""
+    return os.path.join(repository_path, SOCKET_NAME)
+
+
+def _receive_exactly(sock, size):
+    """Receive `size` bytes into a bytearray (None if the peer is gone)."""
+    ret = bytearray(size)
+    view = memoryview(ret)
+    while view:
+        received = sock.recv_into(view)
+        if received == 0:
+            return None
+        view = view[received:]
+    return ret
+
+
+def send_message(sock, header, payload=b''):
+    """Send a message with JSON header and binary payload."""
+    data = json.dumps(header).encode('utf-8')
+    sock.sendall(FRAME.pack(len(data), len(payload)) + data)
+    if payload:
+        sock.sendall(payload)
+
+
+def receive_message(sock):
+    """Receive a message, return (header, payload) or None at the end."""
+    frame = _receive_exactly(sock, FRAME.size)
+    if frame is None:
+        return None
+    header_size, payload_size = FRAME.unpack(frame)
+    header = _receive_exactly(sock, header_size)
+    payload = _receive_exactly(sock, payload_size)
+    if header is None or payload is None:
+        raise ConnectionError('Connection closed in the middle of a message')
+    return json.loads(header.decode('utf-8')), payload
+
+
+def _error(header):
+    """Make an exception from the error response."""
+    if header['error'] == 'KeyError':
+        return KeyError(header['message'])
+    if header['error'] == 'ValueError':
+        return ValueError(header['message'])
+    return Exception('{}: {}'.format(header['error'], header['message']))
+
+
+class Client:
+    """Connection to the repository server.
+
+    The methods mirror the ones of `portfel.data.repository.Repository`.
+
+    """
+
+    def __init__(self, path):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.sock.connect(path)
+        except OSError:
+            self.sock.close()
+            raise
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _request(self, header):
+        """Send a request and return (header, payload) of the response."""
+        send_message(self.sock, header)
+        response = receive_message(self.sock)
+        if response is None:
+            raise ConnectionError('Server closed the connection')
+        if not response[0]['ok']:
+            raise _error(response[0])
+        return response
+
+    def list_series(self):
+        """Return the index records as dicts of strings."""
+        return self._request({'op': 'list'})[0]['records']
+
+    def get_series(self, exchange, ticker, resolution, start=None, end=None,
+                   columns=None, events=False, adjusted=False):
+        """Load series from the server.
+
+        The columns of the returned series are views of the received data
+        (except for string columns).
+
+        """
+        import portfel.data.formats.binary as binary
+
+        header, payload = self._request({
+            'op': 'get',
+            'exchange': exchange,
+            'ticker': ticker,
+            'resolution': resolution,
+            'start': None if start is None else str(start),
+            'end': None if end is None else str(end),
+            'columns': columns,
+            'events': events,
+            'adjusted': adjusted,
+        })
+        ret = binary.loads(payload)
+        for key, value in header['metadata'].items():
+            setattr(ret, key, value)
+        return ret
+
+    def stop(self):
+        """Stop the server."""
+        self._request({'op': 'stop'})
+
+
+def connect(repository_path):
+    """Connect to the server of the repository (None if it's not running)."""
+    path = socket_path(repository_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        return Client(path)
+    except OSError:  # Left over from a server that is gone.
+        return None
@@ -0,0 +1,112 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Split and dividend adjustment of prices.
+
+Adjusted prices make the whole history comparable with the latest prices.
+Prices before a split of 'n/d' (n new shares for d old ones) are multiplied
+by d/n and volumes by n/d. Prices before a dividend D are multiplied by
+1 - D / C, where C is the previous close (adjusted for a split on the same
+bar).
+
+Each bar has a factor that applies to all the bars before it. These are kept
+as forward cumulative products G, so that new bars only extend them, and the
+prices of bar i are adjusted by G[-1] / G[i].
+
+"""
+
+import numpy as np
+import pandas as pd
+
+import portfel.data.series as ds
+
+PRICE_COLUMNS = ['open', 'close', 'high', 'low']
+
+# Columns of the series of cumulative factors.
+FACTOR_COLUMNS = ['price-factor', 'volume-factor']
+
+
+def split_ratios(splits):
+    """Convert 'n/d' splits to n / d (1 where there is no split)."""
+    ret = np.ones(len(splits))
+    for i in np.flatnonzero(pd.notnull(splits)):
+        n, d = splits[i].split('/')
+        ret[i] = int(n) / int(d)
+    return ret
+
+
+def bar_factors(close, dividends, splits):
+    """Compute price and volume factors of the bars.
+
+    `close` and `dividends` are float arrays (NaN means no dividend) and
+    `splits` is an object array of 'n/d' strings or missing values.
+
+    """
+    ratios = split_ratios(splits)
+    previous = np.empty(len(close))
+    previous[:1] = np.nan
+    previous[1:] = close[:-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dividend = 1 - np.nan_to_num(dividends) * ratios / previous
+    dividend = np.where(np.isfinite(dividend) & (dividend > 0), dividend, 1.0)
+    return dividend / ratios, ratios
+
+
+def cumulative_factors(bars, start=None):
+    """Compute cumulative factors for the bars.
+
+    `bars` need 'close', 'dividend' and 'split' columns. If `start` (the
+    cumulative price and volume factors of the first bar) is given, the first
+    bar is only used for its close and the factors of the following bars are
+    returned.
+
+    """
+    price, volume = bar_factors(
+        bars['close'].to_numpy(dtype=float),
+        bars['dividend'].to_numpy(dtype=float),
+        bars['split'].to_numpy(dtype=object),
+    )
+    time = bars.index
+    if start is not None:
+        price, volume, time = price[1:], volume[1:], time[1:]
+    else:
+        start = 1.0, 1.0
+    ret = ds.Series({
+        'time': time,
+        'price-factor': start[0] * np.cumprod(price),
+        'volume-factor': start[1] * np.cumprod(volume),
+    })
+    for key in ret._metadata:
+        setattr(ret, key, getattr(bars, key, None))
+    return ret
+
+
+def adjust(series, factors, last):
+    """Adjust prices and volumes of the series.
+
+    `factors` are the cumulative factors of the bars of the series and `last`
+    is the row of cumulative factors of the latest stored bar.
+
+    """
+    factors = factors.reindex(series.index)
+    ret = series.copy()
+    for name in PRICE_COLUMNS:
+        if name in ret:
+            ret[name] = ret[name] * (last['price-factor'] /
+                                     factors['price-factor'])
+    if 'volume' in ret:
+        ret['volume'] = ret['volume'] * (last['volume-factor'] /
+                                         factors['volume-factor'])
+    return ret
@@ -0,0 +1,104 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""In-memory cache of loaded series."""
+
+import collections
+import threading
+
+
+class SeriesCache:
+    """LRU cache of series with a limit on their total size in bytes.
+
+    The keys are tuples where the first item identifies the security (see
+    `invalidate()`) and the rest describe the version of the data and the
+    query. The cache can be used from multiple threads.
+
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def stats(self):
+        """Statistics of the cache as a dict."""
+        return {
+            'entries': len(self._entries),
+            'size': self.size,
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+    def get(self, key):
+        """Return cached series or None.
+
+        The returned series shares the data with the cached one, so it should
+        not be modified in place.
+
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return entry[0].copy(deep=False)
+
+    def put(self, key, series):
+        """Add series to the cache evicting least recently used ones.
+
+        Series that are larger than the capacity are not cached.
+
+        """
+        size = int(series.memory_usage(index=True, deep=True).sum())
+        if size > self.capacity:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = series, size
+            self.size += size
+            while self.size > self.capacity:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        """Remove an entry if it's there."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def invalidate(self, ident):
+        """Remove all entries where the first item of the key is `ident`."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == ident]:
+                self._remove(key)
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
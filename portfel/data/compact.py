@@ -0,0 +1,196 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Compact in-memory representation of series.
+
+Series normally keep every column as float64 (or Python objects for splits
+and timestamps for earnings periods). A compact series keeps:
+
+- the time as int64 nanoseconds since the epoch,
+- dense float columns as float32 when that keeps the values within the
+  relative tolerance, and whole-number columns as the smallest integer type,
+- sparse columns (fewer than EVENT_DENSITY of non-missing values, e.g.
+  dividends, splits and earnings) in separate event tables with the times
+  and the values of the events only. Splits are stored as two integer columns
+  and earnings periods as int64 epoch nanoseconds.
+
+"""
+
+import numpy as np
+import pandas as pd
+
+import portfel.data.series as ds
+
+# Default relative tolerance for converting float64 values to float32.
+DEFAULT_RTOL = 1e-6
+
+# Columns with fewer non-missing values than this fraction become events.
+EVENT_DENSITY = 0.1
+
+# Integer types to try for whole-number columns, smallest first.
+INT_TYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+def _compact_values(values, rtol):
+    """Convert float64 values to a smaller type if they survive it."""
+    finite = np.isfinite(values)
+    if finite.all() and (values == np.round(values)).all():
+        for dtype in INT_TYPES:
+            info = np.iinfo(dtype)
+            if len(values) == 0 or (values.min() >= info.min and
+                                    values.max() <= info.max):
+                return values.astype(dtype)
+    with np.errstate(over='ignore'):
+        single = values.astype(np.float32)
+    if np.allclose(single, values, rtol=rtol, atol=0, equal_nan=True):
+        return single
+    return values
+
+
+def _split_parts(splits):
+    """Split 'n/d' strings into numerator and denominator arrays."""
+    parts = [s.split('/') for s in splits]
+    return (np.array([int(n) for n, _ in parts], dtype=np.int32),
+            np.array([int(d) for _, d in parts], dtype=np.int32))
+
+
+def _event_table(name, time, values, rtol):
+    """Make event table of the non-missing values of the column."""
+    present = pd.notnull(values)
+    table = {'time': time[present]}
+    values = values[present]
+    if name == 'split':
+        table['split-num'], table['split-den'] = _split_parts(values)
+    elif values.dtype.kind == 'M':
+        table[name] = values.view(np.int64)
+    else:
+        table[name] = _compact_values(values.astype(float), rtol)
+    return table
+
+
+class CompactSeries:
+    """Series in the compact representation (see the module docstring).
+
+    `time` is an int64 array, `columns` is a dict of dense column arrays and
+    `events` is a dict of event tables, which are dicts of arrays with 'time'
+    and the values. `timestamps` are the names of the columns that hold
+    timestamps (as int64). Use `to_series()` to get a normal series back.
+
+    """
+
+    def __init__(self, time, columns, events, timestamps, order, metadata):
+        self.time = time
+        self.columns = columns
+        self.events = events
+        self.timestamps = timestamps
+        self.order = order
+        self.metadata = metadata
+
+    @classmethod
+    def from_series(cls, series, rtol=DEFAULT_RTOL):
+        """Make compact series from a normal one."""
+        time = series.index.asi8.copy()
+        columns = {}
+        events = {}
+        for name in series.columns:
+            values = series[name].to_numpy()
+            density = pd.notnull(values).mean() if len(values) else 1
+            if density < EVENT_DENSITY or values.dtype == object:
+                events[name] = _event_table(name, time, values, rtol)
+            elif values.dtype.kind == 'M':
+                columns[name] = values.view(np.int64)
+            elif values.dtype.kind == 'f':
+                columns[name] = _compact_values(values, rtol)
+            else:
+                columns[name] = values
+        timestamps = {name for name, dtype in series.dtypes.items()
+                      if dtype.kind == 'M'}
+        metadata = {k: getattr(series, k, None) for k in series._metadata}
+        return cls(time, columns, events, timestamps, list(series.columns),
+                   metadata)
+
+    def __len__(self):
+        return len(self.time)
+
+    @property
+    def nbytes(self):
+        """Total size of the arrays in bytes."""
+        return self.time.nbytes + sum(
+            self.memory_usage(name) for name in self.order
+        )
+
+    def memory_usage(self, name):
+        """Size of the arrays of the column in bytes."""
+        if name in self.columns:
+            return self.columns[name].nbytes
+        return sum(values.nbytes for values in self.events[name].values())
+
+    def _expand(self, name):
+        """Convert events back to a full column."""
+        table = self.events[name]
+        positions = np.searchsorted(self.time, table['time'])
+        if name == 'split':
+            ret = np.full(len(self), None, dtype=object)
+            ret[positions] = ['{}/{}'.format(n, d) for n, d
+                              in zip(table['split-num'], table['split-den'])]
+            return ret
+        if name in self.timestamps:
+            ret = np.full(len(self), np.datetime64('NaT'), dtype='M8[ns]')
+            ret[positions] = table[name].view('M8[ns]')
+            return ret
+        ret = np.full(len(self), np.nan)
+        ret[positions] = table[name]
+        return ret
+
+    def to_series(self):
+        """Convert back to a normal series (with float64 columns)."""
+        data = {'time': pd.to_datetime(self.time)}
+        for name in self.order:
+            if name in self.events:
+                data[name] = self._expand(name)
+            elif name in self.timestamps:
+                data[name] = self.columns[name].view('M8[ns]')
+            elif self.columns[name].dtype.kind in 'iuf':
+                data[name] = self.columns[name].astype(float)
+            else:
+                data[name] = self.columns[name]
+        ret = ds.Series(data)
+        for k, v in self.metadata.items():
+            setattr(ret, k, v)
+        return ret
+
+
+def memory_report(series, rtol=DEFAULT_RTOL):
+    """Compare memory usage of the series in normal and compact modes.
+
+    Returns a data frame with bytes used by each column (and the time index)
+    in both modes and a total row.
+
+    """
+    compact = CompactSeries.from_series(series, rtol=rtol)
+    normal = series.memory_usage(index=True, deep=True)
+    rows = [['time', normal['Index'], compact.time.nbytes, 'int64']]
+    for name in series.columns:
+        if name in compact.events:
+            kind = 'events ({})'.format(len(compact.events[name]['time']))
+        else:
+            kind = str(compact.columns[name].dtype)
+        rows.append([name, normal[name], compact.memory_usage(name), kind])
+    report = pd.DataFrame(rows, columns=['column', 'normal', 'compact',
+                                         'compact-type'])
+    total = pd.DataFrame([['total', report['normal'].sum(),
+                           report['compact'].sum(), '']],
+                         columns=report.columns)
+    return pd.concat([report, total], ignore_index=True)
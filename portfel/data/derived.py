@@ -0,0 +1,183 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""On-disk cache of derived series.
+
+Derived series (e.g. resampled to a coarser resolution) are stored in a
+subdirectory of the repository with their own index. Each record remembers
+the revision of the source series (see `portfel.data.index`) at the moment of
+derivation, so the cached series is rebuilt when the source changes. When the
+total size of the cached files exceeds the capacity, the least recently used
+ones are removed.
+
+The index of the cache is updated under a lock and reloaded before each
+update, so processes that share the cache don't lose each other's entries.
+Reading a cached series doesn't write the index: the times of use are kept in
+memory and saved with the next update or by `flush()`.
+
+"""
+
+import contextlib
+import os
+import time
+
+import pandas as pd
+
+import portfel.data.locking as locking
+import portfel.data.storage as storage
+
+# Fields of the index of the cache.
+INDEX_FIELDS = [
+    'exchange',           # Exchange
+    'ticker',             # Ticker
+    'resolution',         # Time resolution of the derived series
+    'source-resolution',  # Time resolution of the source series
+    'source-revision',    # Revision of the source series
+    'filename',           # File name
+    'size',               # File size in bytes
+    'last-used',          # Time of the last access (epoch seconds)
+]
+
+# Default capacity of the cache in bytes.
+DEFAULT_CAPACITY = 1 << 30
+
+
+class DerivedCache:
+    """Cache of derived series in a directory."""
+
+    def __init__(self, path, format=storage.DEFAULT_FORMAT,
+                 capacity=DEFAULT_CAPACITY):
+        self.path = path
+        self.format = format
+        self.capacity = capacity
+        self._index_path = os.path.join(path, 'index.csv')
+        self._lock_path = os.path.join(path, 'index.lock')
+        self._used = {}
+        self._load_index()
+
+    def _load_index(self):
+        """Load the index of the cache."""
+        self._records = {}
+        if not os.path.exists(self._index_path):
+            return
+        index = pd.read_csv(
+            self._index_path,
+            usecols=lambda c: c in INDEX_FIELDS,
+            dtype={'exchange': str, 'ticker': str, 'resolution': str,
+                   'source-resolution': str},
+        )
+        for rec in index.to_dict('records'):
+            self._records[rec['exchange'], rec['ticker'],
+                          rec['resolution']] = rec
+
+    def _save_index(self):
+        """Save the index of the cache."""
+        index = pd.DataFrame(list(self._records.values()),
+                             columns=INDEX_FIELDS)
+        with locking.replacing(self._index_path) as tmp_path:
+            index.to_csv(tmp_path, index=False)
+
+    @contextlib.contextmanager
+    def _updating(self):
+        """Lock and reload the index, then save it at the end.
+
+        The times of use kept in memory are saved too.
+
+        """
+        os.makedirs(self.path, exist_ok=True)
+        with locking.locked(self._lock_path, create=True):
+            self._load_index()
+            for key, last_used in self._used.items():
+                if key in self._records:
+                    rec = self._records[key]
+                    rec['last-used'] = max(rec['last-used'], last_used)
+            yield
+            self._save_index()
+            self._used = {}
+
+    def flush(self):
+        """Save the times of use of the cached series."""
+        if self._used:
+            with self._updating():
+                pass
+
+    @staticmethod
+    def _is_valid(rec, source):
+        """Check if cached series was derived from the current source."""
+        return (
+            rec['source-resolution'] == source['resolution'] and
+            rec.get('source-revision') == source['revision']
+        )
+
+    def get(self, key, source, **options):
+        """Load cached series by key or return None.
+
+        `key` is (exchange, ticker, resolution) and `source` is the index
+        record of the source series. Options are passed to
+        `storage.load_series()`.
+
+        """
+        rec = self._records.get(key)
+        if rec is None or not self._is_valid(rec, source):
+            self._load_index()  # Maybe another process has made it.
+            rec = self._records.get(key)
+            if rec is None or not self._is_valid(rec, source):
+                return None
+        data_path = os.path.join(self.path, rec['filename'])
+        try:
+            series = storage.load_series(data_path, **options)
+        except FileNotFoundError:  # Evicted by another process.
+            return None
+        self._used[key] = time.time()
+        return series
+
+    def put(self, key, source, series):
+        """Store derived series and evict old ones if over capacity."""
+        base = '{}_{}_{}'.format(*key)
+        filename = storage.filename(base, self.format)
+        data_path = os.path.join(self.path, filename)
+        os.makedirs(self.path, exist_ok=True)
+        storage.save_series(data_path, series)
+        with self._updating():
+            self._add_record(key, source, filename)
+
+    def _add_record(self, key, source, filename):
+        """Add index record for a new file and evict the old ones."""
+        self._records[key] = {
+            'exchange': key[0],
+            'ticker': key[1],
+            'resolution': key[2],
+            'source-resolution': source['resolution'],
+            'source-revision': source['revision'],
+            'filename': filename,
+            'size': os.path.getsize(os.path.join(self.path, filename)),
+            'last-used': time.time(),
+        }
+        self._evict(keep=key)
+
+    def _evict(self, keep):
+        """Remove least recently used series until within capacity."""
+        total = sum(rec['size'] for rec in self._records.values())
+        by_age = sorted(self._records.items(),
+                        key=lambda item: item[1]['last-used'])
+        for key, rec in by_age:
+            if total <= self.capacity:
+                break
+            if key == keep:
+                continue
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(os.path.join(self.path, rec['filename']))
+            del self._records[key]
+            total -= rec['size']
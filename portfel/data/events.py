@@ -0,0 +1,92 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Corporate events: dividends, splits and earnings.
+
+Events are rare compared to bars, so the repository keeps them in a separate
+table per ticker with one row per event time instead of mostly empty columns
+of the bar series. These functions split them out of series and put them
+back.
+
+"""
+
+import numpy as np
+import pandas as pd
+
+# Event columns in the order they appear in series.
+EVENT_COLUMNS = [
+    'earnings-period',
+    'earnings',
+    'earnings-estimate',
+    'dividend',
+    'split',
+]
+
+
+def split_events(series):
+    """Split series into bars and events.
+
+    Returns the series without event columns and a series with event columns
+    and only the rows that have at least one event (None if the series has no
+    event columns).
+
+    """
+    names = [name for name in series.columns if name in EVENT_COLUMNS]
+    if not names:
+        return series, None
+    events = series[names]
+    events = events[events.notnull().any(axis=1).to_numpy()]
+    return series.drop(columns=names), events
+
+
+def _empty_column(dtype, size):
+    """Make a column of missing values of the same kind as `dtype`."""
+    if dtype.kind == 'M':
+        return np.full(size, np.datetime64('NaT'), dtype='M8[ns]')
+    if dtype == object:
+        return np.full(size, None, dtype=object)
+    return np.full(size, np.nan)
+
+
+def attach_events(series, events, names):
+    """Add event columns to the series.
+
+    Each event is put on the last bar that starts not later than the event.
+    If several events fall on the same bar, their dividends are added up,
+    for the other columns the last event is used. Columns from `names` that
+    `events` (which can be None) doesn't have are added empty.
+
+    """
+    ret = series.copy(deep=False)
+    if events is None:
+        events = pd.DataFrame(index=pd.DatetimeIndex([]))
+    positions = series.index.searchsorted(events.index, side='right') - 1
+    on_bar = positions >= 0
+
+    for name in names:
+        if name not in events:
+            ret[name] = np.nan
+            continue
+        values = events[name].to_numpy()
+        column = _empty_column(values.dtype, len(series))
+        present = on_bar & pd.notnull(values)
+        by_bar = pd.Series(values[present]).groupby(positions[present])
+        if name == 'dividend':
+            merged = by_bar.sum()
+        else:
+            merged = by_bar.last()
+        column[merged.index.to_numpy()] = merged.to_numpy()
+        ret[name] = column
+    return ret
@@ -0,0 +1,532 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Binary columnar storage format for time series.
+
+File layout (integers are little-endian):
+
+    magic        8 bytes   b'PORTFEL1'
+    header_size  uint64    size of the JSON header in bytes
+    rows         uint64    number of rows stored in the file
+    header       JSON      description of the columns, padded with spaces
+    data         ...       column groups
+
+Columns of the same type are stored together in groups. Each group is a 2-D
+array of shape (number of columns, capacity) in C order, so every column is
+contiguous and can be read on its own. The time index is always stored in a
+separate group. Capacity can be larger than the number of rows, the extra
+space is reserved for appending data.
+
+Columns of Python strings (e.g. splits) are stored as fixed width UTF-8 byte
+strings where an empty string represents a missing value. All other columns
+are stored as their numpy dtype, which makes round trips exact.
+
+"""
+
+import functools
+import io
+import json
+import mmap as mm
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+
+import portfel.data.locking as locking
+import portfel.data.series as ds
+
+EXTENSION = '.pfc'
+MAGIC = b'PORTFEL1'
+VERSION = 1
+
+# Magic, header size and number of rows.
+PREAMBLE = struct.Struct('<8sQQ')
+ROWS_OFFSET = 16
+
+# Alignment of the data section and of the groups within it.
+ALIGNMENT = 64
+
+# When the file is rewritten to make room for more rows, its capacity grows
+# at least by this factor.
+GROWTH_FACTOR = 1.5
+
+# Number of rows that are copied at once when the file is rewritten.
+COPY_ROWS = 1 << 20
+
+
+def _align(n):
+    """Round n up to the ALIGNMENT."""
+    return -(-n // ALIGNMENT) * ALIGNMENT
+
+
+def _encode(values):
+    """Convert column values to a fixed width array.
+
+    Returns the array and the kind of the column: None for native numpy data
+    and 'str' for strings.
+
+    """
+    values = np.asarray(values)
+    if values.dtype != object:
+        if values.dtype.kind not in 'biufmMS':
+            raise ValueError('Unsupported column type: {}'
+                             .format(values.dtype))
+        return values, None
+
+    missing = pd.isnull(values)
+    present = values[~missing]
+    if not all(isinstance(v, str) for v in present):
+        raise ValueError('Unsupported values in object column')
+    encoded = [v.encode('utf-8') for v in present]
+    width = max([len(v) for v in encoded] + [1])
+    ret = np.zeros(len(values), dtype='S{}'.format(width))
+    ret[~missing] = encoded
+    return ret, 'str'
+
+
+def _decode(values, kind):
+    """Convert stored column values back to their original form."""
+    if kind == 'str':
+        ret = np.full(len(values), None, dtype=object)
+        present = values != b''
+        ret[present] = np.char.decode(values[present], 'utf-8')
+        return ret
+    return values
+
+
+def _encode_series(series):
+    """Encode the index and the columns of the series.
+
+    Returns a list of (name, values, kind) tuples, the index goes first.
+
+    """
+    ret = [(series.index.name,) + _encode(series.index.values)]
+    for name in series:
+        ret.append((name,) + _encode(series[name].values))
+    return ret
+
+
+def _make_header(specs, capacity):
+    """Create file header.
+
+    `specs` is a list of (name, dtype, kind) tuples for the index and the
+    columns. The index is placed into a separate group and the columns with
+    the same dtype are grouped together.
+
+    """
+    (index_name, index_dtype, index_kind), *column_specs = specs
+    index = {'name': index_name, 'kind': index_kind,
+             'group': 0, 'position': 0}
+    dtypes = [np.dtype(index_dtype).str]
+    widths = [1]
+    group_of = {}
+    columns = []
+
+    for name, dtype, kind in column_specs:
+        dtype = np.dtype(dtype).str
+        if dtype not in group_of:
+            group_of[dtype] = len(dtypes)
+            dtypes.append(dtype)
+            widths.append(0)
+        g = group_of[dtype]
+        columns.append({'name': name, 'kind': kind,
+                        'group': g, 'position': widths[g]})
+        widths[g] += 1
+
+    offset = 0
+    groups = []
+    for dtype, width in zip(dtypes, widths):
+        groups.append({'dtype': dtype, 'offset': offset, 'width': width})
+        itemsize = np.dtype(dtype).itemsize
+        offset = _align(offset + width * capacity * itemsize)
+
+    return {
+        'version': VERSION,
+        'capacity': capacity,
+        'size': offset,
+        'index': index,
+        'columns': columns,
+        'groups': groups,
+    }
+
+
+def _write_header(f, header, rows):
+    """Write the file preamble and header, return data offset."""
+    data = json.dumps(header).encode('utf-8')
+    size = _align(PREAMBLE.size + len(data)) - PREAMBLE.size
+    f.write(PREAMBLE.pack(MAGIC, size, rows))
+    f.write(data.ljust(size))
+    return PREAMBLE.size + size
+
+
+def read_header(f):
+    """Read the header of an open file.
+
+    The returned dictionary has two extra keys: 'rows' and 'data-offset'.
+
+    """
+    preamble = f.read(PREAMBLE.size)
+    if len(preamble) != PREAMBLE.size:
+        raise ValueError('Not a Portfel binary series file')
+    magic, size, rows = PREAMBLE.unpack(preamble)
+    if magic != MAGIC:
+        raise ValueError('Not a Portfel binary series file')
+    header = json.loads(f.read(size).decode('utf-8'))
+    if header['version'] != VERSION:
+        raise ValueError('Unsupported file version: {}'
+                         .format(header['version']))
+    header['rows'] = rows
+    header['data-offset'] = PREAMBLE.size + size
+    return header
+
+
+def _column_offset(header, group, position):
+    """Calculate file offset of a column."""
+    info = header['groups'][group]
+    itemsize = np.dtype(info['dtype']).itemsize
+    return (header['data-offset'] + info['offset']
+            + position * header['capacity'] * itemsize)
+
+
+def _column_dtype(header, column):
+    """Return dtype of the stored column."""
+    return np.dtype(header['groups'][column['group']]['dtype'])
+
+
+def _map_column(buf, header, column, lo, hi):
+    """Return a view of rows lo:hi of the column in the mapped file."""
+    dtype = _column_dtype(header, column)
+    offset = _column_offset(header, column['group'], column['position'])
+    values = np.frombuffer(buf, dtype=dtype, count=hi - lo,
+                           offset=offset + lo * dtype.itemsize)
+    return _decode(values, column['kind'])
+
+
+def _read_column(f, header, column, lo, hi, decode=True):
+    """Read rows lo:hi of the column from the file."""
+    dtype = _column_dtype(header, column)
+    offset = _column_offset(header, column['group'], column['position'])
+    values = np.empty(hi - lo, dtype=dtype)
+    f.seek(offset + lo * dtype.itemsize)
+    buf = values.view(np.uint8)
+    if f.readinto(buf) != len(buf):
+        raise ValueError('Truncated series file')
+    return _decode(values, column['kind']) if decode else values
+
+
+def _row_range(buf, header, start, end):
+    """Find the rows between start and end (inclusive) by binary search.
+
+    Only the pages of the time column that are visited by the search are
+    read from the file.
+
+    """
+    index = _map_column(buf, header, header['index'], 0, header['rows'])
+    lo, hi = 0, len(index)
+    if start is not None:
+        lo = index.searchsorted(_index_value(start, index.dtype), 'left')
+    if end is not None:
+        hi = index.searchsorted(_index_value(end, index.dtype), 'right')
+    return int(lo), int(max(lo, hi))
+
+
+def _index_value(value, dtype):
+    """Convert the value to be comparable with the index."""
+    if dtype.kind == 'M':
+        return pd.Timestamp(value).to_datetime64()
+    return value
+
+
+def _select_columns(header, columns):
+    """Return headers of selected columns (all by default)."""
+    if columns is None:
+        return header['columns']
+    by_name = {c['name']: c for c in header['columns']}
+    return [by_name[name] for name in columns]
+
+
+def _build_series(header, index, columns):
+    """Construct series from the index and column arrays without copying."""
+    index = pd.Index(index, name=header['index']['name'])
+    # Frame constructor doesn't consolidate the columns when copy=False.
+    return ds.Series(pd.DataFrame(columns, index=index, copy=False))
+
+
+def _read_rows(f, header, lo, hi):
+    """Read rows lo:hi of all columns."""
+    index = _read_column(f, header, header['index'], lo, hi)
+    data = {c['name']: _read_column(f, header, c, lo, hi)
+            for c in header['columns']}
+    return _build_series(header, index, data)
+
+
+def load(path, mmap=False, start=None, end=None, columns=None):
+    """Load series from a binary file.
+
+    If `start` or `end` are given, only the rows with the time between them
+    (inclusive) are read. The rows are found by binary search in the time
+    column. If `columns` is given, only these columns are read.
+
+    If `mmap` is true, the file is memory-mapped and the columns of the
+    returned series are read-only views of the mapping, except for string
+    columns that need to be decoded. Loading then takes constant time and the
+    data is paged in when it's accessed (and shared with other processes that
+    map the same file).
+
+    """
+    with open(path, 'rb') as f:
+        header = read_header(f)
+        selected = _select_columns(header, columns)
+        if mmap:
+            buf = mm.mmap(f.fileno(), 0, access=mm.ACCESS_READ)
+            lo, hi = _row_range(buf, header, start, end)
+            read = functools.partial(_map_column, buf, header)
+        else:
+            if start is None and end is None:
+                lo, hi = 0, header['rows']
+            else:
+                with mm.mmap(f.fileno(), 0, access=mm.ACCESS_READ) as buf:
+                    lo, hi = _row_range(buf, header, start, end)
+            read = functools.partial(_read_column, f, header)
+        index = read(header['index'], lo, hi)
+        data = {c['name']: read(c, lo, hi) for c in selected}
+    return _build_series(header, index, data)
+
+
+def _unchanged(buf, header, series):
+    """Count leading records of the series that are stored unchanged."""
+    index = _map_column(buf, header, header['index'], 0, header['rows'])
+    if len(index) == 0 or len(series) == 0:
+        return 0
+
+    times = series.index.values
+    pos = index.searchsorted(times)
+    found = pos < len(index)
+    pos = np.minimum(pos, len(index) - 1)
+    same = found & (index[pos] == times)
+
+    columns = {c['name']: c for c in header['columns']}
+    for name in series:
+        if name not in columns:
+            return 0
+        stored = _map_column(buf, header, columns[name], 0, header['rows'])
+        stored = stored[pos]
+        new = series[name].values
+        same &= (stored == new) | (pd.isnull(stored) & pd.isnull(new))
+
+    return len(same) if same.all() else int(np.argmin(same))
+
+
+def _fit(header, series):
+    """Encode index and columns of the series as the stored types.
+
+    Returns None if the series doesn't fit into the stored columns.
+
+    """
+    if set(series) != {c['name'] for c in header['columns']}:
+        return None
+
+    ret = []
+    for i, column in enumerate([header['index']] + header['columns']):
+        values = series.index.values if i == 0 else series[column['name']]
+        try:
+            values, kind = _encode(values)
+        except ValueError:
+            return None
+        dtype = _column_dtype(header, column)
+        if kind != column['kind'] or not np.can_cast(values.dtype, dtype):
+            return None
+        ret.append(values)
+    return ret
+
+
+def _missing(dtype, size):
+    """Return an array of missing values (or None if dtype has none)."""
+    if dtype.kind == 'f':
+        return np.full(size, np.nan, dtype=dtype)
+    elif dtype.kind == 'M':
+        return np.full(size, np.datetime64('NaT'), dtype=dtype)
+    elif dtype.kind == 'S':
+        return np.zeros(size, dtype=dtype)
+    return None
+
+
+def _write_rows(f, header, lo, arrays):
+    """Write the arrays starting at row lo and update the number of rows.
+
+    The arrays are written for the index and the columns in the header order
+    and are converted to the stored types. The number of rows is updated
+    after the data is written, so that readers that look at the header see
+    complete rows.
+
+    """
+    for column, values in zip([header['index']] + header['columns'], arrays):
+        dtype = _column_dtype(header, column)
+        offset = _column_offset(header, column['group'], column['position'])
+        f.seek(offset + lo * dtype.itemsize)
+        values = np.ascontiguousarray(values, dtype=dtype)
+        f.write(values.view(np.uint8).data)
+    f.flush()
+    f.seek(ROWS_OFFSET)
+    f.write(struct.pack('<Q', lo + len(arrays[0])))
+
+
+def _rewrite(f, header, lo, tail, capacity, path):
+    """Write rows :lo of the open file followed by the tail into a new file.
+
+    The types of the columns are widened if the tail needs it. The rows are
+    copied in blocks of COPY_ROWS, so memory use doesn't depend on the size
+    of the file. Returns False if the tail can't be combined with the stored
+    data this way.
+
+    """
+    try:
+        encoded = _encode_series(tail)
+    except ValueError:
+        return False
+
+    stored = {c['name']: c for c in header['columns']}
+    specs = []
+    sources = []
+    for i, (name, values, kind) in enumerate(encoded):
+        old = header['index'] if i == 0 else stored.get(name)
+        dtype = values.dtype
+        if old is not None:
+            if old['kind'] != kind:
+                return False
+            try:
+                dtype = np.promote_types(_column_dtype(header, old), dtype)
+            except TypeError:
+                return False
+        elif lo > 0 and _missing(dtype, 0) is None:
+            return False
+        specs.append((name, dtype, kind))
+        sources.append(old)
+
+    new_header = _make_header(specs, capacity)
+    with open(path, 'wb') as out:
+        new_header['data-offset'] = _write_header(out, new_header, 0)
+        for start in range(0, lo, COPY_ROWS):
+            end = min(lo, start + COPY_ROWS)
+            arrays = [
+                _missing(np.dtype(dtype), end - start) if old is None else
+                _read_column(f, header, old, start, end, decode=False)
+                for (_, dtype, _), old in zip(specs, sources)
+            ]
+            _write_rows(out, new_header, start, arrays)
+        _write_rows(out, new_header, lo, [v for _, v, _ in encoded])
+        out.truncate(new_header['data-offset'] + new_header['size'])
+    return True
+
+
+def merge(path, series, copy_on_write=False):
+    """Merge records of the series into the file.
+
+    Records of the series replace the stored records with the same time.
+    Leading records of the series that are already stored unchanged are
+    skipped and only the rows starting from the first new or changed record
+    are written. If that doesn't fit into the reserved capacity or into the
+    stored column types, the file is rewritten with more capacity and the new
+    file atomically replaces the old one.
+
+    If `copy_on_write` is true, stored rows are never changed in place: only
+    new rows are written into the reserved capacity and changes of stored
+    rows rewrite the file. Use it when the file can be memory-mapped by
+    readers (see `load()`), which would see their rows change otherwise.
+
+    Returns the time of the first changed record (None if nothing changed).
+
+    """
+    if not series.index.is_monotonic_increasing:
+        series = series.sort_index(kind='mergesort')
+
+    tmp_path = locking.temp_path(path)
+    with open(path, 'r+b') as f:
+        header = read_header(f)
+        with mm.mmap(f.fileno(), 0, access=mm.ACCESS_READ) as buf:
+            series = series.iloc[_unchanged(buf, header, series):]
+            if len(series) == 0:
+                return None
+            changed = series.index[0]
+            lo, _ = _row_range(buf, header, series.index[0], None)
+
+        tail = ds.merge(_read_rows(f, header, lo, header['rows']), series)
+        capacity = header['capacity']
+        in_place = lo == header['rows'] or not copy_on_write
+        if in_place and lo + len(tail) <= capacity:
+            arrays = _fit(header, tail)
+            if arrays is not None:
+                _write_rows(f, header, lo, arrays)
+                return changed
+        if lo + len(tail) > capacity:
+            capacity = max(lo + len(tail), int(capacity * GROWTH_FACTOR))
+        rewritten = _rewrite(f, header, lo, tail, capacity, tmp_path)
+        if not rewritten:
+            head = _read_rows(f, header, 0, lo)
+
+    if not rewritten:
+        save(tmp_path, pd.concat([head, tail]), capacity=capacity)
+    os.replace(tmp_path, path)
+    return changed
+
+
+def save(path, series, capacity=None):
+    """Save series to a binary file.
+
+    If `capacity` is given and is greater than the length of the series, the
+    space for the extra rows is reserved in the file.
+
+    """
+    capacity = max(capacity or 0, len(series))
+    with open(path, 'wb') as f:
+        _write(f, series, capacity)
+        f.truncate(f.tell())
+
+
+def _write(f, series, capacity):
+    """Write the series with the given capacity into an open file."""
+    encoded = _encode_series(series)
+    header = _make_header([(n, v.dtype, k) for n, v, k in encoded], capacity)
+    header['data-offset'] = _write_header(f, header, 0)
+    _write_rows(f, header, 0, [v for _, v, _ in encoded])
+    f.seek(header['data-offset'] + header['size'])
+
+
+def dumps(series):
+    """Encode series in the binary format and return the bytes.
+
+    The result is the same as the contents of a file without spare capacity,
+    except that the padding after the last column can be left out.
+
+    """
+    with io.BytesIO() as f:
+        _write(f, series, len(series))
+        return f.getvalue()
+
+
+def loads(data):
+    """Decode series from the bytes returned by `dumps()`.
+
+    The columns are views of `data` (except for string columns), so they are
+    only writable if `data` is a writable buffer like bytearray.
+
+    """
+    header = read_header(io.BytesIO(data))
+    read = functools.partial(_map_column, data, header)
+    index = read(header['index'], 0, header['rows'])
+    columns = {c['name']: read(c, 0, header['rows'])
+               for c in header['columns']}
+    return _build_series(header, index, columns)
@@ -0,0 +1,75 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""CSV storage format for time series."""
+
+import pandas as pd
+
+import portfel.data.convert as conv
+import portfel.data.locking as locking
+import portfel.data.series as ds
+
+EXTENSION = '.csv'
+
+# Converters for loading time series from CSV files.
+CONVERTERS = {
+    'time': conv.to_timestamp,
+    'earnings-period': conv.to_timestamp,
+}
+
+
+def load(path, mmap=False, start=None, end=None, columns=None):
+    """Load series from a CSV file.
+
+    CSV files need to be parsed, so `mmap` is ignored and the whole file is
+    read even if `start`, `end` or `columns` are given.
+
+    """
+    usecols = None if columns is None else ['time'] + list(columns)
+    data = pd.read_csv(path, converters=CONVERTERS, float_precision='high',
+                       usecols=usecols)
+    # High precision float converter above is necessary to avoid drift of
+    # the floating point values. test_get_series fails without it.
+    series = ds.Series(data)
+    if columns is not None:
+        series = series[list(columns)]
+    if start is not None:
+        series = series[series.index >= pd.Timestamp(start)]
+    if end is not None:
+        series = series[series.index <= pd.Timestamp(end)]
+    return series
+
+
+def save(path, series):
+    """Save series to a CSV file."""
+    series.to_csv(path)
+
+
+def merge(path, series, copy_on_write=False):
+    """Merge records of the series into the file.
+
+    The whole file is loaded and the merged series replaces it if it changes
+    (so `copy_on_write` makes no difference).
+    Returns the time of the first changed record (see
+    `portfel.data.series.first_change()`).
+
+    """
+    old = load(path)
+    changed = ds.first_change(old, series)
+    if changed is None:
+        return None
+    with locking.replacing(path) as tmp_path:
+        save(tmp_path, ds.merge(old, series))
+    return changed
@@ -0,0 +1,56 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Index file of the repository.
+
+This module doesn't depend on pandas, so that the command line interface can
+list the series quickly. See `portfel.data.repository` for the full access.
+
+"""
+
+import csv
+import os
+
+# File name of the index in the repository directory.
+FILENAME = 'index.csv'
+
+# Fields of the index file.
+FIELDS = [
+    'exchange',    # Exchange
+    'ticker',      # Ticker
+    'resolution',  # Time resolution
+    'currency',    # Currency
+    'filename',    # File name
+    'first-time',  # Timestamp of the earliest record
+    'last-time',   # Timestamp of the latest record
+    'revision',    # Number of changes of the series file
+]
+
+
+def read_records(path):
+    """Read index records of the repository at `path`.
+
+    The records are dicts of strings. The index file is replaced atomically
+    when it changes, so it's read without locking.
+
+    """
+    index_path = os.path.join(path, FILENAME)
+    if not os.path.exists(index_path):
+        return []
+    with open(index_path, 'rt', newline='') as f:
+        return [
+            {field: row[field] for field in FIELDS if field in row}
+            for row in csv.DictReader(f)
+        ]
@@ -15,6 +15,7 @@
 
 """Dispatcher for loading data from external sources."""
 
+import concurrent.futures as cf
 import logging
 
 import portfel.data.loaders.tradingview as tradingview
@@ -24,15 +25,65 @@ LOADERS = {
 }
 
 
+def _log_chunks(path, chunks):
+    """Pass through the chunks and log the totals at the end."""
+    records = 0
+    for chunk in chunks:
+        records += len(chunk)
+        yield chunk
+    logging.info('Loaded series from %s in chunks (%d records)',
+                 path, records)
+
+
 def load_series(path, format='tradingview', resolution='auto', exchange='auto',
-                ticker='auto', currency='auto'):
-    """Load time series from a file."""
+                ticker='auto', currency='auto', chunksize=None):
+    """Load time series from a file.
+
+    If `chunksize` is given, the file is read lazily and an iterator over
+    chunks of the series (with metadata set) of up to `chunksize` records is
+    returned. The chunks can be passed to `Repository.add_series()`.
+
+    """
     loader = LOADERS[format]
     series = loader.load(path, resolution=resolution, exchange=exchange,
-                         ticker=ticker, currency=currency)
+                         ticker=ticker, currency=currency, chunksize=chunksize)
+    if chunksize is not None:
+        return _log_chunks(path, series)
     logging.info(
         'Loaded series from %s (%d records, from %s to %s, fields: %s)',
         path, len(series), series.index.min(), series.index.max(),
         ', '.join(sorted(series.keys())),
     )
     return series
+
+
+def load_many(paths, jobs=None, **options):
+    """Load series from many files in parallel.
+
+    The files are loaded by a pool of `jobs` processes (by default, one per
+    CPU), or in this process if `jobs` is 1. Options are passed to
+    `load_series()`. If `chunksize` option is given, chunk iterators are
+    yielded instead of the series and the files are read in this process.
+
+    Yields (path, series) pairs in the order of completion. If loading a file
+    fails, the exception is yielded instead of the series.
+
+    """
+    if jobs == 1 or options.get('chunksize') is not None:
+        for path in paths:
+            try:
+                yield path, load_series(path, **options)
+            except Exception as e:
+                yield path, e
+        return
+
+    with cf.ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(load_series, path, **options): path
+            for path in paths
+        }
+        for future in cf.as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception as e:
+                yield futures[future], e
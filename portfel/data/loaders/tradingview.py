@@ -18,12 +18,18 @@
 import csv
 import os
 
+import pandas as pd
+
 import portfel.data.convert as conv
 import portfel.data.series as ds
 
+# Extension of the export files.
+EXTENSION = '.csv'
+
 FIELD_MAP = {
     'time': 'time',
     'open': 'open',
+    'close': 'close',
     'high': 'high',
     'low': 'low',
     'Volume': 'volume',
@@ -36,6 +42,27 @@ FIELD_MAP = {
     'Dividends amount': 'dividend',
 }
 
+# Types of the CSV columns for bulk loading. Columns that are not listed here
+# are skipped.
+COLUMN_TYPES = {
+    'time': 'int64',
+    'open': 'float64',
+    'close': 'float64',
+    'high': 'float64',
+    'low': 'float64',
+    'Volume': 'float64',
+    'Earnings period': 'int64',
+    'Earnings reported': 'float64',
+    'Earnings confirmed': 'float64',
+    'Earnings estimated': 'float64',
+    'Split numerator': 'float64',
+    'Split denominator': 'float64',
+    'Dividends amount': 'float64',
+}
+
+# Values that are treated as missing by `conv.to_float()`.
+NA_VALUES = ['', 'nan', 'NaN', 'NAN']
+
 CURRENCY_DEFAULTS = {
     'BATS': 'USD',
     'XETR': 'EUR',
@@ -127,8 +154,128 @@ def convert_row(csv_row):
     return row
 
 
-def load(path, resolution, exchange, ticker, currency):
-    """Load time series from TradingView CSV export."""
+def read_rows(path):
+    """Read TradingView CSV export row by row (reference implementation)."""
+    with open(path, 'rt', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        return ds.Series([convert_row(row) for row in reader])
+
+
+def _to_timestamps(column, name):
+    """Convert a column of epoch seconds to timestamps."""
+    if (column < 0).any():
+        raise ValueError('{} must be a timestamp'.format(name))
+    return pd.to_datetime(column, unit='s')
+
+
+def convert_columns(data):
+    """Convert bulk-loaded CSV columns to standard series keys and formats.
+
+    This is the columnar equivalent of `convert_row()`: `data` is a DataFrame
+    read with `COLUMN_TYPES` and the result is a dictionary of columns.
+
+    """
+    columns = {'time': _to_timestamps(data['time'], 'time')}
+
+    for k in ['open', 'close', 'high', 'low', 'Volume']:
+        if k in data:
+            columns[FIELD_MAP[k]] = data[k]
+
+    if 'Earnings period' in data:
+        ep = data['Earnings period']
+        no_earnings = ep == 0
+        columns['earnings-period'] = _to_timestamps(ep, 'Earnings period')\
+            .where(~no_earnings)
+    else:
+        no_earnings = pd.Series(False, index=data.index)
+
+    earnings = None
+    for k in ['Earnings reported', 'Earnings confirmed']:
+        if k in data:
+            if earnings is None:
+                earnings = data[k]
+            else:  # Later values take priority like in `extract_earnings()`.
+                earnings = data[k].where(data[k].notna(), earnings)
+    if earnings is not None:
+        columns['earnings'] = earnings.where(~no_earnings)
+    if 'Earnings estimated' in data:
+        columns['earnings-estimate'] = data['Earnings estimated']\
+            .where(~no_earnings)
+
+    if 'Dividends amount' in data:
+        dividend = data['Dividends amount']
+        columns['dividend'] = dividend.where(dividend != 0)
+
+    if 'Split numerator' in data and 'Split denominator' in data:
+        n = data['Split numerator']
+        d = data['Split denominator']
+        valid = (n > 0) & (d > 0) & (n % 1 == 0) & (d % 1 == 0)
+        split = pd.Series([None] * len(data), index=data.index,
+                          dtype=object)
+        split[valid] = [
+            '{}/{}'.format(int(n_), int(d_))
+            for n_, d_ in zip(n[valid], d[valid])
+        ]
+        columns['split'] = split
+
+    return columns
+
+
+def _read_csv(path, **kw):
+    """Read CSV file with bulk loading options."""
+    return pd.read_csv(
+        path,
+        usecols=lambda c: c in COLUMN_TYPES,
+        dtype=COLUMN_TYPES,
+        keep_default_na=False,
+        na_values={k: NA_VALUES for k, t in COLUMN_TYPES.items()
+                   if t == 'float64'},
+        float_precision='round_trip',
+        encoding='utf-8',
+        **kw
+    )
+
+
+def read_columns(path):
+    """Read TradingView CSV export in one bulk pass."""
+    try:
+        data = _read_csv(path)
+    except ValueError as e:
+        raise ValueError('Invalid TradingView export {}: {}'
+                         .format(path, e))
+    return ds.Series(convert_columns(data))
+
+
+def read_chunks(path, chunksize):
+    """Read TradingView CSV export in chunks of `chunksize` rows.
+
+    This is a generator that yields series, so only one chunk at a time is
+    held in memory.
+
+    """
+    try:
+        with _read_csv(path, chunksize=chunksize) as reader:
+            for data in reader:
+                yield ds.Series(convert_columns(data))
+    except ValueError as e:
+        raise ValueError('Invalid TradingView export {}: {}'
+                         .format(path, e))
+
+
+def _set_metadata(series, metadata):
+    """Set metadata attributes of the series and return it."""
+    for k, v in metadata.items():
+        setattr(series, k, v)
+    return series
+
+
+def load(path, resolution, exchange, ticker, currency, chunksize=None):
+    """Load time series from TradingView CSV export.
+
+    If `chunksize` is given, returns an iterator over chunks of the series
+    with up to `chunksize` records in each.
+
+    """
     metadata = {}
 
     if 'auto' in [resolution, exchange, ticker, currency]:
@@ -142,11 +289,7 @@ def load(path, resolution, exchange, ticker, currency):
     if currency != 'auto':
         metadata['currency'] = currency.upper()
 
-    with open(path, 'rt', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        ret = ds.Series([convert_row(row) for row in reader])
-
-    for k, v in metadata.items():
-        setattr(ret, k, v)
-
-    return ret
+    if chunksize is not None:
+        return (_set_metadata(chunk, metadata)
+                for chunk in read_chunks(path, chunksize))
+    return _set_metadata(read_columns(path), metadata)
@@ -0,0 +1,76 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Advisory file locks and atomic file replacement.
+
+The locks are `flock()` locks, so they only coordinate processes that use
+them and they only work on local file systems. On platforms without `fcntl`
+locking is a no-op.
+
+"""
+
+import contextlib
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+
+@contextlib.contextmanager
+def locked(path, shared=False, create=False):
+    """Hold a lock on the file while in the context.
+
+    If `shared` is true, the lock is shared with other shared lock holders,
+    otherwise it's exclusive. If `create` is true, the file is created if it
+    doesn't exist (use this for dedicated lock files).
+
+    """
+    if fcntl is None:
+        yield
+        return
+    flags = os.O_RDONLY | (os.O_CREAT if create else 0)
+    fd = os.open(path, flags, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)  # Closing the file releases the lock.
+
+
+def temp_path(path):
+    """Return a temporary path next to the file that's unique per thread."""
+    return '{}.{}.{}.tmp'.format(path, os.getpid(), threading.get_ident())
+
+
+@contextlib.contextmanager
+def replacing(path):
+    """Return a context manager for atomically replacing a file.
+
+    The context yields a temporary path to write to. When the context exits
+    without an exception, the temporary file atomically replaces the file at
+    `path`, so readers see either the old or the new file. Otherwise the
+    temporary file is removed.
+
+    """
+    tmp_path = temp_path(path)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
@@ -0,0 +1,131 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Many series aligned on a shared time axis.
+
+A panel keeps one 2-D array (time x symbol) for each field, so calculations
+across many securities are array operations on the whole panel::
+
+    closes = panel.array('close')
+    returns = closes[1:] / closes[:-1] - 1      # All symbols at once.
+    best = np.nanargmax(returns, axis=1)         # Best symbol at each time.
+
+"""
+
+import numpy as np
+import pandas as pd
+
+# Metadata of each symbol of the panel.
+METADATA_FIELDS = ['exchange', 'ticker', 'resolution', 'currency']
+
+
+class Panel:
+    """Fields of many series aligned on a shared time axis.
+
+    `time` is the shared time index, `metadata` is a data frame with
+    METADATA_FIELDS for each symbol (in the order of the columns of the
+    arrays) and `fields` is a dict from field names to C-contiguous float
+    arrays of shape (len(time), number of symbols). Missing values are NaN.
+
+    """
+
+    def __init__(self, time, metadata, fields):
+        self.time = time
+        self.metadata = metadata
+        self.fields = fields
+
+    @classmethod
+    def from_series(cls, series_list, fields=None, join='outer'):
+        """Align series into a panel.
+
+        If `fields` are not given, all numeric columns of the series are
+        used. With `join='outer'` the time axis contains the times of all
+        series, with `join='inner'` only the times that all series have.
+
+        """
+        series_list = list(series_list)
+        if fields is None:
+            fields = []
+            for series in series_list:
+                fields.extend(
+                    name for name, dtype in series.dtypes.items()
+                    if dtype.kind in 'biuf' and name not in fields
+                )
+
+        indexes = [series.index for series in series_list]
+        if not indexes:
+            time = pd.DatetimeIndex([], name='time')
+        elif join == 'outer':
+            time = pd.DatetimeIndex(np.unique(np.concatenate(indexes)),
+                                    name='time')
+        elif join == 'inner':
+            time = indexes[0]
+            for index in indexes[1:]:
+                time = time.intersection(index)
+            time = pd.DatetimeIndex(time, name='time')
+        else:
+            raise ValueError('Invalid join: {}'.format(join))
+
+        # Filled by columns, so symbol-major layout first.
+        arrays = {name: np.full((len(series_list), len(time)), np.nan)
+                  for name in fields}
+        for i, series in enumerate(series_list):
+            positions = time.get_indexer(series.index)
+            found = positions >= 0
+            positions = positions[found]
+            for name in fields:
+                if name in series:
+                    values = series[name].to_numpy(dtype=float)
+                    arrays[name][i, positions] = values[found]
+        arrays = {name: np.ascontiguousarray(values.T)
+                  for name, values in arrays.items()}
+
+        metadata = pd.DataFrame(
+            [[getattr(s, k, None) for k in METADATA_FIELDS]
+             for s in series_list],
+            columns=METADATA_FIELDS,
+        )
+        return cls(time, metadata, arrays)
+
+    def __len__(self):
+        return len(self.time)
+
+    @property
+    def symbols(self):
+        """Symbols of the panel as EXCHANGE:TICKER strings."""
+        return [
+            '{}:{}'.format(exchange, ticker) for exchange, ticker
+            in zip(self.metadata['exchange'], self.metadata['ticker'])
+        ]
+
+    def array(self, field):
+        """Return the array of the field (time x symbol)."""
+        return self.fields[field]
+
+    def __getitem__(self, field):
+        """Return the field as a data frame (sharing the data)."""
+        return pd.DataFrame(self.fields[field], index=self.time,
+                            columns=self.symbols, copy=False)
+
+    def returns(self, field='close'):
+        """Calculate relative changes of the field between the bars.
+
+        The first row is NaN.
+
+        """
+        values = self.fields[field]
+        ret = np.full(values.shape, np.nan)
+        ret[1:] = values[1:] / values[:-1] - 1
+        return ret
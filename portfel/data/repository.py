@@ -13,118 +13,693 @@
 # You should have received a copy of the GNU General Public License
 # along with Portfel. If not, see <http://www.gnu.org/licenses/>.
 
-"""Filesystem-based data repository that uses CSV files."""
+"""Filesystem-based data repository.
 
+The index of the repository is a CSV file and the series are stored in files
+of one of the formats supported by `portfel.data.storage`.
+
+Corporate events (dividends, splits and earnings, see `portfel.data.events`)
+are kept in a separate file per ticker in the 'events' subdirectory.
+Cumulative adjustment factors for split and dividend adjusted prices (see
+`portfel.data.adjust`) are kept in the 'adjusted' subdirectory and updated
+when new bars or events are added. Stored indicators (see `add_indicator()`)
+are kept in the 'indicators' subdirectory and also updated with new bars.
+Registered features (see `portfel.features`) are stored there as indicators
+when they are first requested.
+
+Several processes can use the same repository: changes are made while
+holding an exclusive lock on the index (see `portfel.data.locking`) and the
+files are replaced atomically, so readers never see partially written data.
+
+"""
+
+import asyncio
+import concurrent.futures as cf
+import contextlib
+import functools
+import json
 import os
+import threading
 
+import numpy as np
 import pandas as pd
 
-import portfel.data.convert as conv
+import portfel.data.adjust as adj
+import portfel.data.cache as cache
+import portfel.data.derived as derived
+import portfel.data.events as ev
+import portfel.data.index as idx
+import portfel.data.locking as locking
+import portfel.data.panel as pnl
+import portfel.data.resample as rs
 import portfel.data.series as ds
+import portfel.data.storage as storage
+import portfel.features as ft
+import portfel.indicators as ind
+
+# Fields of the index file.
+INDEX_FIELDS = idx.FIELDS
+
+# Repository of the worker process of `Repository.get_many()`.
+_worker = {}
+
+
+def _init_worker(path, settings):
+    """Open the repository in the worker process."""
+    _worker['repository'] = Repository(path, **settings)
+
+
+def _worker_get_series(options, key):
+    """Load series in the worker process."""
+    return _worker['repository'].get_series(*key, **options)
 
-# Field of the index file.
-INDEX_FIELDS = [
-    'exchange',    # Exchange
-    'ticker',      # Ticker
-    'resolution',  # Time resolution
-    'currency',    # Currency
-    'filename',    # File name
-    'first-time',  # Timestamp of the earliest record
-    'last-time',   # Timestamp of the latest record
-]
 
-# Converters for loading time series from CSV files.
-CONVERTERS = {
-    'time': conv.to_timestamp,
-    'earnings-period': conv.to_timestamp,
-}
+def _bar_length(index_record):
+    """Bar length of the series for sorting (unknown resolutions last)."""
+    try:
+        return rs.bar_length(index_record['resolution'])
+    except ValueError:
+        return pd.Timedelta.max
+
+
+def _file_version(path):
+    """Modification time and size of the file (None if it doesn't exist)."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
 
 
 class Repository:
-    """Data repository."""
+    """Data repository.
+
+    If `mmap` is true, series files that support it are memory-mapped instead
+    of being read into memory. See `portfel.data.formats.binary.load()`.
+    Changes of stored records then rewrite the files instead of changing them
+    in place, so the series that are already loaded don't change.
+
+    Series in resolutions that are not stored but can be derived from the
+    stored ones (see `get_series()`) are cached in the 'derived' subdirectory.
+    `cache_size` limits the total size of the cached files.
+
+    If `memory_cache_size` is given, loaded series are also kept in memory in
+    an LRU cache of that many bytes (see `portfel.data.cache.SeriesCache`),
+    available as `memory_cache` attribute. The entries are keyed by the file
+    modification times and sizes, so changes from other processes are
+    noticed.
+    Memory-mapped series are not cached because opening them is cheap.
 
-    def __init__(self, path):
+    """
+
+    def __init__(self, path, format=storage.DEFAULT_FORMAT, mmap=False,
+                 cache_size=derived.DEFAULT_CAPACITY, memory_cache_size=None):
         self.path = path
-        self._index_path = os.path.join(self.path, 'index.csv')
-        if os.path.exists(path):
+        self.format = format
+        self.mmap = mmap
+        self.cache_size = cache_size
+        self.memory_cache_size = memory_cache_size
+        self.memory_cache = None
+        if memory_cache_size is not None and not mmap:
+            self.memory_cache = cache.SeriesCache(memory_cache_size)
+        self._batch = False
+        self._local = threading.local()
+        self._index_path = os.path.join(self.path, idx.FILENAME)
+        self._lock_path = os.path.join(self.path, 'index.lock')
+        self._derived = derived.DerivedCache(
+            os.path.join(self.path, 'derived'),
+            format=format,
+            capacity=cache_size,
+        )
+        if os.path.exists(self._index_path):
             self._load_index()
         else:
             self._init()
 
     def _init(self):
         """Initialize the repository."""
-        os.makedirs(self.path)
-        self.index = pd.DataFrame({f: [] for f in INDEX_FIELDS})
-        self._save_index()
+        os.makedirs(self.path, exist_ok=True)
+        with self._locked():
+            if not os.path.exists(self._index_path):  # Not made by others.
+                self._set_records([])
+                self._save_index()
+
+    @property
+    def _lock_depth(self):
+        """Nesting depth of `_locked()` in the current thread."""
+        return getattr(self._local, 'lock_depth', 0)
+
+    @_lock_depth.setter
+    def _lock_depth(self, value):
+        self._local.lock_depth = value
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Hold the exclusive lock on the index while in the context.
+
+        When the lock is acquired, the index is reloaded to see the changes
+        made by other processes. Nested contexts just keep the lock. Other
+        threads wait for the lock like other processes do.
+
+        """
+        if self._lock_depth:
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+            return
+        with locking.locked(self._lock_path, create=True):
+            if os.path.exists(self._index_path):
+                self._load_index()
+            self._lock_depth = 1
+            try:
+                yield
+            finally:
+                self._lock_depth = 0
+
+    @staticmethod
+    def _record_key(record):
+        """Return the key of the index record."""
+        return record['exchange'], record['ticker'], record['resolution']
+
+    def _set_records(self, records):
+        """Replace the index records and check that they are unique."""
+        self._records = {}
+        self._by_ticker = {}
+        for rec in records:
+            key = self._record_key(rec)
+            if key in self._records:
+                raise Exception('Multiple index records for {}:{}@{} - repo '
+                                'corrupt?'.format(*key))
+            self._add_record(rec)
+        self._index = None
+
+    def _add_record(self, record):
+        """Add index record (it's saved with the index)."""
+        self._records[self._record_key(record)] = record
+        self._by_ticker.setdefault((record['exchange'], record['ticker']),
+                                   []).append(record)
+
+    @property
+    def index(self):
+        """Index of available securities as a data frame."""
+        if self._index is None:
+            self._index = pd.DataFrame(list(self._records.values()),
+                                       columns=INDEX_FIELDS)
+        return self._index
 
     def _load_index(self):
         """Load the index of available securities."""
-        self.index = pd.read_csv(self._index_path)
+        index = pd.read_csv(
+            self._index_path,
+            usecols=lambda c: c in INDEX_FIELDS,
+            parse_dates=['first-time', 'last-time'],
+            dtype={'exchange': str, 'ticker': str, 'resolution': str,
+                   'currency': str},
+        )
+        if 'revision' not in index:  # Made before revisions were added.
+            index['revision'] = 0
+        self._set_records(index.to_dict('records'))
 
     def _save_index(self):
         """Save the index of available securities."""
-        self.index.to_csv(self._index_path)
+        self._index = None
+        if not self._batch:
+            with locking.replacing(self._index_path) as tmp_path:
+                self.index.to_csv(tmp_path, index=False)
 
-    @staticmethod
-    def _series_filename(series):
+    def refresh(self):
+        """Reload the index to see series added by other processes."""
+        self._load_index()
+
+    def close(self):
+        """Save the state kept in memory (the times of use of the cache)."""
+        self._derived.flush()
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Return a context manager that saves the index once at the end.
+
+        Use it when adding many series to avoid rewriting the index after
+        each one::
+
+            with repository.batch():
+                for series in many_series:
+                    repository.add_series(series)
+
+        The index is locked for the whole batch, so other processes can't
+        change the repository in the meantime.
+
+        """
+        if self._batch:  # Nested batch, the outer one will save the index.
+            yield
+            return
+        with self._locked():
+            self._batch = True
+            try:
+                yield
+            finally:
+                self._batch = False
+                self._save_index()
+
+    def _series_filename(self, series):
         """Determine file name for the series."""
-        return '{}_{}_{}.csv'.format(series.exchange,
-                                     series.ticker,
-                                     series.resolution)
+        base = '{}_{}_{}'.format(series.exchange,
+                                 series.ticker,
+                                 series.resolution)
+        return storage.filename(base, self.format)
 
     def add_series(self, series):
-        """Add series to the repository."""
-        rec = self._get_index_record(series.exchange, series.ticker,
-                                     series.resolution)
+        """Add series to the repository.
 
-        if rec is None:
-            rec = {
-                'exchange': series.exchange,
-                'ticker': series.ticker,
-                'resolution': series.resolution,
-                'currency': series.currency,
-                'filename': self._series_filename(series),
-                'first-time': series.index.min(),
-                'last-time': series.index.max(),
-            }
-            self.index = self.index.append([rec])
+        If the series is already in the repository, the new records are
+        merged into it (see `portfel.data.series.merge()`). Only the part of
+        the file that changes is rewritten if the storage format allows it.
+
+        Event columns are stored separately from the bars (see
+        `get_events()`), once per ticker.
+
+        `series` can also be an iterable of chunks of a series, like the one
+        returned by `portfel.data.loader.load_series()` with `chunksize`. The
+        chunks are added one by one, so with the binary storage format memory
+        use doesn't depend on the length of the series.
+
+        """
+        if not isinstance(series, ds.Series):
+            with self.batch():
+                for chunk in series:
+                    self.add_series(chunk)
+            return
+
+        with self._locked():
+            rec = self._get_index_record(series.exchange, series.ticker,
+                                         series.resolution)
+            if self.memory_cache is not None:
+                self.memory_cache.invalidate((series.exchange, series.ticker))
+            series, events = ev.split_events(series)
+            events_changed = self._migrate_events(series.exchange,
+                                                  series.ticker)
+            if events is not None:
+                changed = self._replace_events(
+                    series.exchange, series.ticker, events,
+                    series.index.min(), series.index.max(),
+                )
+                if events_changed is None or (changed is not None and
+                                              changed < events_changed):
+                    events_changed = changed
+
+            if rec is None:
+                rec = {
+                    'exchange': series.exchange,
+                    'ticker': series.ticker,
+                    'resolution': series.resolution,
+                    'currency': series.currency,
+                    'filename': self._series_filename(series),
+                    'first-time': series.index.min(),
+                    'last-time': series.index.max(),
+                    'revision': 1,
+                }
+                self._save_series(rec, series)
+                self._add_record(rec)
+                changed = series.index.min()
+            else:
+                data_path = os.path.join(self.path, rec['filename'])
+                changed = storage.merge_series(data_path, series,
+                                               copy_on_write=self.mmap)
+                rec['first-time'] = min(rec['first-time'], series.index.min())
+                rec['last-time'] = max(rec['last-time'], series.index.max())
+                if changed is not None:
+                    rec['revision'] += 1
+
+            for other in self._by_ticker[series.exchange, series.ticker]:
+                since = [events_changed, changed if other is rec else None]
+                since = [t for t in since if t is not None]
+                if since:
+                    self._update_factors(other, min(since))
+            if changed is not None:
+                self._update_indicators(rec, changed)
+
+            self._save_index()
+
+    def _file_path(self, dirname, base):
+        """Path of the series file in the subdirectory.
+
+        If there is no file with any of the storage formats, the path of a
+        new file in the format of the repository is returned.
+
+        """
+        for format in storage.FORMATS:
+            path = os.path.join(self.path, dirname,
+                                storage.filename(base, format))
+            if os.path.exists(path):
+                return path
+        return os.path.join(self.path, dirname,
+                            storage.filename(base, self.format))
+
+    def _events_path(self, exchange, ticker):
+        """Path of the events file of the ticker (existing in any format)."""
+        return self._file_path('events', '{}_{}'.format(exchange, ticker))
+
+    def _add_events(self, exchange, ticker, events):
+        """Merge events of the ticker into its events file.
+
+        Returns the time of the first changed event (or None).
+
+        """
+        path = self._events_path(exchange, ticker)
+        if os.path.exists(path):
+            return storage.merge_series(path, events)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        storage.save_series(path, events)
+        return events.index.min()
+
+    def _replace_events(self, exchange, ticker, events, start, end):
+        """Replace events of the ticker from `start` to `end` (inclusive).
+
+        Only the columns of `events` are replaced, so stored events that are
+        missing from `events` in this time range are removed. Returns the time
+        of the first changed event (or None).
+
+        """
+        path = self._events_path(exchange, ticker)
+        if not os.path.exists(path):
+            return self._add_events(exchange, ticker, events) if len(events) \
+                else None
+
+        stored = storage.load_series(path)
+        index = stored.index.union(events.index)
+        columns = list(stored) + [c for c in events if c not in stored]
+        ret = stored.reindex(index=index, columns=columns)
+        inside = (index >= start) & (index <= end)
+        for name in events:
+            ret[name] = ret[name].where(~inside, events[name].reindex(index))
+        ret = ret[ret.notnull().any(axis=1).to_numpy()]
+
+        changes = [ds.first_change(stored, ret), ds.first_change(ret, stored)]
+        changes = [t for t in changes if t is not None]
+        if not changes:
+            return None
+        storage.save_series(path, ret)
+        return min(changes)
+
+    def _migrate_events(self, exchange, ticker):
+        """Move event columns of old series files of the ticker to its events.
+
+        Series stored before the events were kept separately have event
+        columns, which are only read when the ticker has no events file. So
+        before the events file is changed, the events of the finest
+        resolution that has them are merged into it (the stored events take
+        priority) and the columns are removed from all the series files.
+
+        Returns the time of the first moved event (or None).
+
+        """
+        legacy = []
+        for rec in self._by_ticker.get((exchange, ticker), []):
+            head = self._load_series(rec, end=rec['first-time'], mmap=False)
+            if any(c in ev.EVENT_COLUMNS for c in head.columns):
+                legacy.append(rec)
+        legacy.sort(key=_bar_length)
+
+        ret = None
+        for rec in legacy:
+            series, events = ev.split_events(self._load_series(rec,
+                                                               mmap=False))
+            if ret is None and len(events):
+                stored = self._load_events(exchange, ticker)
+                if stored is not None:
+                    events = ds.merge(events, stored)
+                path = self._events_path(exchange, ticker)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                storage.save_series(path, events)
+                ret = events.index.min()
+            self._save_series(rec, series)
+            rec['revision'] += 1
+        return ret
+
+    def _load_events(self, exchange, ticker, start=None, end=None,
+                     columns=None):
+        """Load events of the ticker (None if it has none)."""
+        path = self._events_path(exchange, ticker)
+        if not os.path.exists(path):
+            return None
+        events = storage.load_series(path, start=start, end=end)
+        if columns is not None:
+            events = events[[c for c in columns if c in events]]
+        return events
+
+    def _factors_path(self, index_record):
+        """Path of the cumulative adjustment factors of the series."""
+        return os.path.join(self.path, 'adjusted', index_record['filename'])
+
+    def _update_factors(self, index_record, since=None):
+        """Recompute cumulative adjustment factors.
+
+        Only the factors from the bar before `since` are recomputed if the
+        factors are already stored (otherwise nothing is done unless `since`
+        is None, which means computing all the factors).
+
+        """
+        path = self._factors_path(index_record)
+        start = previous = None
+        with self._locked():
+            if since is not None:
+                if not os.path.exists(path):
+                    return
+                # The bar before `since` can contain events after its time.
+                stored = storage.load_series(path, end=since)
+                stored = stored[stored.index < since]
+                if len(stored) >= 2:
+                    start = stored.index[-2]
+                    previous = tuple(stored[adj.FACTOR_COLUMNS].iloc[-2])
+
+            bars = self._read_series(
+                index_record, index_record['resolution'], start=start,
+                end=None, columns=['close', 'dividend', 'split'],
+                events=False,
+            )
+            factors = adj.cumulative_factors(bars, previous)
+            if previous is None:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                storage.save_series(path, factors)
+            elif len(factors):
+                storage.merge_series(path, factors)
+
+    def _read_adjusted(self, source, resolution, start, end, columns):
+        """Load split and dividend adjusted series."""
+        if source['resolution'] != resolution:
+            # Adjusted prices are aggregated from the adjusted source bars.
+            series = self._read_adjusted(source, source['resolution'], None,
+                                         None, columns)
+            return rs.resample(series, resolution).loc[start:end]
+
+        path = self._factors_path(source)
+        if not os.path.exists(path):
+            self._update_factors(source)
+        series = self._load_series(source, start=start, end=end,
+                                   columns=columns)
+        factors = storage.load_series(path, start=start, end=end)
+        last = storage.load_series(path, start=source['last-time'])
+        return adj.adjust(series, factors, last.iloc[-1])
+
+    def _indicators_path(self, index_record):
+        """Path of the description of the stored indicators of the series."""
+        base = os.path.splitext(index_record['filename'])[0]
+        return os.path.join(self.path, 'indicators', base + '.json')
+
+    def _load_indicators(self, index_record):
+        """Load the descriptions of the stored indicators by name."""
+        path = self._indicators_path(index_record)
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'rt') as f:
+            return json.load(f)
+
+    def _store_indicator(self, index_record, indicator, values, merge=False,
+                         version=None):
+        """Save or merge indicator values and save its state (and the version
+        of the feature that it computes, if any)."""
+        base = os.path.splitext(index_record['filename'])[0]
+        path = self._file_path('indicators',
+                               '{}_{}'.format(base, indicator.name))
+        if merge:
+            storage.merge_series(path, values)
         else:
-            print(rec)
-            existing = self._load_series(rec)
-            print(existing.index)
-            print(series.index)
-            # series = pd.merge(existing, series, on='time')
-            series = pd.concat([existing, series])
-            series = series[~series.index.duplicated(keep='last')]
-            print(series)
-            rec['first-time'] = series.index.min()
-            rec['last-time'] = series.index.max()
-
-        self._save_index()
-        self._save_series(rec, series)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            storage.save_series(path, values)
+
+        entries = self._load_indicators(index_record)
+        entries[indicator.name] = {
+            'indicator': indicator.to_dict(),
+            'last-time': str(index_record['last-time']),
+        }
+        if version is not None:
+            entries[indicator.name]['version'] = version
+        with locking.replacing(self._indicators_path(index_record)) as tmp:
+            with open(tmp, 'wt') as f:
+                json.dump(entries, f)
+
+    def add_indicator(self, exchange, ticker, resolution, indicator):
+        """Compute and store indicator values of the series.
+
+        `indicator` is an instance of `portfel.indicators.Indicator`. The
+        stored values are updated incrementally when bars are added after the
+        last ones (and recomputed when earlier bars change).
+
+        Returns the values.
+
+        """
+        with self._locked():
+            rec = self._get_index_record(exchange, ticker, resolution)
+            if rec is None:
+                raise KeyError('{}:{}@{}'.format(exchange, ticker,
+                                                 resolution))
+            return self._add_indicator(rec, indicator)
+
+    def _add_indicator(self, index_record, indicator, version=None):
+        """Compute indicator values from the start and store them."""
+        series = self._load_series(index_record, columns=indicator.inputs)
+        values = indicator.batch(series)
+        self._store_indicator(index_record, indicator, values,
+                              version=version)
+        return values
+
+    def get_indicator(self, exchange, ticker, resolution, name, start=None,
+                      end=None):
+        """Load stored indicator values by the name of the indicator.
+
+        The values of the records between `start` and `end` (inclusive) are
+        returned if they are given.
+
+        """
+        rec = self._get_index_record(exchange, ticker, resolution)
+        if rec is None or name not in self._load_indicators(rec):
+            raise KeyError('{}:{}@{} {}'.format(exchange, ticker, resolution,
+                                                name))
+        base = os.path.splitext(rec['filename'])[0]
+        path = self._file_path('indicators', '{}_{}'.format(base, name))
+        ret = storage.load_series(path, start=start, end=end)
+        for key in ret._metadata:
+            setattr(ret, key, rec[key])
+        return ret
+
+    def _update_indicators(self, index_record, since):
+        """Update stored indicators after bars changed from `since` on.
+
+        If all the bars are after the last stored values, the indicators
+        continue from their saved state over the new bars only.
+
+        """
+        entries = self._load_indicators(index_record)
+        for entry in entries.values():
+            indicator = ind.from_dict(entry['indicator'])
+            if since > pd.Timestamp(entry['last-time']):
+                bars = self._load_series(index_record, start=since,
+                                         columns=indicator.inputs)
+                values = indicator.run(bars)
+                self._store_indicator(index_record, indicator, values,
+                                      merge=True, version=entry.get('version'))
+            else:
+                bars = self._load_series(index_record,
+                                         columns=indicator.inputs)
+                values = indicator.batch(bars)
+                self._store_indicator(index_record, indicator, values,
+                                      version=entry.get('version'))
+
+    def get_feature(self, exchange, ticker, resolution, name, start=None,
+                    end=None):
+        """Load values of a registered feature (see `portfel.features`).
+
+        The feature is stored as an indicator when it's requested for the
+        first time (or with a new version) and then updated with the other
+        indicators. Only the values of the records between `start` and `end`
+        (inclusive) are returned if they are given.
+
+        """
+        feature = ft.FEATURES[name]
+        indicator = feature.indicator()
+        rec = self._get_index_record(exchange, ticker, resolution)
+        if rec is None:
+            raise KeyError('{}:{}@{}'.format(exchange, ticker, resolution))
+        entry = self._load_indicators(rec).get(indicator.name)
+        if entry is None or entry.get('version') != feature.version:
+            with self._locked():  # Reloads the index.
+                rec = self._get_index_record(exchange, ticker, resolution)
+                entry = self._load_indicators(rec).get(indicator.name)
+                if entry is None or entry.get('version') != feature.version:
+                    self._add_indicator(rec, indicator,
+                                        version=feature.version)
+        ret = self.get_indicator(exchange, ticker, resolution, indicator.name,
+                                 start=start, end=end)
+        output = indicator.outputs[0]
+        return ret[[output]].rename(columns={output: name})
+
+    def latest_features(self, symbols, resolution, names):
+        """Get the values of the features for the last bars of the series.
+
+        This is meant for screening many tickers: only the last stored value
+        of each feature is read. Returns a data frame indexed by exchange and
+        ticker with the times of the last bars in 'time' and a column for
+        each feature. Symbols without the resolution are left out.
+
+        """
+        rows = []
+        for exchange, ticker in symbols:
+            rec = self._get_index_record(exchange, ticker, resolution)
+            if rec is None:
+                continue
+            row = {'exchange': exchange, 'ticker': ticker,
+                   'time': rec['last-time']}
+            for name in names:
+                values = self.get_feature(exchange, ticker, resolution, name,
+                                          start=rec['last-time'])
+                row[name] = values[name].iloc[-1] if len(values) else np.nan
+            rows.append(row)
+        ret = pd.DataFrame(rows, columns=['exchange', 'ticker', 'time'] +
+                           list(names))
+        return ret.set_index(['exchange', 'ticker'])
+
+    def get_events(self, symbols, start=None, end=None, columns=None):
+        """Load events of many tickers.
+
+        `symbols` are (exchange, ticker) tuples. If `columns` are given (e.g.
+        ['dividend']), only these columns and the rows where at least one of
+        them is not missing are returned.
+
+        Returns a data frame with 'exchange', 'ticker', 'time' and the event
+        columns, sorted by symbol and time.
+
+        """
+        frames = []
+        for exchange, ticker in symbols:
+            events = self._load_events(exchange, ticker, start, end, columns)
+            if events is None:
+                continue
+            if columns is not None:
+                events = events[events.notnull().any(axis=1).to_numpy()]
+            frame = pd.DataFrame(events).reset_index()
+            frame.insert(0, 'exchange', exchange)
+            frame.insert(1, 'ticker', ticker)
+            frames.append(frame)
+        if not frames:
+            names = ev.EVENT_COLUMNS if columns is None else list(columns)
+            return pd.DataFrame(columns=['exchange', 'ticker', 'time'] + names)
+        return pd.concat(frames, ignore_index=True)
 
     def _get_index_record(self, exchange, ticker, resolution):
-        """Get index record by ticker and resolution."""
-        matches = self.index[
-            (self.index['exchange'] == exchange)
-            & (self.index['ticker'] == ticker)
-            & (self.index['resolution'] == resolution)
-        ]
-        if len(matches) == 1:
-            return matches.iloc[0]
-        elif len(matches) > 1:
-            raise Exception('Multiple index records for {}@{} - repo corrupt?'
-                            .format(ticker, resolution))
-        # otherwise return None
-
-    def _load_series(self, index_record):
-        """Load series by index_record."""
+        """Get index record by ticker and resolution (or None)."""
+        return self._records.get((exchange, ticker, resolution))
+
+    def _load_series(self, index_record, **options):
+        """Load series by index_record.
+
+        Options are passed to `storage.load_series()`.
+
+        """
+        options.setdefault('mmap', self.mmap)
         data_path = os.path.join(self.path, index_record['filename'])
-        data = pd.read_csv(data_path, converters=CONVERTERS,
-                           float_precision='high')
-        # High precision float converter above is necessary to avoid drift of
-        # the floating point values. test_get_series fails without it.
-        ret = ds.Series(data)
+        ret = storage.load_series(data_path, **options)
         for key in ret._metadata:
             setattr(ret, key, index_record[key])
         return ret
@@ -132,11 +707,281 @@ class Repository:
     def _save_series(self, index_record, series):
         """Save series using the index_record."""
         data_path = os.path.join(self.path, index_record['filename'])
-        series.to_csv(data_path)
+        storage.save_series(data_path, series)
+
+    def get_series(self, exchange, ticker, resolution, start=None, end=None,
+                   columns=None, events=False, adjusted=False):
+        """Load and return series by ticker and resolution.
+
+        If `start` and/or `end` are given, only the records between them
+        (inclusive) are returned. If `columns` is given, only these columns
+        are returned. Binary series files only read the requested data.
+
+        If the resolution is not stored, but can be derived by resampling a
+        stored series of the same ticker (see `portfel.data.resample`), the
+        derived series is returned. It's cached on disk until the source
+        series changes.
+
+        Event columns (see `portfel.data.events`) are only included if
+        `events` is true or if they are listed in `columns`. They are read
+        from the events of the ticker.
+
+        If `adjusted` is true, prices and volumes are adjusted for splits and
+        dividends (see `portfel.data.adjust`).
+
+        """
+        source = self._find_series(exchange, ticker, resolution)
+        if source is None and not self._lock_depth:
+            self.refresh()  # Maybe it was added by another process.
+            source = self._find_series(exchange, ticker, resolution)
+        if source is None:
+            raise KeyError('{}:{}@{}'.format(exchange, ticker, resolution))
 
-    def get_series(self, exchange, ticker, resolution):
-        """Load and return series by exact ticker and resolution."""
+        if self.memory_cache is None:
+            return self._read_series(source, resolution, start, end, columns,
+                                     events, adjusted)
+        return self._get_cached(source, resolution, start, end, columns,
+                                events, adjusted)
+
+    def _many_loader(self, jobs, processes, options):
+        """Make an executor and a function for loading series by key."""
+        if processes:
+            executor = cf.ProcessPoolExecutor(
+                max_workers=jobs,
+                initializer=_init_worker,
+                initargs=(self.path, {
+                    'format': self.format,
+                    'mmap': self.mmap,
+                    'cache_size': self.cache_size,
+                    'memory_cache_size': self.memory_cache_size,
+                }),
+            )
+            return executor, functools.partial(_worker_get_series, options)
+        executor = cf.ThreadPoolExecutor(max_workers=jobs)
+        return executor, lambda key: self.get_series(*key, **options)
+
+    def get_many(self, keys, jobs=None, processes=False, **options):
+        """Load many series concurrently.
+
+        `keys` are (exchange, ticker, resolution) tuples and options are
+        passed to `get_series()`. The series are loaded by a pool of `jobs`
+        threads, which overlaps reading of the files, or by a pool of
+        processes if `processes` is true, which also parses them in parallel
+        (but the series are then copied between the processes). The worker
+        processes open the repository with the same settings.
+
+        Returns a dict from the keys to the series. If loading a series fails,
+        the exception is the value instead of the series.
+
+        """
+        keys = [tuple(key) for key in keys]
+        executor, load = self._many_loader(jobs, processes, options)
+        ret = {}
+        with executor:
+            futures = {executor.submit(load, key): key for key in keys}
+            for future in cf.as_completed(futures):
+                try:
+                    ret[futures[future]] = future.result()
+                except Exception as e:
+                    ret[futures[future]] = e
+        return {key: ret[key] for key in keys}
+
+    async def get_many_async(self, keys, jobs=None, processes=False,
+                             **options):
+        """Load many series concurrently from a coroutine.
+
+        This is an asyncio variant of `get_many()` that doesn't block the
+        event loop while the series are loaded.
+
+        """
+        keys = [tuple(key) for key in keys]
+        executor, load = self._many_loader(jobs, processes, options)
+        loop = asyncio.get_running_loop()
+        with executor:
+            results = await asyncio.gather(
+                *[loop.run_in_executor(executor, load, key) for key in keys],
+                return_exceptions=True,
+            )
+        return dict(zip(keys, results))
+
+    def get_panel(self, symbols, resolution, fields=None, start=None,
+                  end=None, join='outer', errors='raise', jobs=None):
+        """Load series of many symbols aligned into a panel.
+
+        `symbols` are (exchange, ticker) tuples. The series are loaded with
+        `get_many()` (only the requested fields if they are given) and
+        combined with `portfel.data.panel.Panel.from_series()`.
+
+        If `errors` is 'raise', the first error of loading a series is raised,
+        if it's 'skip', the series that can't be loaded are left out.
+
+        """
+        keys = [(exchange, ticker, resolution) for exchange, ticker in symbols]
+        loaded = self.get_many(keys, jobs=jobs, start=start, end=end,
+                               columns=fields)
+        series_list = []
+        for result in loaded.values():
+            if isinstance(result, Exception):
+                if errors == 'raise':
+                    raise result
+                continue
+            series_list.append(result)
+        return pnl.Panel.from_series(series_list, fields=fields, join=join)
+
+    def _find_series(self, exchange, ticker, resolution):
+        """Find the index record of the stored or source series (or None)."""
         rec = self._get_index_record(exchange, ticker, resolution)
         if rec is None:
-            raise KeyError('{}:{}@{}'.format(exchange, ticker, resolution))
-        return self._load_series(rec)
+            rec = self._find_source(exchange, ticker, resolution)
+        return rec
+
+    def _read_series(self, source, resolution, start, end, columns, events,
+                     adjusted=False):
+        """Load stored series or series derived from it with events."""
+        if columns is None:
+            bar_columns = None
+            event_columns = ev.EVENT_COLUMNS if events else []
+        else:
+            bar_columns = [c for c in columns if c not in ev.EVENT_COLUMNS]
+            event_columns = [c for c in columns if c in ev.EVENT_COLUMNS]
+
+        options = {'start': start, 'end': end, 'columns': bar_columns}
+        if adjusted:
+            ret = self._read_adjusted(source, resolution, **options)
+        elif source['resolution'] == resolution:
+            ret = self._load_series(source, **options)
+        else:
+            ret = self._get_derived_series(source, resolution, **options)
+
+        # Series stored before events were separated have event columns.
+        legacy = [c for c in ret.columns if c in ev.EVENT_COLUMNS]
+        stored_events = None
+        if event_columns:
+            stored_events = self._load_events(source['exchange'],
+                                              source['ticker'], start, end)
+            if legacy and stored_events is None:
+                stored_events = ret[legacy]
+        if legacy:
+            ret = ret.drop(columns=legacy)
+        if not event_columns:
+            return ret
+
+        if columns is None:
+            present = [] if stored_events is None else stored_events.columns
+            event_columns = [c for c in event_columns if c in present]
+        ret = ev.attach_events(ret, stored_events, event_columns)
+        if columns is not None:
+            ret = ret[list(columns)]
+        return ret
+
+    def _get_cached(self, source, resolution, start, end, columns, events,
+                    adjusted):
+        """Get series from the memory cache or load and cache it.
+
+        The key of the cache entry is made of the ticker, the query and the
+        modification times and sizes of the file of the `source` series, of
+        the events of the ticker and of the adjustment factors, so changes of
+        any of them by other processes are noticed.
+
+        """
+        paths = [
+            os.path.join(self.path, source['filename']),
+            self._events_path(source['exchange'], source['ticker']),
+            self._factors_path(source),
+        ]
+        key = (
+            (source['exchange'], source['ticker']),
+            resolution, start, end, columns and tuple(columns), events,
+            adjusted, tuple(_file_version(path) for path in paths),
+        )
+        ret = self.memory_cache.get(key)
+        if ret is None:
+            ret = self._read_series(source, resolution, start, end, columns,
+                                    events, adjusted)
+            self.memory_cache.put(key, ret)
+            ret = ret.copy(deep=False)
+        return ret
+
+    def _find_source(self, exchange, ticker, resolution):
+        """Find the stored series to derive the resolution from (or None).
+
+        The coarsest suitable resolution is used to do the least work.
+
+        """
+        try:
+            rs.parse_resolution(resolution)
+        except ValueError:
+            return None
+        candidates = []
+        for rec in self._by_ticker.get((exchange, ticker), []):
+            try:
+                if rs.can_derive(rec['resolution'], resolution):
+                    candidates.append(rec)
+            except ValueError:  # Resolutions that we don't understand.
+                continue
+        if not candidates:
+            return None
+        return max(candidates, key=lambda rec: rs.bar_length(
+            rec['resolution'],
+        ))
+
+    def _get_derived_series(self, source, resolution, **options):
+        """Load or make and cache series derived from the source series."""
+        options.setdefault('mmap', self.mmap)
+        key = source['exchange'], source['ticker'], resolution.lower()
+        ret = self._derived.get(key, source, **options)
+        if ret is None:
+            series = rs.resample(self._load_series(source), resolution)
+            self._derived.put(key, source, series)
+            ret = self._derived.get(key, source, **options)
+        for k in ret._metadata:
+            setattr(ret, k, source[k])
+        ret.resolution = resolution
+        return ret
+
+    def convert(self, format):
+        """Convert all series files to another storage format.
+
+        Event columns of series files stored before the events were kept
+        separately are moved to the events files. Stored adjustment factors
+        are removed, they are recomputed when needed. Events and indicator
+        values are converted too.
+
+        """
+        self.format = format
+
+        with self._locked():
+            for rec in self._records.values():
+                old_filename = rec['filename']
+                base, ext = os.path.splitext(old_filename)
+                filename = storage.filename(base, format)
+                if filename == old_filename:
+                    continue
+                series, events = ev.split_events(self._load_series(rec))
+                if events is not None and len(events):
+                    self._add_events(rec['exchange'], rec['ticker'], events)
+                storage.save_series(os.path.join(self.path, filename), series)
+                factors_path = self._factors_path(rec)
+                if os.path.exists(factors_path):
+                    os.unlink(factors_path)
+                rec['filename'] = filename
+                self._save_index()
+                os.unlink(os.path.join(self.path, old_filename))
+
+            self._convert_files('events', format)
+            self._convert_files('indicators', format)
+
+    def _convert_files(self, dirname, format):
+        """Convert series files in the subdirectory to the storage format."""
+        dirname = os.path.join(self.path, dirname)
+        if not os.path.isdir(dirname):
+            return
+        for old_filename in os.listdir(dirname):
+            base, ext = os.path.splitext(old_filename)
+            filename = storage.filename(base, format)
+            if filename == old_filename or ext in ['.tmp', '.json']:
+                continue
+            old_path = os.path.join(dirname, old_filename)
+            series = storage.load_series(old_path)
+            storage.save_series(os.path.join(dirname, filename), series)
+            os.unlink(old_path)
@@ -0,0 +1,156 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Resampling of series to coarser resolutions.
+
+Resolutions follow TradingView export names (lowercased): a plain number is
+minutes (e.g. '1', '5', '60'), otherwise a number with a unit: 'h' (hours),
+'d' (days), 'w' (weeks) or 'm' (months, 'M' is also accepted).
+
+Each bar of the resampled series is labeled with the time of its first source
+bar. Days start at midnight UTC, weeks on Monday.
+
+"""
+
+import fractions
+import re
+
+import numpy as np
+import pandas as pd
+
+import portfel.data.series as ds
+
+# Length of fixed units in minutes.
+UNIT_MINUTES = {
+    '': 1,
+    'h': 60,
+    'd': 24 * 60,
+}
+
+# Aggregation of the columns. The columns that are not listed here take the
+# last non-missing value.
+AGGREGATIONS = {
+    'open': 'first',
+    'high': 'max',
+    'low': 'min',
+    'close': 'last',
+    'volume': 'sum',
+    'dividend': 'sum',
+}
+
+
+def parse_resolution(resolution):
+    """Parse resolution into a (count, unit) tuple.
+
+    The unit is '' for minutes, 'h', 'd', 'w' or 'm'.
+
+    """
+    match = re.fullmatch(r'(\d+)([hdwmHDWM]?)', str(resolution).strip())
+    if match is None or int(match.group(1)) == 0:
+        raise ValueError('Invalid resolution: {}'.format(resolution))
+    return int(match.group(1)), match.group(2).lower()
+
+
+def _fixed_minutes(count, unit):
+    """Length of resolution in minutes or None if it's not fixed."""
+    if unit in UNIT_MINUTES:
+        return count * UNIT_MINUTES[unit]
+    return None
+
+
+def bar_length(resolution):
+    """Approximate length of a bar of the resolution (for comparisons)."""
+    count, unit = parse_resolution(resolution)
+    minutes = _fixed_minutes(count, unit)
+    if minutes is None:
+        minutes = count * UNIT_MINUTES['d'] * (7 if unit == 'w' else 30)
+    return pd.Timedelta(minutes=minutes)
+
+
+def can_derive(source, target):
+    """Check if `target` resolution can be made by resampling `source`."""
+    source_count, source_unit = parse_resolution(source)
+    target_count, target_unit = parse_resolution(target)
+    source_minutes = _fixed_minutes(source_count, source_unit)
+    day = UNIT_MINUTES['d']
+
+    if source_minutes is not None:
+        target_minutes = _fixed_minutes(target_count, target_unit)
+        if target_minutes is not None:
+            return target_minutes % source_minutes == 0
+        return day % source_minutes == 0  # Weeks and months are whole days.
+    if source_unit == target_unit:  # Weeks or months.
+        return target_count % source_count == 0
+    return False
+
+
+def bucket_keys(index, resolution):
+    """Calculate keys of the target bars for each time in the index."""
+    count, unit = parse_resolution(resolution)
+    minutes = _fixed_minutes(count, unit)
+    if minutes is not None:
+        return index.asi8 // (minutes * 60 * 10 ** 9)
+    if unit == 'w':
+        days = index.asi8 // (UNIT_MINUTES['d'] * 60 * 10 ** 9)
+        return (days + 3) // (7 * count)  # 1970-01-01 was a Thursday.
+    return (index.year * 12 + index.month - 1).to_numpy() // count
+
+
+def _combine_splits(splits, group_of, size):
+    """Combine splits within each group by multiplying them."""
+    ret = np.full(size, None, dtype=object)
+    present = np.flatnonzero(pd.notnull(splits))
+    for i in present:
+        g = group_of[i]
+        split = fractions.Fraction(splits[i])
+        ret[g] = split if ret[g] is None else ret[g] * split
+    for g in set(group_of[present]):
+        ret[g] = '{}/{}'.format(ret[g].numerator, ret[g].denominator)
+    return ret
+
+
+def resample(series, resolution):
+    """Resample series to a coarser resolution.
+
+    The series must be sorted by time. Metadata is copied from the series,
+    except for the resolution.
+
+    """
+    keys = bucket_keys(series.index, resolution)
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+    group_of = np.cumsum(first) - 1
+    groups = series.groupby(group_of, sort=False)
+
+    columns = {'time': series.index[first]}
+    for name in series.columns:
+        if name == 'split':
+            columns[name] = _combine_splits(series[name].to_numpy(), group_of,
+                                            len(columns['time']))
+            continue
+        how = AGGREGATIONS.get(name, 'last')
+        column = groups[name]
+        if how == 'sum':
+            values = column.sum(min_count=1)
+        else:
+            values = getattr(column, how)()
+        columns[name] = values.to_numpy()
+
+    ret = ds.Series(columns)
+    ret.index.name = series.index.name
+    for key in ret._metadata:
+        setattr(ret, key, getattr(series, key, None))
+    ret.resolution = resolution
+    return ret
@@ -22,6 +22,7 @@ called Series and each 1-dimensional column of it is called Column.
 
 """
 
+import numpy as np
 import pandas as pd
 
 
@@ -59,3 +60,36 @@ class Series(pd.DataFrame):
     @property
     def _constructor_sliced(self):
         return Column
+
+
+def merge(old, new):
+    """Merge records of two series.
+
+    Records of `new` replace the records of `old` with the same time. The
+    result is sorted by time.
+
+    """
+    ret = pd.concat([old, new])
+    ret = ret[~ret.index.duplicated(keep='last')]
+    return ret.sort_index(kind='mergesort')
+
+
+def first_change(old, new):
+    """Find the time of the first record of `new` that changes `old`.
+
+    That's the first record of `new` that isn't in `old` with the same
+    values. Returns None if merging `new` into `old` changes nothing.
+
+    """
+    new = new.sort_index(kind='mergesort')
+    if len(new) == 0:
+        return None
+    if not set(new.columns) <= set(old.columns):
+        return new.index[0]
+    stored = old.reindex(new.index)
+    same = new.index.isin(old.index)
+    for name in new:
+        a = stored[name].to_numpy()
+        b = new[name].to_numpy()
+        same &= (a == b) | (pd.isnull(a) & pd.isnull(b))
+    return None if same.all() else new.index[np.argmin(same)]
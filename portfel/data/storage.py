@@ -0,0 +1,87 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Dispatcher for storing time series in files of different formats.
+
+The functions here are safe to use from multiple processes: new files replace
+the old ones atomically and loading takes a shared lock on the file, while
+merging takes an exclusive one, since it can modify the file in place.
+
+"""
+
+import importlib
+import os
+
+import portfel.data.locking as locking
+import portfel.names as names
+
+FORMATS = {
+    name: importlib.import_module('portfel.data.formats.' + name)
+    for name in names.STORAGE_FORMATS
+}
+
+# Format of the new series files.
+DEFAULT_FORMAT = names.DEFAULT_FORMAT
+
+
+def format_of(path):
+    """Determine storage format of the file by its extension."""
+    ext = os.path.splitext(path)[1]
+    for name, module in FORMATS.items():
+        if module.EXTENSION == ext:
+            return name
+    raise ValueError('Unknown storage format: {}'.format(path))
+
+
+def filename(base, format=DEFAULT_FORMAT):
+    """Add file extension of the format to the base file name."""
+    return base + FORMATS[format].EXTENSION
+
+
+def load_series(path, **options):
+    """Load series from a file.
+
+    Options are passed to the `load()` function of the format module.
+
+    Memory-mapped series (see `portfel.data.formats.binary.load()`) are only
+    protected by the lock while the file is opened. Later in-place merges
+    into the file can change the records that they show unless they are made
+    with `copy_on_write` (see `merge_series()`).
+
+    """
+    module = FORMATS[format_of(path)]
+    with locking.locked(path, shared=True):
+        return module.load(path, **options)
+
+
+def save_series(path, series):
+    """Save series to a file (atomically replacing the existing file)."""
+    module = FORMATS[format_of(path)]
+    with locking.replacing(path) as tmp_path:
+        module.save(tmp_path, series)
+
+
+def merge_series(path, series, **options):
+    """Merge records of the series into an existing file.
+
+    See `portfel.data.series.merge()` for the semantics. Returns the time of
+    the first record that changed (None if nothing did): the stored records
+    before it stay the same. Options are passed to the `merge()` function of
+    the format module.
+
+    """
+    module = FORMATS[format_of(path)]
+    with locking.locked(path):
+        return module.merge(path, series, **options)
@@ -0,0 +1,64 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Rolling windows over time series.
+
+The bounds of all windows are calculated at once with a binary search in the
+time index, so enumerating the windows takes O(n log n) regardless of their
+length, and the windows themselves are views into the series.
+
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _shift(times, period):
+    """Add period (a timedelta or a calendar offset) to the times."""
+    if not isinstance(period, pd.DateOffset):
+        period = pd.Timedelta(period)
+    return times + period
+
+
+def bounds(index, period, step=1):
+    """Calculate bounds of rolling windows of `period` length over the index.
+
+    `period` can be anything that `pd.Timedelta` accepts or a calendar offset
+    like `pd.DateOffset(years=10)`. The windows start at every `step`-th
+    record and end at the last record that is not more than `period` after
+    the start. The last window is the first one that reaches the end of the
+    index.
+
+    Returns two arrays: the positions of the first records of the windows and
+    the positions after their last records (like in slices).
+
+    """
+    starts = np.arange(0, len(index), step)
+    stops = index.searchsorted(_shift(index[starts], period), side='right')
+    complete = np.flatnonzero(stops == len(index))
+    if len(complete):
+        starts, stops = starts[:complete[0] + 1], stops[:complete[0] + 1]
+    return starts, stops
+
+
+def rolling(series, period, step=1):
+    """Iterate over rolling windows of the series (see `bounds()`).
+
+    The windows are views into the series, so they should not be modified.
+
+    """
+    starts, stops = bounds(series.index, period, step)
+    for start, stop in zip(starts.tolist(), stops.tolist()):
+        yield series.iloc[start:stop]
@@ -13,27 +13,144 @@
 # You should have received a copy of the GNU General Public License
 # along with Portfel. If not, see <http://www.gnu.org/licenses/>.
 
-"""Formatting and pretty-printing."""
+"""Formatting and pretty-printing.
 
-import tabulate as tbl
+Tables are written row by row as they are formatted, so that long tables
+start printing immediately and don't have to be held in memory as strings.
+Column widths are computed from the first SAMPLE_ROWS rows (longer values
+further down just stick out).
 
-TABLE_FORMAT = "presto"
+"""
 
+import csv
+import itertools
+import json
+import math
+import numbers
+import sys
 
-def print_table(data, columns=None, sort_by=None):
-    """Print a nice table with data."""
-    if len(data) == 0:
-        print('-- no data --')
+# Output formats of the tables.
+FORMATS = ['table', 'csv', 'jsonl']
+
+# Number of rows used to compute the column widths.
+SAMPLE_ROWS = 1000
+
+
+def _is_missing(value):
+    """Check if the value is None, NaN or NaT."""
+    return value is None or value != value
+
+
+def _is_number(value):
+    return isinstance(value, numbers.Number) and not isinstance(value, bool)
+
+
+def _format_cell(value):
+    """Format value for the table."""
+    if _is_missing(value):
+        return ''
+    if isinstance(value, float):
+        return format(value, 'g')
+    return str(value)
+
+
+def _json_value(value):
+    """Convert value to a JSON-compatible one."""
+    if _is_missing(value):
+        return None
+    if hasattr(value, 'item'):  # Numpy scalars.
+        value = value.item()
+    if isinstance(value, float) and math.isinf(value):
+        return str(value)
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _write_table(columns, rows, file):
+    """Write aligned table in the style of tabulate's 'presto' format."""
+    sample = list(itertools.islice(rows, SAMPLE_ROWS))
+    if not sample:
+        print('-- no data --', file=file)
         return
 
-    if sort_by is not None:
-        data = data.sort_values(by=sort_by)
-    if columns is not None:
-        data = data[columns]
-
-    print(tbl.tabulate(
-        data,
-        headers='keys',
-        showindex=False,
-        tablefmt=TABLE_FORMAT
-    ))
+    numeric = [
+        all(_is_number(row[i]) or _is_missing(row[i]) for row in sample)
+        for i in range(len(columns))
+    ]
+    widths = [len(name) + 2 for name in columns]
+    for row in sample:
+        for i, value in enumerate(row):
+            widths[i] = max(widths[i], len(_format_cell(value)))
+
+    def write_row(cells):
+        line = ' | '.join(
+            cell.rjust(width) if right else cell.ljust(width)
+            for cell, width, right in zip(cells, widths, numeric)
+        )
+        file.write(' ' + line.rstrip() + '\n')
+
+    write_row([str(name) for name in columns])
+    file.write('+'.join('-' * (width + 2) for width in widths) + '\n')
+    for row in itertools.chain(sample, rows):
+        write_row([_format_cell(value) for value in row])
+
+
+def _write_csv(columns, rows, file):
+    writer = csv.writer(file, lineterminator='\n')
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(['' if _is_missing(v) else v for v in row])
+
+
+def _write_jsonl(columns, rows, file):
+    for row in rows:
+        file.write(json.dumps({
+            name: _json_value(value) for name, value in zip(columns, row)
+        }) + '\n')
+
+
+def _frame_column(data, name):
+    """Get column of the data frame (or its index if it has the name)."""
+    if name not in data and name == data.index.name:
+        return data.index
+    return data[name]
+
+
+WRITERS = {
+    'table': _write_table,
+    'csv': _write_csv,
+    'jsonl': _write_jsonl,
+}
+
+
+def print_table(data, columns=None, sort_by=None, limit=None, offset=0,
+                format='table', file=None):
+    """Print a nice table with data.
+
+    `data` can be a data frame or a list of dicts (which doesn't need pandas).
+    Only `limit` rows starting from `offset` (after sorting) are printed if
+    they are given. See FORMATS for the output formats.
+
+    """
+    file = file or sys.stdout
+    stop = None if limit is None else offset + limit
+
+    if isinstance(data, list):
+        if columns is None:
+            columns = list(data[0]) if data else []
+        if sort_by is not None:
+            data = sorted(data, key=lambda row: [row[k] for k in sort_by])
+        rows = (tuple(row.get(k) for k in columns)
+                for row in itertools.islice(data, offset, stop))
+    else:
+        if sort_by is not None:
+            data = data.sort_values(by=sort_by)
+        if columns is None:
+            index = [] if data.index.name is None else [data.index.name]
+            columns = index + list(data.columns)
+        data = data.iloc[offset:stop]
+        rows = zip(*[_frame_column(data, name) for name in columns])
+
+    WRITERS[format]([str(name) for name in columns], rows, file)
+    file.flush()
@@ -0,0 +1,164 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+"""Registry of features: derived columns that the repository stores.
+
+A feature is an indicator (see `portfel.indicators`) with a name and a
+version, which is increased when the computation changes, so that the stored
+values are recomputed. Features are stored and updated with the other
+indicators of the series.
+
+Most features are functions that compute a column from the bars of a series
+(see `register()`). They are run as `FeatureIndicator` that keeps the last
+`lookback` bars as its state and computes the values of new bars from them.
+
+See `portfel.data.repository.Repository.get_feature()`.
+
+"""
+
+import numpy as np
+import pandas as pd
+
+import portfel.indicators as ind
+
+# Registered features by name.
+FEATURES = {}
+
+# Functions of the features registered with `register()` by name.
+FUNCTIONS = {}
+
+
+class Feature:
+    """Registered feature (see `register()`)."""
+
+    def __init__(self, name, version, make_indicator):
+        self.name = name
+        self.version = version
+        self._make_indicator = make_indicator
+
+    def indicator(self):
+        """Make an indicator that computes the feature."""
+        return self._make_indicator()
+
+
+class FeatureIndicator(ind.Indicator):
+    """Indicator that computes a feature function (see `register()`)."""
+
+    TYPE = 'feature'
+
+    def __init__(self, feature):
+        super().__init__(feature=feature)
+
+    def _initial_state(self):
+        # Input values of the last `lookback` bars by column.
+        return {'window': {name: [] for name in self.inputs}}
+
+    @property
+    def inputs(self):
+        return FUNCTIONS[self.params['feature']]['inputs']
+
+    def _compute(self, series):
+        """Compute the values for the bars of the series after the window
+        and move the window to the end of the series."""
+        function = FUNCTIONS[self.params['feature']]
+        window = pd.DataFrame(self.state['window'], columns=self.inputs)
+        bars = pd.DataFrame({name: np.asarray(series[name], dtype=float)
+                             for name in self.inputs}, columns=self.inputs)
+        data = pd.concat([window, bars], ignore_index=True)
+        values = function['function'](data).to_numpy(dtype=float)
+        tail = data.iloc[max(len(data) - function['lookback'], 0):]
+        self.state['window'] = {name: tail[name].tolist()
+                                for name in self.inputs}
+        return values[len(window):]
+
+    def update(self, *values):
+        bars = {name: [value] for name, value in zip(self.inputs, values)}
+        return (self._compute(bars)[0],)
+
+    def run(self, series):
+        values = self._compute(series)
+        return self._output_series(series.index, zip(values))
+
+    def _batch(self, series):
+        return [self._compute(series)]
+
+
+ind.INDICATORS[FeatureIndicator.TYPE] = FeatureIndicator
+
+
+def register_indicator(name, version, make_indicator):
+    """Register a feature computed by an indicator.
+
+    `make_indicator` is called without arguments to make the indicator.
+    Only the first output of the indicator is used.
+
+    """
+    FEATURES[name] = Feature(name, version, make_indicator)
+
+
+def register(name, version, inputs, lookback):
+    """Return a decorator that registers a function as a feature.
+
+    The function takes a data frame with `inputs` columns and returns a
+    column. The value of a bar may only depend on the bar and `lookback` bars
+    before it.
+
+    """
+
+    def decorator(function):
+        FUNCTIONS[name] = {'inputs': inputs, 'function': function,
+                           'lookback': lookback}
+        register_indicator(name, version, lambda: FeatureIndicator(name))
+        return function
+
+    return decorator
+
+
+@register('returns', 1, ['close'], lookback=1)
+def returns(series):
+    """Relative change of the close from the previous bar."""
+    return series['close'].pct_change()
+
+
+@register('log-returns', 1, ['close'], lookback=1)
+def log_returns(series):
+    """Logarithm of the ratio of the close to the previous one."""
+    return np.log(series['close']).diff()
+
+
+@register('sma-50', 1, ['close'], lookback=49)
+def sma_50(series):
+    return ind.sma(series['close'], 50)
+
+
+@register('sma-200', 1, ['close'], lookback=199)
+def sma_200(series):
+    return ind.sma(series['close'], 200)
+
+
+@register('close-to-sma-200', 1, ['close'], lookback=199)
+def close_to_sma_200(series):
+    """Relative distance of the close from its 200 bar average (negative if
+    the close is below)."""
+    return series['close'] / ind.sma(series['close'], 200) - 1
+
+
+@register('high-252', 1, ['high'], lookback=251)
+def high_252(series):
+    """Highest high of the last 252 bars (a year of daily bars)."""
+    return ind.rolling_max(series['high'], 252)
+
+
+# Relative distance of the low from the highest high so far.
+register_indicator('drawdown', 1, ind.LowDrawdown)
@@ -0,0 +1,513 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Technical indicators.
+
+Every indicator has a batch form, a function that computes it over whole
+columns with array operations, and an online form, a subclass of `Indicator`
+that computes it bar by bar in constant time per bar. The online form keeps
+its state in a dict of plain values, so it can be saved (see `to_dict()`) and
+resumed later, e.g. when new bars arrive. `Indicator.batch()` computes the
+values with the batch form and sets the state after the last bar, so that
+`update()` can continue from there.
+
+Indicators that need several bars are missing (NaN) until they have enough
+of them. Missing values in the inputs are not supported: bars with missing
+prices should be dropped first.
+
+"""
+
+import abc
+
+import numpy as np
+import pandas as pd
+
+import portfel.analysis.drawdown as dd
+import portfel.data.series as ds
+
+
+def sma(column, period):
+    """Simple moving average."""
+    return column.rolling(period).mean()
+
+
+def ema(column, period):
+    """Exponential moving average starting from the first value."""
+    return column.ewm(span=period, adjust=False).mean()
+
+
+def rolling_max(column, period):
+    """Maximum of the last `period` values."""
+    return column.rolling(period).max()
+
+
+def rolling_min(column, period):
+    """Minimum of the last `period` values."""
+    return column.rolling(period).min()
+
+
+def true_range(series):
+    """True range of the bars (high - low for the first bar)."""
+    previous = series['close'].shift().to_numpy(dtype=float)
+    high = series['high'].to_numpy(dtype=float)
+    low = series['low'].to_numpy(dtype=float)
+    return ds.Column(
+        np.fmax(high - low, np.fmax(np.abs(high - previous),
+                                    np.abs(low - previous))),
+        index=series.index,
+    )
+
+
+def _wilder(values, period):
+    """Wilder's smoothing: mean of the first `period` values and then
+    avg = (avg * (period - 1) + value) / period."""
+    ret = np.full(len(values), np.nan)
+    if len(values) >= period:
+        seeded = np.append(values[:period].mean(), values[period:])
+        ret[period - 1:] = pd.Series(seeded).ewm(
+            alpha=1 / period, adjust=False,
+        ).mean().to_numpy()
+    return ret
+
+
+def atr(series, period=14):
+    """Average true range (with Wilder's smoothing)."""
+    return ds.Column(_wilder(true_range(series).to_numpy(), period),
+                     index=series.index)
+
+
+def _rsi(avg_gain, avg_loss):
+    """Relative strength index from average gain and loss."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ret = 100 - 100 / (1 + avg_gain / avg_loss)
+    return np.where(avg_loss == 0, 100.0, ret)
+
+
+def _gains(column):
+    """Wilder's averages of the gains and losses of the column."""
+    delta = np.diff(column.to_numpy(dtype=float))
+    return np.fmax(delta, 0), np.fmax(-delta, 0)
+
+
+def rsi(column, period=14):
+    """Relative strength index (with Wilder's smoothing)."""
+    gains, losses = _gains(column)
+    values = _rsi(_wilder(gains, period), _wilder(losses, period))
+    return ds.Column(np.append(np.nan, values), index=column.index)
+
+
+def bollinger(column, period=20, width=2):
+    """Bollinger bands: 'middle', 'upper' and 'lower'.
+
+    The bands are `width` standard deviations (of the population of the last
+    `period` values) away from the simple moving average.
+
+    """
+    middle = sma(column, period)
+    deviation = column.rolling(period).std(ddof=0) * width
+    return ds.Series({'middle': middle, 'upper': middle + deviation,
+                      'lower': middle - deviation})
+
+
+def drawdown(column):
+    """Relative distance from the running maximum: 1 - value / maximum."""
+    return 1 - column / dd.running_peak(column)
+
+
+class Indicator(abc.ABC):
+    """Online form of an indicator.
+
+    Subclasses set TYPE (the key in INDICATORS) and define `inputs` (input
+    columns), `_batch()` that computes the output columns of a series with the
+    batch form and sets the state after its last bar, and `update()` that
+    takes the input values of the next bar and returns the output values.
+
+    """
+
+    TYPE = None
+
+    def __init__(self, **params):
+        self.params = params
+        self.state = self._initial_state()
+
+    def _initial_state(self):
+        return {}
+
+    @property
+    def name(self):
+        """Name of the indicator with its parameters, e.g. 'sma-20-close'."""
+        return '-'.join([self.TYPE] + [str(v) for v in self.params.values()])
+
+    @property
+    def inputs(self):
+        return [self.params['column']]
+
+    @property
+    def outputs(self):
+        """Names of the output columns."""
+        return [self.name]
+
+    def batch(self, series):
+        """Compute the indicator for the series with the batch form.
+
+        The state is set to continue after the last bar of the series.
+
+        """
+        self.state = self._initial_state()
+        if len(series) == 0:
+            return self._output_series(series.index, [])
+        columns = self._batch(series)
+        return self._output_series(series.index, zip(*columns))
+
+    def run(self, series):
+        """Compute the indicator for the series bar by bar (continuing from
+        the current state)."""
+        columns = [series[name].to_numpy(dtype=float) for name in self.inputs]
+        rows = [self.update(*values) for values in zip(*columns)]
+        return self._output_series(series.index, rows)
+
+    def _output_series(self, index, rows):
+        rows = list(rows)
+        values = np.array(rows, dtype=float).reshape(len(rows),
+                                                     len(self.outputs))
+        ret = ds.Series({'time': index})
+        for i, name in enumerate(self.outputs):
+            ret[name] = values[:, i]
+        return ret
+
+    def to_dict(self):
+        """Return the type, parameters and state of the indicator."""
+        return {'type': self.TYPE, 'params': self.params,
+                'state': self.state}
+
+    @abc.abstractmethod
+    def update(self, *values):
+        """Take the input values of the next bar and return the outputs."""
+
+    @abc.abstractmethod
+    def _batch(self, series):
+        """Compute the output columns and set the state after the series."""
+
+
+class SMA(Indicator):
+    """Simple moving average."""
+
+    TYPE = 'sma'
+
+    def __init__(self, period=20, column='close'):
+        super().__init__(period=period, column=column)
+
+    def _initial_state(self):
+        # Ring buffer of the last values.
+        return {'window': [], 'position': 0, 'total': 0.0}
+
+    def _set_window(self, values):
+        """Set the state after the values."""
+        self.state = {'window': [float(v) for v in values], 'position': 0,
+                      'total': float(np.sum(values))}
+
+    def _push(self, value):
+        """Add value to the window, return the value that drops out."""
+        state = self.state
+        window = state['window']
+        dropped = None
+        if len(window) < self.params['period']:
+            window.append(value)
+        else:
+            dropped = window[state['position']]
+            window[state['position']] = value
+            state['position'] = (state['position'] + 1) % len(window)
+            state['total'] -= dropped
+        state['total'] += value
+        return dropped
+
+    def update(self, value):
+        self._push(value)
+        if len(self.state['window']) < self.params['period']:
+            return (np.nan,)
+        return (self.state['total'] / self.params['period'],)
+
+    def _batch(self, series):
+        column = series[self.params['column']]
+        self._set_window(column.to_numpy(dtype=float)[-self.params['period']:])
+        return [sma(column, self.params['period'])]
+
+
+class EMA(Indicator):
+    """Exponential moving average."""
+
+    TYPE = 'ema'
+
+    def __init__(self, period=20, column='close'):
+        super().__init__(period=period, column=column)
+
+    def _initial_state(self):
+        return {'value': None}
+
+    def update(self, value):
+        if self.state['value'] is not None:
+            alpha = 2 / (self.params['period'] + 1)
+            value = alpha * value + (1 - alpha) * self.state['value']
+        self.state['value'] = value
+        return (value,)
+
+    def _batch(self, series):
+        values = ema(series[self.params['column']], self.params['period'])
+        self.state['value'] = float(values.iloc[-1])
+        return [values]
+
+
+class RollingMax(Indicator):
+    """Maximum of the last values."""
+
+    TYPE = 'max'
+    SIGN = 1
+
+    def __init__(self, period=20, column='close'):
+        super().__init__(period=period, column=column)
+
+    def _initial_state(self):
+        # Positions and values of the candidates for the extreme, the one at
+        # `first` is the current extreme (the ones before it are expired).
+        return {'count': 0, 'candidates': [], 'first': 0}
+
+    def update(self, value):
+        state = self.state
+        candidates = state['candidates']
+        while (len(candidates) > state['first'] and
+               candidates[-1][1] * self.SIGN <= value * self.SIGN):
+            candidates.pop()
+        candidates.append([state['count'], value])
+        if candidates[state['first']][0] <= (state['count'] -
+                                             self.params['period']):
+            state['first'] += 1
+        if state['first'] > len(candidates) // 2:
+            del candidates[:state['first']]
+            state['first'] = 0
+        state['count'] += 1
+        if state['count'] < self.params['period']:
+            return (np.nan,)
+        return (candidates[state['first']][1],)
+
+    def _batch(self, series):
+        column = series[self.params['column']]
+        tail = column.to_numpy(dtype=float)[-self.params['period']:]
+        self.state['count'] = len(column) - len(tail)
+        for value in tail:
+            self.update(float(value))
+        function = rolling_max if self.SIGN > 0 else rolling_min
+        return [function(column, self.params['period'])]
+
+
+class RollingMin(RollingMax):
+    """Minimum of the last values."""
+
+    TYPE = 'min'
+    SIGN = -1
+
+
+class ATR(Indicator):
+    """Average true range."""
+
+    TYPE = 'atr'
+
+    def __init__(self, period=14):
+        super().__init__(period=period)
+
+    @property
+    def inputs(self):
+        return ['high', 'low', 'close']
+
+    def _initial_state(self):
+        # Sum of the true ranges until there are enough of them.
+        return {'close': None, 'count': 0, 'total': 0.0, 'atr': None}
+
+    def update(self, high, low, close):
+        state = self.state
+        period = self.params['period']
+        tr = high - low
+        if state['close'] is not None:
+            tr = max(tr, abs(high - state['close']), abs(low - state['close']))
+        state['close'] = close
+        state['count'] += 1
+        if state['count'] < period:
+            state['total'] += tr
+            return (np.nan,)
+        if state['count'] == period:
+            state['atr'] = (state['total'] + tr) / period
+        else:
+            state['atr'] = (state['atr'] * (period - 1) + tr) / period
+        return (state['atr'],)
+
+    def _batch(self, series):
+        values = atr(series, self.params['period'])
+        self.state = {
+            'close': float(series['close'].iloc[-1]),
+            'count': len(series),
+            'total': float(true_range(series).sum()),
+            'atr': None if np.isnan(values.iloc[-1]) else
+            float(values.iloc[-1]),
+        }
+        return [values]
+
+
+class RSI(Indicator):
+    """Relative strength index."""
+
+    TYPE = 'rsi'
+
+    def __init__(self, period=14, column='close'):
+        super().__init__(period=period, column=column)
+
+    def _initial_state(self):
+        # Sums of the gains and losses until there are enough of them, then
+        # their averages.
+        return {'close': None, 'count': 0, 'gain': 0.0, 'loss': 0.0}
+
+    def update(self, value):
+        state = self.state
+        period = self.params['period']
+        previous, state['close'] = state['close'], value
+        if previous is None:
+            return (np.nan,)
+        gain, loss = max(value - previous, 0), max(previous - value, 0)
+        state['count'] += 1
+        if state['count'] <= period:
+            state['gain'] += gain
+            state['loss'] += loss
+            if state['count'] < period:
+                return (np.nan,)
+            state['gain'] /= period
+            state['loss'] /= period
+        else:
+            state['gain'] = (state['gain'] * (period - 1) + gain) / period
+            state['loss'] = (state['loss'] * (period - 1) + loss) / period
+        return (float(_rsi(state['gain'], state['loss'])),)
+
+    def _batch(self, series):
+        column = series[self.params['column']]
+        period = self.params['period']
+        gains, losses = _gains(column)
+        self.state = {'close': float(column.iloc[-1]), 'count': len(gains)}
+        if len(gains) < period:
+            self.state.update(gain=float(gains.sum()),
+                              loss=float(losses.sum()))
+        else:
+            self.state.update(gain=float(_wilder(gains, period)[-1]),
+                              loss=float(_wilder(losses, period)[-1]))
+        return [rsi(column, period)]
+
+
+class Bollinger(SMA):
+    """Bollinger bands."""
+
+    TYPE = 'bollinger'
+
+    def __init__(self, period=20, width=2, column='close'):
+        Indicator.__init__(self, period=period, width=width, column=column)
+
+    def _initial_state(self):
+        return dict(super()._initial_state(), squares=0.0)
+
+    def _set_window(self, values):
+        super()._set_window(values)
+        self.state['squares'] = float(np.sum(np.square(values)))
+
+    @property
+    def outputs(self):
+        return [self.name + '-' + band
+                for band in ['middle', 'upper', 'lower']]
+
+    def update(self, value):
+        dropped = self._push(value)
+        state = self.state
+        state['squares'] += value * value
+        if dropped is not None:
+            state['squares'] -= dropped * dropped
+        period = self.params['period']
+        if len(state['window']) < period:
+            return (np.nan,) * 3
+        mean = state['total'] / period
+        variance = max(state['squares'] / period - mean * mean, 0.0)
+        deviation = np.sqrt(variance) * self.params['width']
+        return mean, mean + deviation, mean - deviation
+
+    def _batch(self, series):
+        column = series[self.params['column']]
+        self._set_window(column.to_numpy(dtype=float)[-self.params['period']:])
+        bands = bollinger(column, self.params['period'], self.params['width'])
+        return [bands['middle'], bands['upper'], bands['lower']]
+
+
+class Drawdown(Indicator):
+    """Relative distance from the running maximum."""
+
+    TYPE = 'drawdown'
+
+    def __init__(self, column='close'):
+        super().__init__(column=column)
+
+    def _initial_state(self):
+        return {'peak': None}
+
+    def update(self, value):
+        if self.state['peak'] is None or value > self.state['peak']:
+            self.state['peak'] = value
+        return (1 - value / self.state['peak'],)
+
+    def _batch(self, series):
+        column = series[self.params['column']]
+        self.state['peak'] = float(column.max())
+        return [drawdown(column)]
+
+
+class LowDrawdown(Indicator):
+    """Relative distance of the low from the highest high so far (see
+    `portfel.analysis.drawdown.drawdown()`)."""
+
+    TYPE = 'low-drawdown'
+
+    def __init__(self):
+        super().__init__()
+
+    def _initial_state(self):
+        return {'peak': None}
+
+    @property
+    def inputs(self):
+        return ['high', 'low']
+
+    def update(self, high, low):
+        if self.state['peak'] is None or high > self.state['peak']:
+            self.state['peak'] = high
+        return (1 - low / self.state['peak'],)
+
+    def _batch(self, series):
+        self.state['peak'] = float(series['high'].max())
+        return [dd.drawdown(series)]
+
+
+INDICATORS = {
+    cls.TYPE: cls
+    for cls in [SMA, EMA, RollingMax, RollingMin, ATR, RSI, Bollinger,
+                Drawdown, LowDrawdown]
+}
+
+
+def from_dict(data):
+    """Make indicator from the dict returned by `Indicator.to_dict()`."""
+    ret = INDICATORS[data['type']](**data['params'])
+    ret.state = data['state']
+    return ret
@@ -0,0 +1,32 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Names of the storage formats and the backtest strategies.
+
+This module doesn't import anything, so that the command line interface can
+offer the names as choices without importing the modules that implement them
+(see `portfel.data.storage` and `portfel.backtest`).
+
+"""
+
+# Storage formats. They are the names of the modules in portfel.data.formats.
+STORAGE_FORMATS = ['binary', 'csv']
+
+# Format of the new series files.
+DEFAULT_FORMAT = 'binary'
+
+# Backtest strategies. They are the names of the functions in
+# portfel.backtest with dashes instead of underscores.
+STRATEGIES = ['averaging', 'buy-dip']
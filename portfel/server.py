@@ -0,0 +1,160 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Server that answers repository queries from memory.
+
+The server is a long-lived process that keeps the repository open and the
+recently used series in memory (see `portfel.data.cache`), so that the
+queries don't pay for starting Python, importing pandas and parsing the
+files. It listens on a Unix socket in the repository directory (see
+`portfel.client` for the protocol and the client).
+
+Requests are handled by threads. Before a series is loaded, the index is
+reloaded if another process has changed it, so the server sees new series
+and bars without restarting.
+
+"""
+
+import logging
+import os
+import socket
+import socketserver
+import threading
+
+import portfel.client as cl
+import portfel.data.formats.binary as binary
+import portfel.data.index as idx
+import portfel.data.repository as repo
+
+# Default size of the memory cache of the series in bytes.
+DEFAULT_MEMORY_CACHE = 1 << 30
+
+
+def _list(server, request):
+    """List the series (always reads the current index)."""
+    return {'records': idx.read_records(server.repository.path)}, b''
+
+
+def _get(server, request):
+    """Load series."""
+    server.refresh()
+    series = server.repository.get_series(
+        request['exchange'],
+        request['ticker'],
+        request['resolution'],
+        start=request.get('start'),
+        end=request.get('end'),
+        columns=request.get('columns'),
+        events=request.get('events', False),
+        adjusted=request.get('adjusted', False),
+    )
+    metadata = {key: getattr(series, key, None) for key in series._metadata}
+    return {'metadata': metadata}, binary.dumps(series)
+
+
+def _stop(server, request):
+    """Stop the server after the response is sent."""
+    threading.Thread(target=server.shutdown).start()
+    return {}, b''
+
+
+OPERATIONS = {
+    'list': _list,
+    'get': _get,
+    'stop': _stop,
+}
+
+
+class Handler(socketserver.BaseRequestHandler):
+    """Handler of the requests of one connection."""
+
+    def handle(self):
+        while True:
+            message = cl.receive_message(self.request)
+            if message is None:
+                return
+            request, _ = message
+            try:
+                header, payload = OPERATIONS[request['op']](self.server,
+                                                            request)
+                header['ok'] = True
+            except Exception as e:
+                logging.debug('Request %s failed', request, exc_info=True)
+                header = {'ok': False, 'error': type(e).__name__,
+                          'message': str(e.args[0]) if e.args else ''}
+                payload = b''
+            cl.send_message(self.request, header, payload)
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Repository server."""
+
+    daemon_threads = True
+
+    def __init__(self, repository):
+        self.repository = repository
+        self.lock = threading.Lock()
+        self._index_path = os.path.join(repository.path, idx.FILENAME)
+        self._index_version = None
+        path = cl.socket_path(repository.path)
+        _remove_stale_socket(path)
+        super().__init__(path, Handler)
+
+    def refresh(self):
+        """Reload the index of the repository if it has changed.
+
+        The index file is replaced when it changes, so it's identified by the
+        inode, the modification time and the size.
+
+        """
+        stat = os.stat(self._index_path)
+        version = stat.st_ino, stat.st_mtime_ns, stat.st_size
+        with self.lock:
+            if version != self._index_version:
+                self.repository.refresh()
+                self._index_version = version
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+def _remove_stale_socket(path):
+    """Remove the socket file left by a server that is gone."""
+    if not os.path.exists(path):
+        return
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        os.unlink(path)
+    else:
+        raise Exception('Server is already running: {}'.format(path))
+    finally:
+        sock.close()
+
+
+def serve(path, memory_cache_size=DEFAULT_MEMORY_CACHE):
+    """Serve the repository at `path` until stopped."""
+    repository = repo.Repository(path, memory_cache_size=memory_cache_size)
+    with Server(repository) as server:
+        logging.info('Serving %s', path)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            repository.close()
@@ -0,0 +1,130 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Parameter sweeps of strategy backtests.
+
+A sweep runs backtests of many configurations (strategy parameters, amounts
+of cash, window lengths) over series from a repository. The configurations are
+distributed over a pool of processes. Each process opens the repository once
+and keeps the series that it has loaded, so every series is read at most once
+per process.
+
+"""
+
+import concurrent.futures as cf
+import itertools
+import os
+
+import pandas as pd
+
+import portfel.backtest as bt
+import portfel.data.repository as repo
+
+# Fields of the summary of one configuration (in addition to the config).
+RESULT_FIELDS = ['windows', 'mean', 'mean-pa', 'log-mean', 'log-mean-pa']
+
+# Repository and series cache of the worker process.
+_worker = {}
+
+
+def grid(**values):
+    """Make configurations from all combinations of the values.
+
+    >>> grid(a=[1, 2], b=[3])
+    [{'a': 1, 'b': 3}, {'a': 2, 'b': 3}]
+
+    """
+    names = list(values)
+    return [dict(zip(names, combination))
+            for combination in itertools.product(*values.values())]
+
+
+def _init_worker(path, format, mmap):
+    """Open the repository in the worker process."""
+    _worker['repository'] = repo.Repository(path, format=format, mmap=mmap)
+    _worker['series'] = {}
+
+
+def _get_series(exchange, ticker, resolution):
+    """Get series from the cache of the worker or load it."""
+    key = exchange, ticker, resolution
+    cache = _worker['series']
+    if key not in cache:
+        # Dividends are needed for the backtests.
+        cache[key] = _worker['repository'].get_series(*key, events=True)
+    return cache[key]
+
+
+def run_config(config):
+    """Backtest one configuration.
+
+    The configuration is a dict with 'exchange', 'ticker', 'resolution',
+    'strategy', 'params' (strategy parameters), 'starting-cash',
+    'monthly-cash', 'years' and 'step' (see `portfel.backtest.backtest()`).
+
+    Returns the configuration with the summary of the results added.
+
+    """
+    series = _get_series(config['exchange'], config['ticker'],
+                         config['resolution'])
+    strategy = bt.STRATEGIES[config['strategy']]
+    results = bt.backtest(
+        series,
+        strategy(series, **config['params']),
+        config['starting-cash'],
+        config['monthly-cash'],
+        period=pd.Timedelta(days=365 * config['years']),
+        step=config['step'],
+    )
+    ret = dict(config, windows=len(results))
+    ret.update(bt.summary(results, config['years']))
+    return ret
+
+
+def sweep(repository, configs, jobs=None):
+    """Backtest many configurations in parallel.
+
+    The configurations (see `run_config()`) are distributed over a pool of
+    `jobs` processes (by default, one per CPU), or run in this process if
+    `jobs` is 1. Yields the results in the order of the configurations as
+    they become available.
+
+    """
+    init_args = repository.path, repository.format, repository.mmap
+    if jobs == 1:
+        _init_worker(*init_args)
+        yield from map(run_config, configs)
+        return
+
+    configs = list(configs)
+    workers = jobs or os.cpu_count() or 1
+    with cf.ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                initargs=init_args) as executor:
+        chunksize = max(1, min(64, len(configs) // (workers * 4)))
+        yield from executor.map(run_config, configs, chunksize=chunksize)
+
+
+def results_table(results):
+    """Convert results of a sweep to a data frame.
+
+    Strategy parameters become columns named after the parameters.
+
+    """
+    rows = []
+    for result in results:
+        row = {k: v for k, v in result.items() if k != 'params'}
+        row.update(result['params'])
+        rows.append(row)
+    return pd.DataFrame(rows)
@@ -15,11 +15,12 @@ setup(
     author_email='kvas.it@gmail.com',
     packages=[
         'portfel',
+        'portfel.analysis',
         'portfel.data',
+        'portfel.data.formats',
         'portfel.data.loaders',
     ],
     install_requires=[
-        'tabulate',
         'pandas',
     ],
     entry_points={
@@ -0,0 +1,53 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for split and dividend adjustment."""
+
+import numpy as np
+import pandas as pd
+
+import portfel.data.adjust as adj
+import portfel.data.events as ev
+
+
+def test_split_ratios():
+    splits = np.array([None, '2/1', np.nan, '5/7'], dtype=object)
+    assert list(adj.split_ratios(splits)) == [1, 2, 1, 5 / 7]
+
+
+def test_cumulative_factors(alv_1d):
+    factors = adj.cumulative_factors(alv_1d)
+    assert factors.ticker == 'ALV'
+    assert list(factors.index) == list(alv_1d.index)
+    dividend = 1 - 4 / alv_1d['close'].iloc[2]
+    assert np.allclose(factors['price-factor'],
+                       [1, 1, 1, dividend, dividend * 7 / 5])
+    assert np.allclose(factors['volume-factor'], [1, 1, 1, 1, 5 / 7])
+
+    # Continuing from a known bar gives the same factors.
+    tail = adj.cumulative_factors(alv_1d.iloc[2:],
+                                  tuple(factors.iloc[2]))
+    pd.testing.assert_frame_equal(tail, factors.iloc[3:])
+
+
+def test_adjust(alv_1d):
+    bars, _ = ev.split_events(alv_1d)
+    factors = adj.cumulative_factors(alv_1d)
+    adjusted = adj.adjust(bars, factors, factors.iloc[-1])
+    assert adjusted.iloc[-1].equals(bars.iloc[-1])
+    assert np.isclose(adjusted['close'].iloc[3],
+                      bars['close'].iloc[3] * 7 / 5)
+    assert np.isclose(adjusted['volume'].iloc[0],
+                      bars['volume'].iloc[0] * 5 / 7)
@@ -0,0 +1,108 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for the backtest engine."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import portfel.backtest as bt
+import portfel.data.series as ds
+
+
+@pytest.fixture()
+def walk():
+    """Random walk with daily bars over a few years."""
+    rnd = np.random.RandomState(1)
+    time = pd.bdate_range('2010-01-01', periods=800) + pd.Timedelta('14h')
+    close = 50 * np.exp(np.cumsum(rnd.normal(0, 0.015, len(time))))
+    opens = close * (1 + rnd.normal(0, 0.005, len(time)))
+    opens[100] = np.nan
+    dividend = np.where(rnd.uniform(size=len(time)) < 0.02, 0.3, np.nan)
+    return ds.Series({'time': time, 'open': opens, 'close': close,
+                      'dividend': dividend})
+
+
+def run_loop(series, fractions, starting_cash, monthly_cash):
+    """Reference implementation: simulate bar by bar."""
+    cash, shares, invested = starting_cash, 0.0, starting_cash
+    month = None
+    first = True
+    for (time, bar), fraction in zip(series.iterrows(), fractions):
+        if (month is not None and time.month != month) or \
+                (month is None and time.day == 1):
+            cash += monthly_cash
+            invested += monthly_cash
+        month = time.month
+        if first:
+            fraction = 1
+            first = False
+        if bar['open'] == bar['open']:
+            to_invest = cash * fraction
+            shares += to_invest / bar['open']
+            cash -= to_invest
+            if bar['dividend'] == bar['dividend']:
+                cash += shares * bar['dividend']
+    close = series['close'].iloc[-1]
+    return invested, cash, shares, cash + shares * close
+
+
+@pytest.mark.parametrize('strategy', [
+    bt.averaging,
+    lambda series: bt.buy_dip(series, 5, 50),
+])
+def test_windows_match_loop(walk, strategy):
+    fractions = strategy(walk)
+    results = bt.backtest(walk, fractions, 1000, 100, period='180d', step=7)
+    assert len(results) > 50
+    assert results['end'].iloc[-1] == walk.index[-1]
+    for _, row in results.iloc[::9].iterrows():
+        window = walk.loc[row['start']:row['end']]
+        offset = walk.index.get_loc(row['start'])
+        expected = run_loop(window, fractions[offset:], 1000, 100)
+        actual = row[['invested', 'cash', 'shares', 'value']]
+        assert list(actual) == pytest.approx(expected, rel=1e-9)
+
+
+def test_whole_series(walk):
+    fractions = bt.buy_dip(walk, 3, 30)
+    result = bt.backtest(walk, fractions, 1000, 100)
+    assert len(result) == 1
+    expected = run_loop(walk, fractions, 1000, 100)
+    assert list(result.iloc[0][['invested', 'cash', 'shares', 'value']]) == \
+        pytest.approx(expected, rel=1e-9)
+
+
+def test_buy_dip():
+    series = pd.DataFrame({'open': [np.nan, 10, 11, 10.4, 10, 9.4, 12, 11]})
+    assert list(bt.buy_dip(series, 5, 50)) == [0, 1, 0, 0.5, 0, 0.5, 0, 0.5]
+
+
+def test_quarterly_dividends():
+    series = ds.Series({
+        'time': pd.to_datetime(['2020-03-30', '2020-03-31', '2020-04-01',
+                                '2020-06-29']),
+        'open': [10.0, 20.0, 30.0, 40.0],
+    })
+    assert list(bt.quarterly_dividends(series, 0.04)) == [0, 0.2, 0, 0.4]
+
+
+def test_summary():
+    results = pd.DataFrame({'gain': [0.21, 0.0]})
+    stats = bt.summary(results, 2)
+    assert stats['mean'] == pytest.approx(0.105)
+    assert stats['log-mean'] == pytest.approx(0.1)
+    assert stats['log-mean-pa'] == pytest.approx(1.1 ** 0.5 - 1)
@@ -0,0 +1,70 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for the in-memory series cache."""
+
+import portfel.data.cache as cache
+
+
+def size_of(series):
+    return int(series.memory_usage(index=True, deep=True).sum())
+
+
+def test_lru(spy_1d, alv_1d):
+    spy_size, alv_size = size_of(spy_1d), size_of(alv_1d)
+    series_cache = cache.SeriesCache(spy_size + alv_size)
+    series_cache.put((('BATS', 'SPY'), 1), spy_1d)
+    series_cache.put((('FWB', 'ALV'), 1), alv_1d)
+    assert series_cache.size == spy_size + alv_size
+
+    assert series_cache.get((('BATS', 'SPY'), 1)).equals(spy_1d)
+    series_cache.put((('FWB', 'ALV'), 2), alv_1d)  # Evicts ALV 1.
+    assert series_cache.get((('FWB', 'ALV'), 1)) is None
+    assert series_cache.get((('BATS', 'SPY'), 1)) is not None
+    assert series_cache.stats == {
+        'entries': 2,
+        'size': spy_size + alv_size,
+        'capacity': spy_size + alv_size,
+        'hits': 2,
+        'misses': 1,
+        'evictions': 1,
+    }
+
+
+def test_too_large(spy_1d):
+    series_cache = cache.SeriesCache(size_of(spy_1d) - 1)
+    series_cache.put((('BATS', 'SPY'),), spy_1d)
+    assert len(series_cache) == 0
+
+
+def test_invalidate(spy_1d, alv_1d):
+    series_cache = cache.SeriesCache(1 << 20)
+    series_cache.put((('BATS', 'SPY'), 1), spy_1d)
+    series_cache.put((('BATS', 'SPY'), 2), spy_1d)
+    series_cache.put((('FWB', 'ALV'), 1), alv_1d)
+    series_cache.invalidate(('BATS', 'QQQ'))
+    assert len(series_cache) == 3
+    series_cache.invalidate(('BATS', 'SPY'))
+    assert len(series_cache) == 1
+    assert series_cache.size == size_of(alv_1d)
+
+
+def test_copy_on_get(spy_1d):
+    series_cache = cache.SeriesCache(1 << 20)
+    series_cache.put((('BATS', 'SPY'),), spy_1d)
+    series = series_cache.get((('BATS', 'SPY'),))
+    series['foo'] = 1
+    assert 'foo' not in series_cache.get((('BATS', 'SPY'),))
+    assert series.ticker == 'SPY'
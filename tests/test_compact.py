@@ -0,0 +1,76 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for the compact representation of series."""
+
+import numpy as np
+import pandas as pd
+
+import portfel.data.compact as cmp
+import portfel.data.series as ds
+
+
+def test_roundtrip(spy_1d, alv_1d):
+    for series in [spy_1d, alv_1d]:
+        compact = cmp.CompactSeries.from_series(series)
+        restored = compact.to_series()
+        pd.testing.assert_frame_equal(restored, series, check_exact=False,
+                                      rtol=cmp.DEFAULT_RTOL)
+        assert restored.ticker == series.ticker
+        assert compact.nbytes < series.memory_usage(deep=True).sum()
+
+
+def test_types(alv_1d):
+    compact = cmp.CompactSeries.from_series(alv_1d)
+    assert compact.time.dtype == np.int64
+    assert compact.columns['close'].dtype == np.float32
+    assert compact.columns['volume'].dtype == np.int32
+    assert compact.columns['earnings-period'].dtype == np.int64
+    assert list(compact.events) == ['split']
+    split = compact.events['split']
+    assert list(split['time']) == [alv_1d.index[-1].value]
+    assert (split['split-num'][0], split['split-den'][0]) == (5, 7)
+
+
+def test_precision():
+    time = pd.date_range('2020-01-01', periods=3)
+    series = ds.Series({'time': time, 'a': [1 + 1e-7, 2.5, np.nan],
+                        'b': [1.5, 2.25, np.nan], 'c': [1e300, 1.0, 2.0]})
+    compact = cmp.CompactSeries.from_series(series, rtol=1e-9)
+    assert compact.columns['a'].dtype == np.float64
+    assert compact.columns['b'].dtype == np.float32
+    compact = cmp.CompactSeries.from_series(series)
+    assert compact.columns['a'].dtype == np.float32
+    assert compact.columns['c'].dtype == np.float64
+
+
+def test_events():
+    time = pd.date_range('2020-01-01', periods=100)
+    dividend = np.full(100, np.nan)
+    dividend[[10, 50]] = [0.5, 0.25]
+    series = ds.Series({'time': time, 'close': np.arange(100) / 4,
+                        'dividend': dividend})
+    compact = cmp.CompactSeries.from_series(series)
+    assert compact.columns['close'].dtype == np.float32
+    assert list(compact.events['dividend']['dividend']) == [0.5, 0.25]
+    assert compact.memory_usage('dividend') == 2 * 8 + 2 * 4
+    pd.testing.assert_frame_equal(compact.to_series(), series)
+
+
+def test_memory_report(alv_1d):
+    report = cmp.memory_report(alv_1d).set_index('column')
+    assert report.loc['split', 'compact-type'] == 'events (1)'
+    assert report.loc['total', 'compact'] == report['compact'][:-1].sum()
+    assert report.loc['total', 'compact'] < report.loc['total', 'normal']
@@ -0,0 +1,64 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for table printing."""
+
+import io
+import json
+
+import pandas as pd
+
+import portfel.display as dis
+
+
+def render(data, **options):
+    out = io.StringIO()
+    dis.print_table(data, file=out, **options)
+    return out.getvalue()
+
+
+def test_table():
+    records = [{'name': 'b', 'value': 12345678.0, 'count': None},
+               {'name': 'aaaaaaa', 'value': 1.5, 'count': 2}]
+    assert '\n' + render(records, sort_by=['name']) == """
+ name    |       value |   count
+---------+-------------+---------
+ aaaaaaa |         1.5 |       2
+ b       | 1.23457e+07 |
+"""
+    assert render([]) == '-- no data --\n'
+
+
+def test_sample_widths(monkeypatch):
+    """Column widths are computed from the first rows."""
+    monkeypatch.setattr(dis, 'SAMPLE_ROWS', 2)
+    frame = pd.DataFrame({'x': ['a', 'b', 'cccccc']})
+    assert render(frame).splitlines() == [
+        ' x', '-----', ' a', ' b', ' cccccc',
+    ]
+
+
+def test_limit_and_formats(spy_1d):
+    out = render(spy_1d, columns=['time', 'close'], offset=1, limit=2,
+                 format='csv')
+    lines = out.splitlines()
+    assert lines[0] == 'time,close'
+    assert lines[1].startswith(str(spy_1d.index[1]) + ',')
+    assert len(lines) == 3
+
+    out = render(spy_1d.reset_index(), limit=1, format='jsonl')
+    row = json.loads(out)
+    assert row['time'] == str(spy_1d.index[0])
+    assert row['close'] == spy_1d['close'].iloc[0]
@@ -0,0 +1,109 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for drawdown analysis."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import portfel.analysis.drawdown as dd
+import portfel.data.series as ds
+
+
+def make_series(high, low, ticker='FOO'):
+    time = pd.date_range('2020-01-01', periods=len(high))
+    series = ds.Series({'time': time, 'high': high, 'low': low})
+    series.exchange = 'TEST'
+    series.ticker = ticker
+    return series
+
+
+def loop_drops(series):
+    """Reference implementation: find recovered drops bar by bar."""
+    high = series['high'].iloc[0]
+    low = series['low'].iloc[0]
+    drop = None
+    drops = []
+    for day_high, day_low in zip(series['high'], series['low']):
+        if day_low < low:
+            low = day_low
+            drop = (high, low)
+        if day_high > high:
+            high = day_high
+            low = day_low
+            if drop is not None:
+                drops.append(drop)
+                drop = None
+    return drops
+
+
+def test_episodes():
+    series = make_series(
+        high=[10, 9, 8, 11, 12, 11, 13, 10],
+        low=[9, 8, 6, 10, 11, 10, 9, 8],
+    )
+    episodes = dd.episodes(series)
+    assert list(episodes['peak']) == [10, 12, 13]
+    assert list(episodes['trough']) == [6, 9, 8]
+    assert list(episodes['trough-time'].dt.day) == [3, 7, 8]
+    assert list(episodes['recovery'].dt.day[:2]) == [4, 7]
+    assert pd.isnull(episodes['recovery'].iloc[2])
+    assert list(episodes['duration'].dt.days) == [3, 2, 1]
+    assert episodes['depth'].iloc[0] == pytest.approx(0.4)
+
+
+def test_recovery_bar_low():
+    """The low of the recovery bar counts towards the drop."""
+    series = make_series(high=[10, 9, 11], low=[9, 8.5, 7])
+    episodes = dd.episodes(series)
+    assert list(episodes['trough']) == [7]
+    assert episodes['trough-time'].iloc[0] == series.index[2]
+
+
+def test_matches_loop():
+    rnd = np.random.RandomState(42)
+    close = 100 * np.exp(np.cumsum(rnd.normal(0, 0.02, 2000)))
+    high = close * (1 + rnd.uniform(0, 0.02, 2000))
+    low = close * (1 - rnd.uniform(0, 0.02, 2000))
+    series = make_series(high, low)
+    episodes = dd.episodes(series)
+    recovered = episodes[episodes['recovery'].notnull()]
+    assert list(zip(recovered['peak'], recovered['trough'])) == \
+        loop_drops(series)
+
+
+def test_drawdown(spy_1d):
+    drawdown = dd.drawdown(spy_1d)
+    assert drawdown.iloc[0] == pytest.approx(1 - 5.352315 / 5.603667)
+    assert drawdown.max() == pytest.approx(1 - 3.925524 / 5.721950)
+
+
+def test_episodes_many(spy_1d, alv_1d):
+    episodes = dd.episodes_many([spy_1d, alv_1d])
+    assert list(episodes['ticker']) == ['SPY', 'SPY', 'ALV', 'ALV']
+    spy = dd.episodes(spy_1d)
+    assert list(episodes['depth'][:2]) == list(spy['depth'])
+
+
+def test_short_series():
+    assert len(dd.episodes(make_series([1], [1]))) == 0
+    assert len(dd.episodes_many([])) == 0
+
+
+def test_depth_histogram():
+    episodes = pd.DataFrame({'depth': [0.011, 0.019, 0.05, 0.26]})
+    assert dd.depth_histogram(episodes).to_dict() == {1: 2, 5: 1, 26: 1}
+    assert dd.depth_histogram(episodes, 5).to_dict() == {0: 2, 5: 1, 25: 1}
@@ -0,0 +1,48 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for splitting and attaching corporate events."""
+
+import pandas as pd
+
+import portfel.data.events as ev
+
+
+def test_split_events(alv_1d, spy_1d):
+    bars, events = ev.split_events(alv_1d)
+    assert list(bars) == ['open', 'close', 'high', 'low', 'volume']
+    assert bars.ticker == 'ALV'
+    assert list(events) == ev.EVENT_COLUMNS
+    assert list(events.index) == list(alv_1d.index[1:])
+
+    bars, events = ev.split_events(spy_1d)
+    assert bars is spy_1d
+    assert events is None
+
+
+def test_attach_events(alv_1d):
+    bars, events = ev.split_events(alv_1d)
+    pd.testing.assert_frame_equal(
+        ev.attach_events(bars, events, ev.EVENT_COLUMNS), alv_1d,
+    )
+
+    # Events between the bars go to the preceding bar.
+    weekly = bars.iloc[[0, 2, 4]]
+    attached = ev.attach_events(weekly, events, ['dividend', 'earnings',
+                                                 'foo'])
+    assert list(attached['dividend'].fillna(0)) == [0, 4, 0]
+    assert list(attached['earnings']) == [4.38, 4.44, 7.04]
+    assert attached['foo'].isnull().all()
+    assert list(bars) == ['open', 'close', 'high', 'low', 'volume']
@@ -0,0 +1,54 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for the feature registry."""
+
+import json
+
+import numpy as np
+import pytest
+
+import portfel.features as ft
+import portfel.indicators as ind
+
+
+@pytest.mark.parametrize('name', sorted(ft.FEATURES))
+def test_run_tail(spy_1d, name):
+    """Running over the tail gives the same values as computing
+    everything."""
+    values = ft.FEATURES[name].indicator().batch(spy_1d)
+    assert len(values) == len(spy_1d)
+    indicator = ft.FEATURES[name].indicator()
+    indicator.batch(spy_1d.iloc[:12])
+    # The state is saved as JSON between the updates.
+    indicator = ind.from_dict(json.loads(json.dumps(indicator.to_dict())))
+    tail = indicator.run(spy_1d.iloc[12:])
+    assert list(tail.index) == list(spy_1d.index[12:])
+    np.testing.assert_allclose(tail, values.iloc[12:])
+
+
+def test_register(monkeypatch, spy_1d):
+    monkeypatch.setattr(ft, 'FEATURES', {})
+
+    @ft.register('range', 2, ['high', 'low'], lookback=0)
+    def bar_range(series):
+        return series['high'] - series['low']
+
+    feature = ft.FEATURES['range']
+    indicator = feature.indicator()
+    assert (feature.version, indicator.inputs) == (2, ['high', 'low'])
+    values = indicator.batch(spy_1d)
+    np.testing.assert_allclose(values[indicator.name], bar_range(spy_1d))
+    assert indicator.state == {'window': {'high': [], 'low': []}}
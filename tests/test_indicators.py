@@ -0,0 +1,96 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for the indicators."""
+
+import copy
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import portfel.indicators as ind
+
+ALL_INDICATORS = [
+    ind.SMA(5),
+    ind.EMA(5),
+    ind.RollingMax(4),
+    ind.RollingMin(4, column='low'),
+    ind.ATR(5),
+    ind.RSI(5),
+    ind.Bollinger(5),
+    ind.Drawdown(),
+    ind.LowDrawdown(),
+]
+
+
+@pytest.fixture()
+def spy(spy_1d):
+    """SPY without the bar with missing prices."""
+    return spy_1d[spy_1d['high'].notnull().to_numpy()]
+
+
+def test_batch_forms(spy):
+    close = spy['close']
+    assert np.allclose(ind.sma(close, 3).iloc[2:],
+                       [close.iloc[i - 2:i + 1].mean()
+                        for i in range(2, len(close))])
+    assert ind.sma(close, 3).iloc[:2].isnull().all()
+    assert ind.ema(close, 3).iloc[0] == close.iloc[0]
+    assert (ind.rolling_max(close, 3) >= ind.sma(close, 3)).iloc[2:].all()
+    assert (ind.true_range(spy) >= spy['high'] - spy['low']).all()
+    assert ind.rsi(close, 5).dropna().between(0, 100).all()
+    bands = ind.bollinger(close, 5)
+    assert list(bands) == ['middle', 'upper', 'lower']
+    assert (bands['upper'] >= bands['lower']).iloc[4:].all()
+    assert ind.drawdown(close).iloc[0] == 0
+
+
+@pytest.mark.parametrize('indicator', ALL_INDICATORS,
+                         ids=[i.name for i in ALL_INDICATORS])
+def test_online(spy, indicator):
+    """Online forms give the same values as the batch ones."""
+    batch = copy.deepcopy(indicator).batch(spy)
+    assert list(batch) == indicator.outputs
+    assert list(batch.index) == list(spy.index)
+
+    online = copy.deepcopy(indicator).run(spy)
+    np.testing.assert_allclose(online, batch)
+
+    # Continue after the batch form from the saved state.
+    head = copy.deepcopy(indicator)
+    head_values = head.batch(spy.iloc[:7])
+    resumed = ind.from_dict(copy.deepcopy(head.to_dict()))
+    values = pd.concat([head_values, resumed.run(spy.iloc[7:])])
+    np.testing.assert_allclose(values, batch)
+
+
+def test_short_series(spy):
+    indicator = ind.RSI(5)
+    assert indicator.batch(spy.iloc[:3]).iloc[:, 0].isnull().all()
+    values = indicator.run(spy.iloc[3:])
+    np.testing.assert_allclose(values, ind.RSI(5).batch(spy).iloc[3:])
+    assert len(ind.SMA(5).batch(spy.iloc[:0])) == 0
+
+
+def test_abstract():
+    class Incomplete(ind.Indicator):
+        TYPE = 'incomplete'
+
+        def update(self, value):
+            return value,
+
+    with pytest.raises(TypeError):
+        Incomplete(column='close')
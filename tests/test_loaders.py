@@ -17,6 +17,12 @@
 
 import datetime
 
+import pandas as pd
+
+import portfel.data.loader as ldr
+
+import conftest as ct
+
 
 def test_tradingview(spy_1d):
     """Test loading TradeView CSV export."""
@@ -68,3 +74,16 @@ def test_tv_extras(alv_1d):
     ee = alv_1d['earnings-estimate']
     assert (ee.isnull() == [True, False, True, True, True]).all()
     assert ee[1] == 3.9
+
+
+def test_tradingview_chunks(data_path, alv_1d):
+    """Load TradingView CSV export in chunks."""
+    path = data_path.join(ct.DataFiles.ALV_1D).strpath
+    chunks = list(ldr.load_series(path, 'tradingview', chunksize=2))
+    assert [len(c) for c in chunks] == [2, 2, 1]
+    for chunk in chunks:
+        assert chunk.exchange == 'FWB'
+        assert chunk.ticker == 'ALV'
+        assert chunk.resolution == '1d'
+        assert chunk.currency == 'EUR'
+    pd.testing.assert_frame_equal(pd.concat(chunks), alv_1d)
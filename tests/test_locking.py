@@ -0,0 +1,113 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for file locking and concurrent use of repositories."""
+
+import concurrent.futures as cf
+import fcntl
+import os
+
+import pandas as pd
+import pytest
+
+import portfel.data.locking as locking
+import portfel.data.repository as repo
+
+
+def try_lock(path, shared):
+    """Try to lock the file without waiting (in another process)."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        fcntl.flock(fd, (fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+                    | fcntl.LOCK_NB)
+        return True
+    except BlockingIOError:
+        return False
+    finally:
+        os.close(fd)
+
+
+@pytest.mark.parametrize('shared,expected', [
+    (True, [True, False]),
+    (False, [False, False]),
+])
+def test_locked(tmpdir, shared, expected):
+    path = tmpdir.join('lock').strpath
+    open(path, 'w').close()
+    with cf.ProcessPoolExecutor(1) as executor:
+        # Start the worker before locking, so it doesn't inherit the lock.
+        executor.submit(os.getpid).result()
+        with locking.locked(path, shared=shared, create=True):
+            results = [executor.submit(try_lock, path, s).result()
+                       for s in [True, False]]
+        assert results == expected
+        assert executor.submit(try_lock, path, False).result()
+
+
+def test_replacing(tmpdir):
+    path = tmpdir.join('file').strpath
+    with open(path, 'w') as f:
+        f.write('old')
+
+    with pytest.raises(RuntimeError):
+        with locking.replacing(path) as tmp_path:
+            with open(tmp_path, 'w') as f:
+                f.write('partial')
+            raise RuntimeError()
+    assert open(path).read() == 'old'
+    assert os.listdir(tmpdir.strpath) == ['file']
+
+    with locking.replacing(path) as tmp_path:
+        with open(tmp_path, 'w') as f:
+            f.write('new')
+        assert open(path).read() == 'old'
+    assert open(path).read() == 'new'
+    assert os.listdir(tmpdir.strpath) == ['file']
+
+
+def add_days(path, ticker, series, days):
+    """Add copies of the series shifted by a number of days."""
+    repository = repo.Repository(path)
+    for day in days:
+        copy = series.copy()
+        copy.index = copy.index + pd.Timedelta(days=day)
+        copy.ticker = ticker
+        repository.add_series(copy)
+
+
+def test_concurrent_writers(tmpdir, spy_1d):
+    path = tmpdir.join('repo').strpath
+    with cf.ProcessPoolExecutor(4) as executor:
+        futures = [
+            executor.submit(add_days, path, ticker, spy_1d, range(0, 60, 3))
+            for ticker in ['A', 'B', 'C', 'A']
+        ]
+        for future in futures:
+            future.result()
+
+    repository = repo.Repository(path)
+    assert sorted(repository.index['ticker']) == ['A', 'B', 'C']
+    for ticker in ['A', 'B', 'C']:
+        series = repository.get_series('BATS', ticker, '1d')
+        assert series.index.is_unique
+        assert series.index[-1] == spy_1d.index[-1] + pd.Timedelta(days=57)
+
+
+def test_refresh(repo_path, spy_1d):
+    reader = repo.Repository(repo_path)
+    writer = repo.Repository(repo_path)
+    spy_1d.ticker = 'NEW'
+    writer.add_series(spy_1d)
+    assert len(reader.get_series('BATS', 'NEW', '1d')) == len(spy_1d)
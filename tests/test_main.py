@@ -15,9 +15,17 @@
 
 """Tests for the command line interface."""
 
+import argparse
+import subprocess
+import sys
+
 import pytest
 
+import portfel.__main__ as pfmain
+import portfel.backtest as bt
 import portfel.data.repository as repo
+import portfel.data.storage as storage
+import portfel.names as names
 
 import conftest as ct
 
@@ -58,3 +66,178 @@ def test_list_series(script_runner, repo_env):
  BATS       | SPY      | 1d           | USD
  FWB        | ALV      | 1d           | EUR
 """
+
+
+def test_list_without_pandas(repo_path):
+    """Listing the series doesn't import pandas."""
+    code = (
+        'import sys; import portfel.__main__ as m; m.main(); '
+        'sys.exit("pandas" in sys.modules)'
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', code, 'ls', '--repository', repo_path],
+        capture_output=True, text=True,
+    )
+    assert result.returncode == 0
+    assert 'FWB        | ALV' in result.stdout
+
+
+def test_names():
+    assert list(storage.FORMATS) == names.STORAGE_FORMATS
+    assert storage.FORMATS['csv'].EXTENSION == '.csv'
+    assert bt.STRATEGIES['buy-dip'] is bt.buy_dip
+
+
+def test_migrate_repository(script_runner, tmpdir, spy_1d):
+    path = tmpdir.join('repo').strpath
+    repository = repo.Repository(path, format='csv')
+    repository.add_series(spy_1d)
+
+    result = script_runner.run(
+        'pf', 'migrate',
+        '--repository', path,
+        '--format', 'binary',
+    )
+    assert result.success
+
+    repository = repo.Repository(path)
+    assert list(repository.index['filename']) == ['BATS_SPY_1d.pfc']
+    assert len(repository.get_series('BATS', 'SPY', '1d')) == len(spy_1d)
+
+
+@pytest.mark.script_launch_mode('subprocess')
+def test_show_series(script_runner, repo_env):
+    result = script_runner.run(
+        'pf', 'show', 'BATS:SPY',
+        '--start', '2002-09-17',
+        '--end', '2002-09-18 13:30',
+        '--columns', 'close,volume',
+        env=repo_env,
+    )
+    assert result.success
+    assert '\n' + result.stdout == """
+ time                |   close |      volume
+---------------------+---------+-------------
+ 2002-09-17 13:30:00 | 5.33753 | 9.63518e+06
+ 2002-09-18 13:30:00 | 5.24882 | 5.75175e+06
+"""
+
+
+@pytest.mark.script_launch_mode('subprocess')
+def test_show_limit(script_runner, repo_env):
+    result = script_runner.run(
+        ['pf', 'show', 'BATS:SPY', '--columns', 'close',
+         '--limit', '2', '--output-format', 'csv'],
+        env=repo_env,
+    )
+    assert result.success
+    assert result.stdout.splitlines() == [
+        'time,close',
+        '2002-09-16 13:30:00,5.41145659',
+        '2002-09-17 13:30:00,5.33752959',
+    ]
+
+
+@pytest.mark.script_launch_mode('subprocess')
+def test_drawdown_histogram(script_runner, repo_env):
+    result = script_runner.run('pf', 'dips', 'BATS:SPY', 'FWB:ALV',
+                               '--bin', '5', env=repo_env)
+    assert result.success
+    assert '\n' + result.stdout == """
+   depth-% |   BATS:SPY |   FWB:ALV
+-----------+------------+-----------
+         0 |          0 |         1
+         5 |          1 |         0
+"""
+
+    result = script_runner.run('pf', 'dips', 'BATS:SPY', 'FWB:ALV',
+                               '--bin', '5', '--unrecovered', env=repo_env)
+    assert result.success
+    assert '\n' + result.stdout == """
+   depth-% |   BATS:SPY |   FWB:ALV
+-----------+------------+-----------
+         0 |          0 |         1
+         5 |          1 |         0
+        20 |          0 |         1
+        30 |          1 |         0
+"""
+
+
+@pytest.mark.script_launch_mode('subprocess')
+def test_sweep_parameters(script_runner, repo_env, tmpdir):
+    output = tmpdir.join('sweep.csv').strpath
+    result = script_runner.run(
+        'pf', 'sweep', 'BATS:SPY',
+        '--strategy', 'buy-dip',
+        '--param', 'dip-pct=1:3:1',
+        '--param', 'invest-pct=50,100',
+        '--years', '0.02',
+        '--jobs', '2',
+        '--output', output,
+        env=repo_env,
+    )
+    assert result.success
+    lines = result.stdout.splitlines()
+    assert 'dip_pct' in lines[0] and 'log-mean-pa' in lines[0]
+    assert len(lines) == 8
+    with open(output) as f:
+        assert len(f.readlines()) == 7
+
+
+def test_value_list():
+    assert pfmain.value_list('1,2.5') == [1, 2.5]
+    assert pfmain.value_list('1:2:0.5') == [1, 1.5, 2]
+    assert pfmain.value_list('10:40:10') == [10, 20, 30, 40]
+    with pytest.raises(argparse.ArgumentTypeError):
+        pfmain.value_list('1:2')
+
+
+@pytest.mark.script_launch_mode('subprocess')
+def test_show_bad_symbol(script_runner, repo_env):
+    result = script_runner.run('pf', 'show', 'SPY', env=repo_env)
+    assert not result.success
+    assert 'EXCHANGE:TICKER' in result.stderr
+
+
+@pytest.mark.script_launch_mode('subprocess')
+def test_show_missing(script_runner, repo_env):
+    result = script_runner.run(['pf', 'show', 'BATS:MISSING'], env=repo_env)
+    assert result.returncode == 1
+    assert result.stderr == 'No such series: BATS:MISSING@1d\n'
+
+
+def test_import_many(script_runner, tmpdir, data_path):
+    """Import a directory with a bad file in it."""
+    source = tmpdir.join('source')
+    data_path.copy(source)
+    source.join('BATS_BAD, 1D.csv').write('time,open\nfoo,1\n')
+    source.join('README.txt').write('Not a data file')
+    path = tmpdir.join('repo').strpath
+
+    result = script_runner.run(
+        'pf', 'imps',
+        '--repository', path,
+        '--jobs', '2',
+        source.strpath,
+    )
+    assert not result.success
+    assert 'Failed to import 1 of 3 files' in result.stderr
+    assert 'BATS_BAD, 1D.csv' in result.stderr
+
+    repository = repo.Repository(path)
+    assert sorted(repository.index['ticker']) == ['ALV', 'SPY']
+
+
+def test_import_glob(script_runner, tmpdir, data_path, spy_1d):
+    path = tmpdir.join('repo').strpath
+    result = script_runner.run(
+        'pf', 'imps',
+        '--repository', path,
+        '--chunk-size', '5',
+        data_path.join('BATS_*.csv').strpath,
+    )
+    assert result.success
+
+    repository = repo.Repository(path)
+    assert list(repository.index['ticker']) == ['SPY']
+    assert len(repository.get_series('BATS', 'SPY', '1d')) == len(spy_1d)
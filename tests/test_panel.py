@@ -0,0 +1,77 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for panels of aligned series."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import portfel.data.panel as pnl
+import portfel.data.repository as repo
+
+
+def test_from_series(spy_1d, alv_1d):
+    panel = pnl.Panel.from_series([spy_1d, alv_1d])
+    assert len(panel) == len(spy_1d) + len(alv_1d)
+    assert panel.symbols == ['BATS:SPY', 'FWB:ALV']
+    assert list(panel.metadata['currency']) == ['USD', 'EUR']
+    assert 'earnings' in panel.fields and 'split' not in panel.fields
+
+    close = panel.array('close')
+    assert close.shape == (len(panel), 2)
+    assert close.flags['C_CONTIGUOUS']
+    np.testing.assert_array_equal(close[:len(spy_1d), 0], spy_1d['close'])
+    assert np.isnan(close[:len(spy_1d), 1]).all()
+    assert np.isnan(panel.array('earnings')[:, 0]).all()
+
+    frame = panel['close']
+    assert list(frame.columns) == panel.symbols
+    assert np.shares_memory(frame.values, close)
+
+
+def test_join(spy_1d):
+    shifted = spy_1d.iloc[5:].copy()
+    shifted.ticker = 'QQQ'
+    outer = pnl.Panel.from_series([spy_1d, shifted], fields=['close'])
+    assert len(outer) == len(spy_1d)
+    inner = pnl.Panel.from_series([spy_1d, shifted], fields=['close'],
+                                  join='inner')
+    assert list(inner.time) == list(shifted.index)
+    np.testing.assert_array_equal(inner.array('close')[:, 0],
+                                  inner.array('close')[:, 1])
+    with pytest.raises(ValueError):
+        pnl.Panel.from_series([spy_1d], join='left')
+
+
+def test_returns(spy_1d):
+    panel = pnl.Panel.from_series([spy_1d], fields=['close'])
+    returns = panel.returns()
+    expected = spy_1d['close'].pct_change()
+    np.testing.assert_allclose(returns[:, 0], expected)
+
+
+def test_get_panel(repo_path, spy_1d):
+    repository = repo.Repository(repo_path)
+    symbols = [('BATS', 'SPY'), ('FWB', 'ALV'), ('BATS', 'MISSING')]
+    with pytest.raises(KeyError):
+        repository.get_panel(symbols, '1d')
+    panel = repository.get_panel(symbols, '1d', fields=['close', 'volume'],
+                                 start='2002-01-01', errors='skip')
+    assert panel.symbols == ['BATS:SPY', 'FWB:ALV']
+    assert sorted(panel.fields) == ['close', 'volume']
+    assert list(panel.time) == list(spy_1d.index) + list(
+        repository.get_series('FWB', 'ALV', '1d').index)
+    assert isinstance(panel['volume'], pd.DataFrame)
@@ -15,17 +15,25 @@
 
 """Tests for the Repository module."""
 
+import asyncio
 import copy
+import os
+import shutil
 
+import numpy as np
 import pandas as pd
 import pytest
 
+import portfel.data.loader as ldr
 import portfel.data.repository as repo
+import portfel.data.storage as storage
+import portfel.features as ft
+import portfel.indicators as ind
 
 
 def test_get_series(repo_path, alv_1d):
     repository = repo.Repository(repo_path)
-    alv_1d_ = repository.get_series('FWB', 'ALV', '1d')
+    alv_1d_ = repository.get_series('FWB', 'ALV', '1d', events=True)
 
     assert alv_1d_.exchange == 'FWB'
     assert alv_1d_.ticker == 'ALV'
@@ -43,6 +51,218 @@ def test_get_series(repo_path, alv_1d):
         assert (col[~nulls] == col_[~nulls_]).all()
 
 
+def test_events_stored_separately(repo_path, alv_1d):
+    repository = repo.Repository(repo_path)
+    assert os.listdir(os.path.join(repo_path, 'events')) == ['FWB_ALV.pfc']
+
+    alv_1d_ = repository.get_series('FWB', 'ALV', '1d')
+    assert list(alv_1d_) == ['open', 'close', 'high', 'low', 'volume']
+    weekly = repository.get_series('FWB', 'ALV', '1w',
+                                   columns=['close', 'dividend'])
+    assert list(weekly['dividend'].fillna(0)) == [0, 4, 0]
+
+
+def test_legacy_events(tmpdir, alv_1d):
+    """Event columns of old series files are moved to the events file."""
+    path = tmpdir.join('repo').strpath
+    repository = repo.Repository(path)
+    repository.add_series(alv_1d.iloc[:4])
+    storage.save_series(os.path.join(path, 'FWB_ALV_1d.pfc'),
+                        alv_1d.iloc[:4])  # Stored with event columns.
+    shutil.rmtree(os.path.join(path, 'events'))
+
+    repository.add_series(alv_1d.iloc[4:])
+    pd.testing.assert_frame_equal(
+        repository.get_series('FWB', 'ALV', '1d', events=True), alv_1d,
+    )
+    assert list(storage.load_series(os.path.join(path, 'FWB_ALV_1d.pfc'))) \
+        == ['open', 'close', 'high', 'low', 'volume']
+
+
+def test_remove_events(tmpdir, spy_1d):
+    """Events missing from re-imported bars are removed."""
+    repository = repo.Repository(tmpdir.join('repo').strpath)
+    bars = spy_1d.iloc[:4].copy()
+    bars['close'] = 1.0
+    bars['dividend'] = [np.nan, np.nan, 0.5, np.nan]
+    repository.add_series(bars)
+    adjusted = repository.get_series('BATS', 'SPY', '1d', adjusted=True)
+    assert adjusted['close'].iloc[0] == 0.5
+
+    bars['dividend'] = np.nan
+    repository.add_series(bars)
+    assert len(repository.get_events([('BATS', 'SPY')])) == 0
+    adjusted = repository.get_series('BATS', 'SPY', '1d', adjusted=True)
+    assert list(adjusted['close']) == [1.0] * 4
+
+
+def test_get_events(repo_path, alv_1d):
+    repository = repo.Repository(repo_path)
+    symbols = [('FWB', 'ALV'), ('BATS', 'SPY'), ('BATS', 'MISSING')]
+    events = repository.get_events(symbols)
+    assert len(events) == 4
+    assert list(events)[:3] == ['exchange', 'ticker', 'time']
+
+    dividends = repository.get_events(symbols, columns=['dividend'],
+                                      start='2015-08-01', end='2016-01-01')
+    assert list(dividends) == ['exchange', 'ticker', 'time', 'dividend']
+    assert list(dividends['time']) == [alv_1d.index[3]]
+    assert list(dividends['dividend']) == [4]
+
+    assert len(repository.get_events(symbols, start='2017-01-01')) == 0
+
+
+def test_adjusted(tmpdir, alv_1d):
+    path = tmpdir.join('repo').strpath
+    repository = repo.Repository(path)
+    repository.add_series(alv_1d.iloc[:3])
+    adjusted = repository.get_series('FWB', 'ALV', '1d', adjusted=True)
+    assert adjusted.equals(repository.get_series('FWB', 'ALV', '1d'))
+
+    # Stored factors are updated by adding the dividend and the split.
+    repository.add_series(alv_1d.iloc[3:])
+    factors_path = os.path.join(path, 'adjusted', 'FWB_ALV_1d.pfc')
+    assert len(storage.load_series(factors_path)) == 5
+    adjusted = repository.get_series('FWB', 'ALV', '1d', adjusted=True,
+                                     columns=['close', 'volume'])
+    assert list(adjusted) == ['close', 'volume']
+    assert adjusted['close'].iloc[-1] == alv_1d['close'].iloc[-1]
+    assert adjusted['close'].iloc[0] < alv_1d['close'].iloc[0] * 7 / 5
+    assert adjusted['volume'].iloc[0] == alv_1d['volume'].iloc[0] * 5 / 7
+
+    # Same as computing all the factors at once.
+    os.unlink(factors_path)
+    pd.testing.assert_frame_equal(
+        repository.get_series('FWB', 'ALV', '1d', adjusted=True,
+                              columns=['close', 'volume']),
+        adjusted,
+    )
+    weekly = repository.get_series('FWB', 'ALV', '1w', adjusted=True,
+                                   start='2015-08-07')
+    assert list(weekly['close']) == list(adjusted['close'].iloc[[3, 4]])
+
+
+def test_adjusted_update_tail(tmpdir, mocker, alv_1d):
+    """Only the factors from the first changed bar are recomputed."""
+    repository = repo.Repository(tmpdir.join('repo').strpath)
+    repository.add_series(alv_1d.iloc[:4])
+    repository.get_series('FWB', 'ALV', '1d', adjusted=True)
+    update_factors = mocker.spy(repository, '_update_factors')
+    repository.add_series(alv_1d)
+    assert update_factors.call_args.args[1] == alv_1d.index[4]
+    adjusted = repository.get_series('FWB', 'ALV', '1d', adjusted=True)
+    assert adjusted['volume'].iloc[0] == alv_1d['volume'].iloc[0] * 5 / 7
+
+
+def test_adjusted_without_splits(repo_path, spy_1d, alv_1d):
+    """Tickers without events or with dividends only are adjusted too."""
+    repository = repo.Repository(repo_path)
+    adjusted = repository.get_series('BATS', 'SPY', '1d', adjusted=True)
+    pd.testing.assert_frame_equal(adjusted, spy_1d)
+
+    dividends = alv_1d.drop(columns=['split'])
+    dividends.ticker = 'DIV'
+    repository.add_series(dividends)
+    adjusted = repository.get_series('FWB', 'DIV', '1d', adjusted=True)
+    factor = 1 - 4 / alv_1d['close'].iloc[2]
+    assert np.allclose(adjusted['close'].iloc[:3],
+                       alv_1d['close'].iloc[:3] * factor)
+    assert list(adjusted['close'].iloc[3:]) == list(alv_1d['close'].iloc[3:])
+
+
+def test_indicators(tmpdir, mocker, spy_1d):
+    repository = repo.Repository(tmpdir.join('repo').strpath)
+    repository.add_series(spy_1d.iloc[:10])
+    values = repository.add_indicator('BATS', 'SPY', '1d', ind.SMA(3))
+    assert list(values) == ['sma-3-close']
+    repository.add_indicator('BATS', 'SPY', '1d', ind.Drawdown())
+
+    # New bars continue from the stored state, also when they come with the
+    # bars that are already stored.
+    batch = mocker.spy(ind.Indicator, 'batch')
+    run = mocker.spy(ind.Indicator, 'run')
+    repository.add_series(spy_1d)
+    assert not batch.called
+    assert [len(c.args[1]) for c in run.call_args_list] == [9, 9]
+    sma = repository.get_indicator('BATS', 'SPY', '1d', 'sma-3-close')
+    assert sma.ticker == 'SPY'
+    pd.testing.assert_series_equal(
+        sma['sma-3-close'], ind.sma(spy_1d['close'], 3),
+        check_names=False, check_series_type=False,
+    )
+
+    # Changed earlier bars make the indicators recompute.
+    earlier = spy_1d.iloc[:1].copy()
+    earlier.index = earlier.index - pd.Timedelta(days=1)
+    earlier['close'] = 100.0
+    repository.add_series(earlier)
+    drawdown = repository.get_indicator('BATS', 'SPY', '1d', 'drawdown-close',
+                                        end='2002-09-16 13:30')
+    assert list(drawdown['drawdown-close'].round(2)) == [0, 0.95]
+
+    with pytest.raises(KeyError):
+        repository.get_indicator('BATS', 'SPY', '1d', 'sma-4-close')
+    with pytest.raises(KeyError):
+        repository.add_indicator('BATS', 'SPY', '1w', ind.SMA(3))
+
+
+def test_features(tmpdir, spy_1d, mocker):
+    path = tmpdir.join('repo').strpath
+    repository = repo.Repository(path)
+    repository.add_series(spy_1d.iloc[:10])
+    returns = repository.get_feature('BATS', 'SPY', '1d', 'returns')
+    assert returns.ticker == 'SPY'
+    assert list(returns.columns) == ['returns']
+    assert len(returns) == 10
+    rec = repository.index.iloc[0]
+    entries = repository._load_indicators(rec)
+    assert entries['feature-returns']['version'] == 1
+    assert entries['feature-returns']['last-time'] == str(spy_1d.index[9])
+
+    # Features are updated with the indicators: only the new bars are run
+    # (also when they come with the stored bars).
+    feature_type = ft.FeatureIndicator
+    run = mocker.spy(feature_type, 'run')
+    batch = mocker.spy(feature_type, 'batch')
+    repository.add_series(spy_1d)
+    assert [len(call.args[1]) for call in run.call_args_list] == [9]
+    returns = repository.get_feature('BATS', 'SPY', '1d', 'returns',
+                                     start=spy_1d.index[8])
+    assert np.allclose(returns['returns'],
+                       spy_1d['close'].pct_change().iloc[8:])
+    assert batch.call_count == 0
+
+    # Values are recomputed when earlier bars change or the version does.
+    first = spy_1d.iloc[:1].copy()
+    first['close'] *= 2
+    repository.add_series(first)
+    assert batch.call_count == 1
+    mocker.patch.object(ft.FEATURES['returns'], 'version', 2)
+    repository.get_feature('BATS', 'SPY', '1d', 'returns')
+    assert batch.call_count == 2
+    repository.get_feature('BATS', 'SPY', '1d', 'returns')
+    assert batch.call_count == 2
+    assert repository._load_indicators(rec)['feature-returns']['version'] == 2
+
+
+def test_latest_features(repo_path, mocker, spy_1d, alv_1d):
+    repository = repo.Repository(repo_path)
+    save_index = mocker.spy(repository, '_save_index')
+    latest = repository.latest_features(
+        [('BATS', 'SPY'), ('FWB', 'ALV'), ('FWB', 'MISSING')], '1d',
+        ['returns', 'drawdown'],
+    )
+    assert list(latest.index) == [('BATS', 'SPY'), ('FWB', 'ALV')]
+    assert list(latest.columns) == ['time', 'returns', 'drawdown']
+    assert latest.loc[('FWB', 'ALV'), 'time'] == alv_1d.index[-1]
+    assert np.isclose(latest.loc[('BATS', 'SPY'), 'returns'],
+                      spy_1d['close'].pct_change().iloc[-1])
+    assert np.isclose(latest.loc[('BATS', 'SPY'), 'drawdown'],
+                      1 - spy_1d['low'].iloc[-1] / spy_1d['high'].max())
+    # Features are stored with the indicators, the index doesn't change.
+    assert save_index.call_count == 0
+
+
 def test_get_missing(repo_path):
     repository = repo.Repository(repo_path)
     with pytest.raises(KeyError):
@@ -64,3 +284,283 @@ def test_merge_with_existing(repo_path, spy_1d):
 
     # TODO: test merging with different field sets.
     # TODO: test merging with a hole in dates.
+
+
+def test_convert(tmpdir, spy_1d, alv_1d):
+    """Convert CSV repository to binary format and back."""
+    path = tmpdir.join('repo').strpath
+    repository = repo.Repository(path, format='csv')
+    repository.add_series(spy_1d)
+    repository.add_series(alv_1d)
+    assert sorted(os.listdir(path)) == [
+        'BATS_SPY_1d.csv', 'FWB_ALV_1d.csv', 'events', 'index.csv',
+        'index.lock',
+    ]
+
+    repository.convert('binary')
+    assert sorted(os.listdir(path)) == [
+        'BATS_SPY_1d.pfc', 'FWB_ALV_1d.pfc', 'events', 'index.csv',
+        'index.lock',
+    ]
+    assert os.listdir(os.path.join(path, 'events')) == ['FWB_ALV.pfc']
+    repository = repo.Repository(path)
+    pd.testing.assert_frame_equal(
+        repository.get_series('BATS', 'SPY', '1d'), spy_1d,
+    )
+    alv_1d_ = repository.get_series('FWB', 'ALV', '1d', events=True)
+    assert alv_1d_.currency == 'EUR'
+    assert list(alv_1d_) == list(alv_1d)
+
+
+def test_get_series_mmap(repo_path, spy_1d):
+    repository = repo.Repository(repo_path, mmap=True)
+    spy_1d_ = repository.get_series('BATS', 'SPY', '1d')
+    assert spy_1d_.ticker == 'SPY'
+    pd.testing.assert_frame_equal(spy_1d_, spy_1d)
+    assert not spy_1d_['open'].values.flags.writeable
+
+
+@pytest.mark.parametrize('format', ['binary', 'csv'])
+@pytest.mark.parametrize('start,end,expect_rows', [
+    (None, None, [0, 1, 2, 3, 4]),
+    ('2015-08-07', '2015-08-11 06:00', [1, 2, 3]),
+    ('2015-08-07 06:00:01', None, [2, 3, 4]),
+    (None, '2015-08-06 06:00', [0]),
+    ('2017-01-01', None, []),
+])
+def test_get_series_range(tmpdir, alv_1d, format, start, end, expect_rows):
+    repository = repo.Repository(tmpdir.join('repo').strpath, format=format)
+    repository.add_series(alv_1d)
+
+    series = repository.get_series('FWB', 'ALV', '1d', start=start, end=end,
+                                   columns=['split', 'close'])
+    assert series.currency == 'EUR'
+    assert list(series) == ['split', 'close']
+    assert list(series.index) == list(alv_1d.index[expect_rows])
+    assert list(series['close']) == list(alv_1d['close'].iloc[expect_rows])
+
+
+def test_get_series_bad_column(repo_path):
+    repository = repo.Repository(repo_path)
+    with pytest.raises(KeyError):
+        repository.get_series('BATS', 'SPY', '1d', columns=['foo'])
+
+
+def test_merge_before_existing(repo_path, spy_1d):
+    """Add records before the existing ones."""
+    repository = repo.Repository(repo_path)
+    spy_1d_ = copy.deepcopy(spy_1d)
+    spy_1d_.index = spy_1d_.index - pd.Timedelta(days=14)
+    repository.add_series(spy_1d_)
+
+    merged = repository.get_series('BATS', 'SPY', '1d')
+    assert len(merged) == 29
+    assert merged.index.is_monotonic_increasing
+    assert merged.index[0] == spy_1d_.index[0]
+
+    repository = repo.Repository(repo_path)
+    rec = repository.index[repository.index['ticker'] == 'SPY'].iloc[0]
+    assert rec['first-time'] == spy_1d_.index[0]
+    assert rec['last-time'] == spy_1d.index[-1]
+
+
+def test_duplicate_index_records(repo_path):
+    """Duplicate index records are detected when the index is loaded."""
+    index_path = os.path.join(repo_path, 'index.csv')
+    with open(index_path, 'rt') as f:
+        lines = f.readlines()
+    with open(index_path, 'wt') as f:
+        f.writelines(lines + lines[-1:])
+    with pytest.raises(Exception, match='repo corrupt'):
+        repo.Repository(repo_path)
+
+
+def test_index_in_sync(repo_path, spy_1d):
+    repository = repo.Repository(repo_path)
+    spy_1d_ = copy.deepcopy(spy_1d)
+    spy_1d_.ticker = 'SPY2'
+    repository.add_series(spy_1d_)
+    assert list(repository.index['ticker']) == ['SPY', 'ALV', 'SPY2']
+    assert len(repository.get_series('BATS', 'SPY2', '1d')) == len(spy_1d)
+
+    reloaded = repo.Repository(repo_path)
+    pd.testing.assert_frame_equal(reloaded.index, repository.index)
+
+
+def test_numeric_keys(tmpdir, spy_1d):
+    """Numeric tickers and resolutions stay strings when reopened."""
+    path = tmpdir.join('repo').strpath
+    minutes = spy_1d.copy()
+    minutes.ticker, minutes.resolution = '1234', '1'
+    repo.Repository(path).add_series(minutes.iloc[:10])
+    repository = repo.Repository(path)
+    repository.add_series(minutes.iloc[10:])
+    assert len(repository.index) == 1
+    repository = repo.Repository(path)
+    assert len(repository.get_series('BATS', '1234', '1')) == len(spy_1d)
+    assert len(repository.get_series('BATS', '1234', '5')) == len(spy_1d)
+    assert ('BATS', '1234', '5') in repo.Repository(path)._derived._records
+
+
+def test_batch(tmpdir, spy_1d, alv_1d):
+    """Index is saved at the end of the batch."""
+    path = tmpdir.join('repo').strpath
+    repository = repo.Repository(path)
+    with repository.batch():
+        repository.add_series(spy_1d)
+        repository.add_series(alv_1d)
+        assert len(repo.Repository(path).index) == 0
+    assert list(repo.Repository(path).index['ticker']) == ['SPY', 'ALV']
+
+
+def test_add_chunks(tmpdir, data_path, alv_1d):
+    path = tmpdir.join('repo').strpath
+    repository = repo.Repository(path)
+    source = data_path.join('FWB_DLY_ALV, 1D.csv').strpath
+    repository.add_series(ldr.load_series(source, chunksize=2))
+
+    repository = repo.Repository(path)
+    pd.testing.assert_frame_equal(
+        repository.get_series('FWB', 'ALV', '1d', events=True), alv_1d,
+    )
+    rec = repository.index.iloc[0]
+    assert rec['first-time'] == alv_1d.index[0]
+    assert rec['last-time'] == alv_1d.index[-1]
+
+
+def test_derived_resolution(repo_path, alv_1d):
+    repository = repo.Repository(repo_path)
+    weekly = repository.get_series('FWB', 'ALV', '1w')
+    assert weekly.resolution == '1w'
+    assert weekly.currency == 'EUR'
+    assert list(weekly.index) == list(alv_1d.index[[0, 2, 4]])
+    assert list(weekly['volume']) == [15429, 15081, 33294]
+    assert os.path.exists(os.path.join(repo_path, 'derived',
+                                       'FWB_ALV_1w.pfc'))
+
+    # Cached series are also found by a new repository object.
+    repository = repo.Repository(repo_path)
+    monthly = repository.get_series('FWB', 'ALV', '1M', columns=['close'],
+                                    start='2016-01-01')
+    assert list(monthly['close']) == [126.25]
+
+    with pytest.raises(KeyError):
+        repository.get_series('FWB', 'ALV', '1h')
+    with pytest.raises(KeyError):
+        repository.get_series('FWB', 'ALV', 'daily')
+
+
+def test_derived_invalidation(repo_path, alv_1d):
+    repository = repo.Repository(repo_path)
+    assert len(repository.get_series('FWB', 'ALV', '1w')) == 3
+
+    later = alv_1d.iloc[-1:].copy()
+    later.index = later.index + pd.Timedelta(days=7)
+    repository.add_series(later)
+    assert len(repository.get_series('FWB', 'ALV', '1w')) == 4
+
+
+def test_derived_corrected(repo_path, alv_1d):
+    """Derived series are rebuilt when bars are corrected in place."""
+    repository = repo.Repository(repo_path)
+    assert repository.get_series('FWB', 'ALV', '1w')['high'].max() < 1000
+    corrected = alv_1d.iloc[-1:].copy()
+    corrected['high'] = 1000
+    repo.Repository(repo_path).add_series(corrected)
+    repository.refresh()
+    assert repository.get_series('FWB', 'ALV', '1w')['high'].max() == 1000
+
+
+def test_derived_last_used(repo_path):
+    """Reading cached series doesn't write the index of the cache."""
+    index_path = os.path.join(repo_path, 'derived', 'index.csv')
+    repo.Repository(repo_path).get_series('FWB', 'ALV', '1w')
+    mtime = os.stat(index_path).st_mtime_ns
+    last_used = pd.read_csv(index_path)['last-used'][0]
+    repository = repo.Repository(repo_path)
+    repository.get_series('FWB', 'ALV', '1w')
+    assert os.stat(index_path).st_mtime_ns == mtime
+    repository.close()
+    assert pd.read_csv(index_path)['last-used'][0] > last_used
+
+
+def test_derived_eviction(repo_path):
+    repository = repo.Repository(repo_path, cache_size=1500)
+    derived_path = os.path.join(repo_path, 'derived')
+    repository.get_series('FWB', 'ALV', '1w')
+    repository.get_series('BATS', 'SPY', '1w')
+    assert not os.path.exists(os.path.join(derived_path, 'FWB_ALV_1w.pfc'))
+    assert os.path.exists(os.path.join(derived_path, 'BATS_SPY_1w.pfc'))
+
+
+def test_memory_cache(repo_path, spy_1d):
+    repository = repo.Repository(repo_path, memory_cache_size=1 << 20)
+    first = repository.get_series('BATS', 'SPY', '1d')
+    second = repository.get_series('BATS', 'SPY', '1d')
+    assert second.equals(first)
+    assert second.ticker == 'SPY'
+    repository.get_series('BATS', 'SPY', '1d', columns=['close'])
+    repository.get_series('BATS', 'SPY', '1w')
+    repository.get_series('BATS', 'SPY', '1w')
+    stats = repository.memory_cache.stats
+    assert (stats['hits'], stats['misses']) == (2, 3)
+
+    later = spy_1d.iloc[-1:].copy()
+    later.index = later.index + pd.Timedelta(days=1)
+    repository.add_series(later)
+    assert len(repository.memory_cache) == 0
+    assert len(repository.get_series('BATS', 'SPY', '1d')) == 20
+
+    # Changes by another process are detected by file modification time.
+    later.index = later.index + pd.Timedelta(days=1)
+    repo.Repository(repo_path).add_series(later)
+    assert len(repository.get_series('BATS', 'SPY', '1d')) == 21
+
+    # Also when only the events and adjustment factors change.
+    query = {'adjusted': True, 'columns': ['close', 'dividend']}
+    dividends = repository.get_series('BATS', 'SPY', '1d', **query)
+    assert dividends['dividend'].isnull().all()
+    later['dividend'] = 0.1
+    repo.Repository(repo_path).add_series(later)
+    dividends = repository.get_series('BATS', 'SPY', '1d', **query)
+    assert dividends['dividend'].iloc[-1] == 0.1
+    assert dividends['close'].iloc[0] < spy_1d['close'].iloc[0]
+
+
+def test_memory_cache_mmap(repo_path):
+    repository = repo.Repository(repo_path, mmap=True,
+                                 memory_cache_size=1 << 20)
+    assert repository.memory_cache is None
+
+
+@pytest.mark.parametrize('processes', [False, True])
+def test_get_many(repo_path, spy_1d, processes):
+    repository = repo.Repository(repo_path)
+    keys = [('BATS', 'SPY', '1d'), ('FWB', 'ALV', '1w'),
+            ('BATS', 'MISSING', '1d')]
+    result = repository.get_many(keys, jobs=2, processes=processes,
+                                 columns=['close'])
+    assert list(result) == keys
+    assert result[keys[0]].equals(spy_1d[['close']])
+    assert result[keys[0]].ticker == 'SPY'
+    assert result[keys[1]].resolution == '1w'
+    assert isinstance(result[keys[2]], KeyError)
+
+
+def test_get_many_worker_settings(repo_path, mocker):
+    """Worker processes open the repository with the same settings."""
+    executor = mocker.patch.object(repo.cf, 'ProcessPoolExecutor')
+    repository = repo.Repository(repo_path, mmap=True, cache_size=1000)
+    repository.get_many([], processes=True)
+    initargs = executor.call_args.kwargs['initargs']
+    repo._init_worker(*initargs)
+    worker = repo._worker.pop('repository')
+    assert (worker.mmap, worker.cache_size) == (True, 1000)
+
+
+def test_get_many_async(repo_path, alv_1d):
+    repository = repo.Repository(repo_path)
+    keys = [('FWB', 'ALV', '1d'), ('FWB', 'ALV', 'daily')]
+    result = asyncio.run(repository.get_many_async(keys, events=True))
+    assert result[keys[0]].equals(alv_1d)
+    assert isinstance(result[keys[1]], KeyError)
@@ -0,0 +1,110 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for resampling of series."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import portfel.data.resample as rs
+import portfel.data.series as ds
+
+
+@pytest.fixture()
+def minutes():
+    """Two days of minute bars during the session."""
+    time = pd.date_range('2020-01-02 14:30', periods=390, freq='min').append(
+        pd.date_range('2020-01-03 14:30', periods=390, freq='min'))
+    rnd = np.random.RandomState(0)
+    close = 100 + np.cumsum(rnd.normal(0, 0.1, len(time)))
+    series = ds.Series({
+        'time': time,
+        'open': close + 0.05,
+        'close': close,
+        'high': close + 0.1,
+        'low': close - 0.1,
+        'volume': np.full(len(time), 10.0),
+        'dividend': np.where(np.arange(len(time)) == 400, 0.5, np.nan),
+        'split': [None] * 500 + ['2/1'] + [None] * 10 + ['3/2']
+        + [None] * 268,
+    })
+    series.exchange = 'BATS'
+    series.ticker = 'FOO'
+    series.resolution = '1'
+    return series
+
+
+@pytest.mark.parametrize('resolution,expected', [
+    ('1', (1, '')),
+    ('60', (60, '')),
+    ('4h', (4, 'h')),
+    ('1D', (1, 'd')),
+    ('2w', (2, 'w')),
+    ('1M', (1, 'm')),
+])
+def test_parse_resolution(resolution, expected):
+    assert rs.parse_resolution(resolution) == expected
+
+
+@pytest.mark.parametrize('resolution', ['', 'd', '0d', '1y', '1.5h'])
+def test_parse_bad_resolution(resolution):
+    with pytest.raises(ValueError):
+        rs.parse_resolution(resolution)
+
+
+@pytest.mark.parametrize('source,target,expected', [
+    ('1', '60', True),
+    ('5', '1h', True),
+    ('7', '1h', False),
+    ('60', '1d', True),
+    ('1', '1w', True),
+    ('1d', '1m', True),
+    ('1d', '1h', False),
+    ('1w', '1m', False),
+    ('1m', '3m', True),
+])
+def test_can_derive(source, target, expected):
+    assert rs.can_derive(source, target) == expected
+
+
+def test_resample_daily(minutes):
+    daily = rs.resample(minutes, '1d')
+    assert daily.resolution == '1d'
+    assert daily.ticker == 'FOO'
+    assert list(daily.index) == [pd.Timestamp('2020-01-02 14:30'),
+                                 pd.Timestamp('2020-01-03 14:30')]
+    first = minutes.iloc[:390]
+    assert daily['open'].iloc[0] == first['open'].iloc[0]
+    assert daily['close'].iloc[0] == first['close'].iloc[-1]
+    assert daily['high'].iloc[0] == first['high'].max()
+    assert daily['low'].iloc[0] == first['low'].min()
+    assert list(daily['volume']) == [3900, 3900]
+    assert np.isnan(daily['dividend'].iloc[0])
+    assert daily['dividend'].iloc[1] == 0.5
+    assert list(daily['split']) == [None, '3/1']
+
+
+def test_resample_hourly(minutes):
+    hourly = rs.resample(minutes, '1h')
+    assert len(hourly) == 14
+    assert hourly.index[1] == pd.Timestamp('2020-01-02 15:00')
+    assert hourly['volume'].sum() == 7800
+
+
+def test_resample_weekly(spy_1d):
+    weekly = rs.resample(spy_1d, '1w')
+    assert list(weekly.index.dayofweek) == [0] * 4
+    assert weekly['volume'].sum() == spy_1d['volume'].sum()
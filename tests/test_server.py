@@ -0,0 +1,119 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for the repository server and its client."""
+
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+import portfel.client as cl
+import portfel.data.repository as repo
+import portfel.server as srv
+
+
+@pytest.fixture()
+def server(repo_path):
+    """Repository server running in a thread."""
+    server = srv.Server(repo.Repository(repo_path, memory_cache_size=1 << 20))
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join()
+    server.server_close()
+
+
+def test_get_series(server, repo_path, alv_1d):
+    with cl.connect(repo_path) as client:
+        records = client.list_series()
+        assert [r['ticker'] for r in records] == ['SPY', 'ALV']
+
+        series = client.get_series('FWB', 'ALV', '1d', events=True)
+        assert series.ticker == 'ALV'
+        assert series.currency == 'EUR'
+        pd.testing.assert_frame_equal(series, alv_1d)
+
+        weekly = client.get_series('FWB', 'ALV', '1w', columns=['close'],
+                                   start=pd.Timestamp('2015-08-07'))
+        assert list(weekly.index) == list(alv_1d.index[[2, 4]])
+
+        with pytest.raises(KeyError):
+            client.get_series('FWB', 'MISSING', '1d')
+        with pytest.raises(KeyError):
+            client.get_series('FWB', 'ALV', '1d', columns=['foo'])
+        # The connection still works after the errors.
+        assert len(client.list_series()) == 2
+
+
+def test_changes_by_others(server, repo_path, alv_1d):
+    """Bars added by another process are seen in all resolutions."""
+    with cl.connect(repo_path) as client:
+        assert len(client.get_series('FWB', 'ALV', '1w')) == 3
+        later = alv_1d.iloc[-1:].copy()
+        later.index = later.index + pd.Timedelta(days=7)
+        repo.Repository(repo_path).add_series(later)
+        assert len(client.get_series('FWB', 'ALV', '1d')) == 6
+        assert len(client.get_series('FWB', 'ALV', '1w')) == 4
+
+
+def test_concurrent_requests(server, repo_path, spy_1d):
+    def get(results):
+        with cl.connect(repo_path) as client:
+            for _ in range(5):
+                results.append(client.get_series('BATS', 'SPY', '1w'))
+
+    results = []
+    threads = [threading.Thread(target=get, args=(results,))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 20
+    assert all(r.equals(results[0]) for r in results)
+
+
+@pytest.mark.script_launch_mode('subprocess')
+def test_cli_client(server, script_runner, repo_env):
+    result = script_runner.run(['pf', 'show', 'FWB:ALV', '--columns',
+                                'close', '--end', '2015-08-07'],
+                               env=repo_env)
+    assert result.success
+    assert '155.3' in result.stdout
+    assert server.repository.memory_cache.stats['misses'] == 1
+
+
+def test_stop(repo_path):
+    server = srv.Server(repo.Repository(repo_path))
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    with cl.connect(repo_path) as client:
+        client.stop()
+    thread.join()
+    server.server_close()
+    assert cl.connect(repo_path) is None
+
+
+def test_stale_socket(repo_path):
+    server = srv.Server(repo.Repository(repo_path))
+    with pytest.raises(Exception, match='already running'):
+        srv.Server(repo.Repository(repo_path))
+    server.socket.close()  # Leave the socket file behind.
+    assert cl.connect(repo_path) is None
+    srv.Server(repo.Repository(repo_path)).server_close()
+    assert not os.path.exists(cl.socket_path(repo_path))
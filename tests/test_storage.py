@@ -0,0 +1,182 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for the storage formats."""
+
+import os
+
+import pandas as pd
+import pytest
+
+import portfel.data.formats.binary as binary
+import portfel.data.storage as storage
+
+
+@pytest.mark.parametrize('series_name', ['spy_1d', 'alv_1d'])
+def test_binary_roundtrip(request, tmpdir, series_name):
+    """Binary format stores series exactly."""
+    series = request.getfixturevalue(series_name)
+    path = tmpdir.join('series' + binary.EXTENSION).strpath
+    binary.save(path, series)
+    pd.testing.assert_frame_equal(binary.load(path), series)
+
+
+def test_binary_capacity(tmpdir, alv_1d):
+    """Reserved space doesn't change the loaded data."""
+    path = tmpdir.join('series' + binary.EXTENSION).strpath
+    binary.save(path, alv_1d, capacity=100)
+    with open(path, 'rb') as f:
+        header = binary.read_header(f)
+    assert header['rows'] == 5
+    assert header['capacity'] == 100
+    pd.testing.assert_frame_equal(binary.load(path), alv_1d)
+
+
+def test_binary_not_series(tmpdir):
+    path = tmpdir.join('series' + binary.EXTENSION)
+    path.write('time,open\n')
+    with pytest.raises(ValueError):
+        binary.load(path.strpath)
+
+
+@pytest.mark.parametrize('filename,format', [
+    ('a/b.csv', 'csv'),
+    ('a/b.pfc', 'binary'),
+])
+def test_format_of(filename, format):
+    assert storage.format_of(filename) == format
+
+
+def test_format_of_unknown():
+    with pytest.raises(ValueError):
+        storage.format_of('a/b.txt')
+
+
+def test_binary_mmap(tmpdir, alv_1d):
+    """Memory-mapped series are views of the file."""
+    path = tmpdir.join('series' + binary.EXTENSION).strpath
+    binary.save(path, alv_1d, capacity=10)
+    series = binary.load(path, mmap=True)
+    pd.testing.assert_frame_equal(series, alv_1d)
+    assert not series['close'].values.flags.writeable
+    assert not series.index.values.flags.writeable
+
+
+def _read_header(path):
+    with open(path, 'rb') as f:
+        return binary.read_header(f)
+
+
+def test_binary_merge_append(tmpdir, spy_1d):
+    """New records are written into reserved space."""
+    path = tmpdir.join('series' + binary.EXTENSION).strpath
+    binary.save(path, spy_1d.iloc[:10], capacity=15)
+    size = os.path.getsize(path)
+
+    binary.merge(path, spy_1d.iloc[10:15])
+    assert os.path.getsize(path) == size
+    assert _read_header(path)['rows'] == 15
+    pd.testing.assert_frame_equal(binary.load(path), spy_1d.iloc[:15])
+
+    # Now it doesn't fit and the file is rewritten with more capacity.
+    binary.merge(path, spy_1d.iloc[12:])
+    header = _read_header(path)
+    assert header['rows'] == len(spy_1d)
+    assert header['capacity'] > len(spy_1d)
+    pd.testing.assert_frame_equal(binary.load(path), spy_1d)
+
+
+def test_binary_merge_overlap(tmpdir, alv_1d):
+    """Changed records replace the stored ones."""
+    path = tmpdir.join('series' + binary.EXTENSION).strpath
+    binary.save(path, alv_1d, capacity=10)
+    inode = os.stat(path).st_ino
+    update = alv_1d.iloc[2:].copy()
+    update['close'] = [1.0, 2.0, 3.0]
+    update['split'] = [None, '2/1', None]
+    binary.merge(path, update)
+
+    assert _read_header(path)['capacity'] == 10
+    assert os.stat(path).st_ino == inode  # Updated in place.
+    expect = alv_1d.copy()
+    expect.iloc[2:] = update
+    pd.testing.assert_frame_equal(binary.load(path), expect)
+
+
+def test_binary_merge_mmap(tmpdir, alv_1d):
+    """With copy on write memory-mapped series don't change in merges."""
+    path = tmpdir.join('series' + binary.EXTENSION).strpath
+    binary.save(path, alv_1d.iloc[:3], capacity=10)
+    series = binary.load(path, mmap=True)
+    update = alv_1d.iloc[2:].copy()
+    update['close'] = 1.0
+    binary.merge(path, update, copy_on_write=True)
+    assert list(series['close']) == list(alv_1d['close'].iloc[:3])
+    expect = list(alv_1d['close'].iloc[:2]) + [1.0] * 3
+    assert list(binary.load(path)['close']) == expect
+
+
+def test_binary_merge_unchanged(tmpdir, mocker, alv_1d):
+    """Merging stored records doesn't write anything."""
+    path = tmpdir.join('series' + binary.EXTENSION).strpath
+    binary.save(path, alv_1d)
+    write_rows = mocker.patch.object(binary, '_write_rows')
+    save = mocker.patch.object(binary, 'save')
+    binary.merge(path, alv_1d.iloc[1:])
+    assert not write_rows.called
+    assert not save.called
+
+
+@pytest.mark.parametrize('format', ['binary', 'csv'])
+def test_merge_first_change(tmpdir, spy_1d, format):
+    """Merging returns the time of the first changed record."""
+    path = tmpdir.join(storage.filename('series', format)).strpath
+    storage.save_series(path, spy_1d.iloc[:10])
+    assert storage.merge_series(path, spy_1d.iloc[:10]) is None
+    assert storage.merge_series(path, spy_1d.iloc[:12]) == spy_1d.index[10]
+    update = spy_1d.copy()
+    update.loc[update.index[5], 'close'] = 1.0
+    assert storage.merge_series(path, update) == spy_1d.index[5]
+    pd.testing.assert_frame_equal(storage.load_series(path), update)
+
+
+def test_binary_merge_new_columns(tmpdir, spy_1d, alv_1d):
+    """Series with different columns are merged by rewriting the file."""
+    path = tmpdir.join('series' + binary.EXTENSION).strpath
+    binary.save(path, alv_1d.iloc[:3], capacity=10)
+    binary.merge(path, spy_1d)
+    merged = binary.load(path)
+    assert list(merged) == list(alv_1d)
+    assert len(merged) == len(spy_1d) + 3
+    assert merged.index.is_monotonic_increasing
+
+
+def test_binary_merge_rewrite(tmpdir, monkeypatch, spy_1d, alv_1d):
+    """Rewriting the file adds new columns and widens the types."""
+    monkeypatch.setattr(binary, 'COPY_ROWS', 7)
+    path = tmpdir.join('series' + binary.EXTENSION).strpath
+    binary.save(path, spy_1d)
+    alv_1d_ = alv_1d.copy()
+    alv_1d_['split'] = [None, None, '10/1', None, '5/7']
+    binary.merge(path, alv_1d_)
+
+    merged = binary.load(path)
+    assert list(merged) == list(alv_1d)
+    pd.testing.assert_frame_equal(merged.iloc[:len(spy_1d)][list(spy_1d)],
+                                  spy_1d)
+    pd.testing.assert_frame_equal(merged.iloc[len(spy_1d):], alv_1d_)
+    assert merged['split'].iloc[:len(spy_1d)].isnull().all()
+    assert merged['earnings-period'].iloc[:len(spy_1d)].isnull().all()
+    assert not os.path.exists(path + '.tmp')
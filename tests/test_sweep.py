@@ -0,0 +1,65 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for parameter sweeps."""
+
+import pandas as pd
+import pytest
+
+import portfel.backtest as bt
+import portfel.data.repository as repo
+import portfel.sweep as sw
+
+
+def make_configs(**values):
+    return [
+        {
+            'exchange': 'BATS',
+            'ticker': 'SPY',
+            'resolution': '1d',
+            'strategy': 'buy-dip',
+            'params': params,
+            'starting-cash': 1000,
+            'monthly-cash': 100,
+            'years': 0.02,
+            'step': 2,
+        }
+        for params in sw.grid(**values)
+    ]
+
+
+def test_grid():
+    assert sw.grid(a=[1, 2], b=[3]) == [{'a': 1, 'b': 3}, {'a': 2, 'b': 3}]
+    assert sw.grid() == [{}]
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_sweep(repo_path, spy_1d, jobs):
+    repository = repo.Repository(repo_path)
+    configs = make_configs(dip_pct=[1, 5], invest_pct=[50, 100])
+    results = list(sw.sweep(repository, configs, jobs=jobs))
+    assert [r['params'] for r in results] == [c['params'] for c in configs]
+
+    expected = bt.backtest(spy_1d, bt.buy_dip(spy_1d, 5, 100), 1000, 100,
+                           period=pd.Timedelta(days=365 * 0.02), step=2)
+    assert results[3]['windows'] == len(expected)
+    assert results[3]['mean'] == pytest.approx(expected['gain'].mean())
+
+
+def test_results_table():
+    results = [dict(c, mean=0.1) for c in make_configs(dip_pct=[1, 2])]
+    table = sw.results_table(results)
+    assert list(table['dip_pct']) == [1, 2]
+    assert 'params' not in table
@@ -15,10 +15,13 @@
 
 """Tests for the TradingView loader."""
 
+import pandas as pd
 import pytest
 
 import portfel.data.loaders.tradingview as tv
 
+import conftest as ct
+
 
 @pytest.mark.parametrize('name,expect_params', [
     ('/a/b/BATS_SPY, 1D.csv', {'exchange': 'BATS', 'ticker': 'SPY',
@@ -32,3 +35,34 @@ import portfel.data.loaders.tradingview as tv
 ])
 def test_tv_name_parser(name, expect_params):
     assert tv.parse_filename(name) == expect_params
+
+
+@pytest.mark.parametrize('filename', [
+    ct.DataFiles.SPY_1D,
+    ct.DataFiles.ALV_1D,
+])
+def test_read_columns(data_path, filename):
+    """Bulk loading produces the same series as row by row loading."""
+    path = data_path.join(filename).strpath
+    pd.testing.assert_frame_equal(tv.read_columns(path), tv.read_rows(path))
+
+
+def test_read_columns_partial(tmpdir):
+    """Only some of the extra fields are present."""
+    path = tmpdir.join('FOO_BAR, 1D.csv')
+    path.write('\n'.join([
+        'time,open,close,Earnings confirmed,Split numerator,'
+        'Split denominator,Dividends amount',
+        '1438840800,1.5,2,nan,0,0,0',
+        '1438927200,NaN,,4.25,2,1,0.5',
+        '1439186400,1,2,0,1,0,',
+    ]))
+    pd.testing.assert_frame_equal(tv.read_columns(path.strpath),
+                                  tv.read_rows(path.strpath))
+
+
+def test_read_columns_bad_time(tmpdir):
+    path = tmpdir.join('FOO_BAR, 1D.csv')
+    path.write('time,open\n2015-08-06,1\n')
+    with pytest.raises(ValueError):
+        tv.read_columns(path.strpath)
@@ -0,0 +1,53 @@
+# This file is part of Portfel,
+# Copyright (C) 2020 Vasily Kuznetsov
+#
+# Portfel is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# Portfel is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Portfel. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for rolling windows."""
+
+import numpy as np
+import pandas as pd
+
+import portfel.data.windows as windows
+
+
+def test_bounds():
+    index = pd.date_range('2020-01-01', periods=10)
+    starts, stops = windows.bounds(index, '3d', step=2)
+    assert list(starts) == [0, 2, 4, 6]
+    assert list(stops) == [4, 6, 8, 10]
+
+
+def test_bounds_gaps():
+    index = pd.to_datetime(['2020-01-01', '2020-01-02', '2020-01-06',
+                            '2020-01-07', '2020-01-20'])
+    starts, stops = windows.bounds(index, pd.Timedelta(days=5))
+    assert list(starts) == [0, 1, 2, 3, 4]
+    assert list(stops) == [3, 4, 4, 4, 5]
+
+
+def test_bounds_calendar():
+    index = pd.date_range('2020-01-31', periods=5, freq='M')
+    starts, stops = windows.bounds(index, pd.DateOffset(months=2))
+    assert list(starts) == [0, 1, 2]
+    assert list(stops) == [3, 3, 5]
+
+
+def test_rolling(spy_1d):
+    prices = spy_1d[['open', 'close']]
+    slices = list(windows.rolling(prices, '7d', step=5))
+    assert len(slices) == 4
+    assert slices[1].index[0] == spy_1d.index[5]
+    assert slices[1].index[-1] == pd.Timestamp('2002-09-30 13:30')
+    assert slices[-1].index[-1] == spy_1d.index[-1]
+    assert np.shares_memory(slices[1].values, prices.values)